@@ -3,26 +3,32 @@ import tempfile
 import os
 from pathlib import Path
 import uuid
-import time
 import asyncio
-import random
 from typing import Optional , List, Dict
 
-from ingestion.doc_processor import process_llama_documents
-from ingestion.weaviate_client import QueryManager
+from ingestion.embeddings import get_embedder
+from ingestion.jobs import get_job_manager
 from llm_provider import LLMProvider
-import threading
+from profiling import profile_request
+from query_pipeline import QueryPipeline
+from telemetry import configure as configure_telemetry
 
 from config import (
-    LOCAL_FILE_INPUT_DIR,
     WEAVIATE_COLLECTION_NAME,
-    WEAVIATE_API_KEY,
-    WEAVIATE_REST_URL,
-    TOP_K
+    JOB_POLL_INTERVAL,
+    PROFILE_DIR
 )
 
 
-llm = LLMProvider()
+# Start the configured metric and span exporters (once per process)
+configure_telemetry()
+
+# A configured client-side embedder also enables the semantic tier of the answer cache
+embedder = get_embedder()
+llm = LLMProvider(embed_fn=embedder.embed_query if embedder else None)
+query_pipeline = QueryPipeline(llm)
+# Shared by every session, so jobs outlive the page that submitted them
+job_manager = get_job_manager()
 
 
 st.set_page_config(
@@ -261,6 +267,12 @@ if "processing_status" not in st.session_state:
         "idle"  # Can be 'idle', 'processing', 'completed', 'error'
     )
 
+if "active_job_id" not in st.session_state:
+    st.session_state.active_job_id = None
+
+if "summaries" not in st.session_state:
+    st.session_state.summaries = {}  # Job ID -> summary, generated once per job
+
 
 def ensure_directory_exists(directory_path):
     """Ensure the specified directory exists, create it if not"""
@@ -270,13 +282,13 @@ def ensure_directory_exists(directory_path):
 
 
 def save_uploaded_pdf(uploaded_file):
-    """Save the uploaded PDF to INPUT_DIRECTORY and return the file path"""
-    # Ensure input directory exists
-    ensure_directory_exists(LOCAL_FILE_INPUT_DIR)
+    """Save the uploaded PDF to the session's staging directory and return the file path"""
+    # Files stay private to the session until a job moves them into its own input directory
+    ensure_directory_exists(st.session_state.temp_dir)
 
     # Create a unique filename
     filename = f"{uuid.uuid4()}_{uploaded_file.name}"
-    filepath = os.path.join(LOCAL_FILE_INPUT_DIR, filename)
+    filepath = os.path.join(st.session_state.temp_dir, filename)
 
     # Save the file
     with open(filepath, "wb") as f:
@@ -295,96 +307,89 @@ def format_file_size(size_bytes):
 
 def clear_uploaded_documents():
     """Clear all uploaded documents and reset processing state"""
+    for pdf in st.session_state.uploaded_pdfs:
+        # Only files not yet submitted with a job are still staged
+        if os.path.exists(pdf["path"]):
+            os.remove(pdf["path"])
     st.session_state.uploaded_pdfs = []
     st.session_state.processing_complete = True
     st.session_state.processing_status = "idle"
 
 
-def display_chat_message(message, is_user=False):
-    """Display a chat message with the appropriate styling"""
-    if is_user:
-        st.markdown(
-            f"""
-        <div class="chat-message user">
-            <div class="avatar user-avatar">👤</div>
-            <div class="message-content">{message}</div>
-        </div>
-        """,
-            unsafe_allow_html=True,
-        )
-    else:
-        st.markdown(
-            f"""
-        <div class="chat-message bot">
-            <div class="avatar bot-avatar">🤖</div>
+def render_chat_message(message, is_user=False):
+    """Return the HTML for a chat message with the appropriate styling"""
+    role_class, avatar_class, avatar = (
+        ("user", "user-avatar", "👤") if is_user else ("bot", "bot-avatar", "🤖")
+    )
+    return f"""
+        <div class="chat-message {role_class}">
+            <div class="avatar {avatar_class}">{avatar}</div>
             <div class="message-content">{message}</div>
         </div>
-        """,
-            unsafe_allow_html=True,
-        )
+        """
 
 
-async def process_query(query, tenant, is_summary : bool = False, text : Optional[str] = None):
-    """Process a user query and return a response (placeholder for RAG query)"""
+def display_chat_message(message, is_user=False):
+    """Display a chat message with the appropriate styling"""
+    st.markdown(render_chat_message(message, is_user), unsafe_allow_html=True)
+
+
+def stream_chat_message(placeholder, token_stream):
+    """Render a bot message into a placeholder as tokens arrive and return the full text"""
+    message = ""
+    for token in token_stream:
+        message += token
+        placeholder.markdown(render_chat_message(message + "▌"), unsafe_allow_html=True)
+    placeholder.markdown(render_chat_message(message), unsafe_allow_html=True)
+    return message
+
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def render_ingestion_jobs(tenant):
+    """Show the progress of the tenant's recent ingestion jobs, polled every JOB_POLL_INTERVAL seconds"""
+    jobs = job_manager.list_jobs(tenant)[:5]
+    if not jobs:
+        return
+
+    st.markdown("<h4>Ingestion Jobs</h4>", unsafe_allow_html=True)
+    for job in jobs:
+        if job.status == "completed":
+            label = f"✅ Completed: {job.objects_uploaded} chunks from {job.files_total} file(s)"
+            if job.files_skipped:
+                label += f", {job.files_skipped} unchanged file(s) skipped"
+        elif job.status == "failed":
+            label = f"❌ Failed: {job.error}"
+            if st.button("Retry", key=f"retry-{job.job_id}") and job_manager.resume(job.job_id):
+                if job.job_id == st.session_state.active_job_id:
+                    st.session_state.processing_status = "processing"
+                st.rerun()
+        elif job.status == "running":
+            label = (
+                f"⏳ Parsed {job.files_parsed + job.files_failed}/{job.files_total} file(s), "
+                f"uploaded {job.objects_uploaded}/{job.chunks} chunks"
+            )
+        else:
+            label = "🕒 Queued"
+        st.progress(job.progress, text=label)
+        if job.events and not job.finished:
+            st.caption(" • ".join(job.events[-3:]))
+        if job.profile_paths:
+            st.caption(f"Profile: {', '.join(job.profile_paths)}")
 
-    
+    # Let the full page update its status and summary once the submitted job is done
+    active_job = job_manager.get(st.session_state.active_job_id) if st.session_state.active_job_id else None
+    if active_job and active_job.finished and st.session_state.processing_status == "processing":
+        st.rerun()
+
+
+async def process_query(query, tenant, is_summary : bool = False, text : Optional[List[str]] = None, stream : bool = False):
+    """Process a user query and return a response, or a token iterator when stream is True"""
     if is_summary:
-        content = f'''
-                <Context Starts>:
-                {"\n\n".join(text)}
-                </Context Ends>
-                '''
-        
-        res = llm.get_summary(text=content)
-
-    else:
-        user_context = ""
-        past_conv = 3
-        if len(st.session_state.chat_history) > 0:
-            user_context = "\n".join(
-                [
-                    f"{msg['role']}: {msg['content']}"
-                    for msg in st.session_state.chat_history[-2 * past_conv:-1]
-                ]
-            )
-        context_texts = []
-        with QueryManager(
-            wcd_api_key=WEAVIATE_API_KEY, wcd_url=WEAVIATE_REST_URL
-        ) as query_manager:
-            contexts = query_manager.query_by_text(
-                collection_name=WEAVIATE_COLLECTION_NAME, query_text=query, tenant=tenant, limit=int(TOP_K)
-            )
-            consolidated_results = []
-            context_texts = []
-            if contexts:
-                for obj in contexts:
-                    text = obj.properties.get("text", "")
-                    filename = obj.properties.get("filename", "")
-                    distance = (
-                        obj.metadata.distance
-                        if hasattr(obj.metadata, "distance")
-                        else "N/A"
-                    )
-                    context_texts.append(text)
-                    consolidated_results.append((text, filename, distance))
+        return await query_pipeline.asummarize(texts=text, tenant=tenant, stream=stream)
 
-        print("------Context texts-------:\n", context_texts)
-        print("\n------user_context-------:\n", user_context)
-        
-        
-        content = f'''
-                    Query: {query}
-                    ----------\n--------
-                    {f"Previous Conversation:\n{user_context}\n\n" if user_context else ""}
-                    ----------\n--------
-                    <Context Starts>:
-                    {"\n\n".join(context_texts)}
-                    </Context Ends>
-                    '''
-        
-        res = llm.query(query=content)
-    
-    return res
+    # Previous messages, excluding the question that was just appended
+    history = st.session_state.chat_history[:-1]
+    return await query_pipeline.aanswer(query=query, tenant=tenant, history=history, stream=stream)
 
 
 async def main():
@@ -399,6 +404,12 @@ async def main():
         if not user_id:
             user_id = "default"
 
+        profile_requests = st.checkbox(
+            "Profile my requests",
+            key="profile_requests",
+            help=f"Write a profile of each of your questions and ingestion jobs to {PROFILE_DIR}",
+        )
+
         if st.session_state.uploaded_pdfs:
             for i, pdf in enumerate(st.session_state.uploaded_pdfs):
                 st.markdown(
@@ -495,6 +506,15 @@ async def main():
             if new_files_added:
                 st.session_state.processing_complete = False
 
+        # Pick up the result of the submitted job once it has finished
+        active_job = job_manager.get(st.session_state.active_job_id) if st.session_state.active_job_id else None
+        if active_job and active_job.finished and st.session_state.processing_status == "processing":
+            if active_job.status == "completed":
+                st.session_state.processing_complete = True
+                st.session_state.processing_status = "completed"
+            else:
+                st.session_state.processing_status = "error"
+
         # Process button - only show if there are documents to process
         if st.session_state.uploaded_pdfs and not st.session_state.processing_complete:
             col1, col2 = st.columns([3, 1])
@@ -504,109 +524,20 @@ async def main():
                     "Process Documents for RAG",
                     type="primary",
                     use_container_width=True,
+                    disabled=st.session_state.processing_status == "processing",
                 ):
+                    # Files submitted with an earlier job have already been moved out of staging
+                    pending_paths = [
+                        pdf["path"] for pdf in st.session_state.uploaded_pdfs if os.path.exists(pdf["path"])
+                    ]
+                    st.session_state.active_job_id = job_manager.submit(
+                        tenant=user_id,
+                        collection_name=WEAVIATE_COLLECTION_NAME,
+                        file_paths=pending_paths,
+                        profile=profile_requests,
+                    )
                     st.session_state.processing_status = "processing"
-                    with st.spinner("Processing your documents..."):
-                        try:
-                            progress_placeholder = st.empty()
-                            step_status = st.empty()
-                            substep_status = st.empty()
-                            
-                            # Use a list to store results between threads
-                            shared_results = [None]
-                            processing_done = [False]
-                            
-                            async def process_documents():
-                                return await process_llama_documents(
-                                    user_id=user_id,
-                                    collection_name=WEAVIATE_COLLECTION_NAME,
-                                )
-                            
-                            def run_processing():
-                                try:
-                                    # Use the shared_results list to store the results
-                                    shared_results[0] = asyncio.run(process_documents())
-                                    print("Processing Results ----> \n", shared_results[0])
-                                    processing_done[0] = True
-                                except Exception as e:
-                                    st.error(f"Processing error: {str(e)}")
-                                    processing_done[0] = True
-                            
-                            processing_thread = threading.Thread(target=run_processing)
-                            processing_thread.start()
-                            
-                            steps = ["Parsing PDFs", "Chunking documents", "Generating vectors", "Building index"]
-                            substeps = [
-                                ["Extracting text", "Analyzing document structure", "Processing metadata"],
-                                ["Creating text chunks", "Optimizing chunk size", "Handling overlaps"],
-                                ["Computing embeddings", "Optimizing vector dimensions", "Normalizing vectors"],
-                                ["Creating vector index", "Building search structures", "Optimizing retrieval"]
-                            ]
-                            
-                            progress_bar = progress_placeholder.progress(0)
-                            step_idx = 0
-                            substep_idx = 0
-                            progress = 0
-                            
-                            # Keep showing animation until processing is done
-                            while not processing_done[0]:
-                                current_step = steps[step_idx % len(steps)]
-                                current_substeps = substeps[step_idx % len(steps)]
-                                current_substep = current_substeps[substep_idx % len(current_substeps)]
-                                
-                                step_status.markdown(
-                                    f"<div class='processing-step'><b>Processing: {current_step}...</b></div>",
-                                    unsafe_allow_html=True,
-                                )
-                                substep_status.markdown(f"- {current_substep}...")
-                                
-                                # Update progress (cycle between 0-90% until real processing completes)
-                                progress += 0.01
-                                if progress > 0.9:  # Cap at 90% until real processing completes
-                                    progress = 0.1
-                                    step_idx += 1
-                                    substep_idx = 0
-                                else:
-                                    substep_idx = (substep_idx + 1) % len(current_substeps)
-                                
-                                progress_bar.progress(progress)
-                                time.sleep(0.2)
-                            
-                            # Show 100% completion
-                            progress_bar.progress(1.0)
-                            step_status.markdown(
-                                "<div class='processing-step'><b>Processing complete!</b></div>",
-                                unsafe_allow_html=True,
-                            )
-                            substep_status.empty()
-
-                            # Process results using shared_results instead of results
-                            if shared_results[0]:
-                                st.session_state.processing_complete = True
-                                st.session_state.processing_status = "completed"
-                                st.success(
-                                    "✅ Documents processed successfully! You can now chat with your documents."
-                                )
-
-                                with st.spinner("Generating summary..."):
-                                    summary = await process_query(
-                                        query="Summarize", 
-                                        is_summary=True, 
-                                        tenant=user_id, 
-                                        text=shared_results[0][1]  # Access the second element of the tuple
-                                    )
-                                    st.markdown(summary)
-                            
-                            else:
-                                st.session_state.processing_status = "error"
-                                st.error(
-                                    "❌ Error processing documents. Please try again."
-                                )
-                        except Exception as e:
-                            st.session_state.processing_status = "error"
-                            st.error(
-                                f"❌ An error occurred during processing: {str(e)}"
-                            )
+                    st.rerun()
 
             with col2:
                 if st.button("Clear All", use_container_width=True):
@@ -638,6 +569,28 @@ async def main():
         elif st.session_state.processing_status == "error":
             st.error("❌ Processing failed. Please try again.")
 
+        render_ingestion_jobs(user_id)
+
+        # Summarize the documents of the completed job, once per job
+        if active_job and active_job.status == "completed":
+            if active_job.job_id in st.session_state.summaries:
+                st.markdown(st.session_state.summaries[active_job.job_id])
+            else:
+                try:
+                    summary_stream = await process_query(
+                        query="Summarize",
+                        is_summary=True,
+                        tenant=active_job.tenant,
+                        text=job_manager.get_texts(active_job.job_id),  # Texts of every uploaded chunk
+                        stream=True,
+                    )
+                    with st.spinner("Generating summary..."):
+                        st.session_state.summaries[active_job.job_id] = st.write_stream(summary_stream)
+                    # The texts are only kept for the summary
+                    job_manager.discard_texts(active_job.job_id)
+                except Exception as e:
+                    st.error(f"❌ An error occurred while generating the summary: {str(e)}")
+
     # Chat Tab
     with tab2:
         st.markdown(
@@ -655,6 +608,9 @@ async def main():
             for message in st.session_state.chat_history:
                 display_chat_message(message["content"], message["role"] == "user")
 
+        # Placeholder where the next answer is streamed
+        response_placeholder = st.empty()
+
         st.markdown("</div>", unsafe_allow_html=True)
 
         # Input area for chat
@@ -691,9 +647,16 @@ async def main():
         
         # Process the query if the flag is set
         if "process_query" in st.session_state and st.session_state.process_query:
-            with st.spinner("Thinking..."):
-                response = asyncio.run(process_query(query=st.session_state.current_query, tenant=user_id))
-                
+            # Covers retrieval and the streamed answer; a no-op unless profiling is on for this user
+            with profile_request("query", user_id, force=profile_requests) as profile:
+                with st.spinner("Searching your documents..."):
+                    response_stream = asyncio.run(process_query(query=st.session_state.current_query, tenant=user_id, stream=True))
+
+                # Show tokens as they arrive instead of waiting for the full answer
+                response = stream_chat_message(response_placeholder, response_stream)
+            if profile is not None:
+                print(f"Query profile ({profile.duration:.2f}s): {', '.join(profile.paths)}")
+
             # Add AI response to chat history
             st.session_state.chat_history.append(
                 {"role": "assistant", "content": response}
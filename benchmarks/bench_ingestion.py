@@ -0,0 +1,496 @@
+"""Offline ingestion throughput benchmarks.
+
+Drives llama_parse, process_llama_documents and DataManager.upload_objects
+end to end over synthetic corpora, with local stand-ins for the external
+services: a fake LlamaParse returning synthetic markdown after a configurable
+latency, the local vector store and an in-memory Weaviate collection. Reports
+docs/sec, objects/sec, peak RSS and per-stage time as JSON.
+
+Each (scenario, corpus size) runs in a fresh subprocess with its own scratch
+directories and caches, so peak RSS and cache state do not leak between runs.
+
+Usage:
+    python -m benchmarks.bench_ingestion --sizes 10,100,1000
+    python -m benchmarks.bench_ingestion --sizes 10000 --scenarios upload_objects
+    python -m benchmarks.bench_ingestion --baseline benchmarks/results/previous.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SCENARIOS = ("llama_parse", "process_llama_documents", "upload_objects")
+
+# Scenarios that chunk documents, which needs tiktoken's cl100k_base encoding
+TOKENIZER_SCENARIOS = ("llama_parse", "process_llama_documents")
+
+# Spans recorded by process_llama_documents and DataManager.upload_objects, reported as per-stage time
+STAGE_SPANS = ("ingest.parse", "ingest.normalize", "ingest.embed", "ingest.upload", "weaviate.upload")
+
+WORDS = (
+    "retrieval augmented generation vector index tenant chunk embedding latency throughput "
+    "document parser markdown table figure section invoice contract report revenue quarter "
+    "customer policy clause payment schedule warranty liability appendix summary analysis"
+).split()
+
+
+def synthetic_markdown(rng: random.Random, pages: int, words_per_page: int) -> List[str]:
+    """Generate the markdown pages of a synthetic document.
+
+    Args:
+        rng: Random generator (seeded for reproducible corpora)
+        pages: Number of pages
+        words_per_page: Approximate number of words per page
+
+    Returns:
+        Markdown text of each page
+    """
+    result = []
+    for page in range(pages):
+        lines = [f"# Section {page + 1}: {' '.join(rng.choices(WORDS, k=3)).title()}", ""]
+        remaining = words_per_page
+        while remaining > 0:
+            count = min(remaining, rng.randint(40, 120))
+            lines.append(" ".join(rng.choices(WORDS, k=count)) + ".")
+            lines.append("")
+            remaining -= count
+        lines.append("| item | amount |")
+        lines.append("|------|--------|")
+        lines.extend(f"| {rng.choice(WORDS)} | {rng.randint(1, 10000)} |" for _ in range(3))
+        result.append("\n".join(lines))
+    return result
+
+
+def write_corpus(directory: str, documents: int, pages: int, words_per_page: int, seed: int) -> None:
+    """Write a synthetic corpus, one file per document with pages separated by form feeds.
+
+    Args:
+        directory: Directory to write the files to
+        documents: Number of documents
+        pages: Pages per document
+        words_per_page: Approximate number of words per page
+        seed: Random seed
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    for index in range(documents):
+        with open(os.path.join(directory, f"doc-{index:05d}.txt"), "w", encoding="utf-8") as f:
+            f.write("\f".join(synthetic_markdown(rng, pages, words_per_page)))
+
+
+class FakeParser:
+    """Stand-in for LlamaParse returning each form-feed separated page as a document.
+
+    Attributes:
+        latency: Seconds each call waits, simulating the parsing service
+        calls: Number of files parsed
+    """
+
+    def __init__(self, latency: float = 0.0):
+        """Initialize the parser.
+
+        Args:
+            latency: Seconds each call waits
+        """
+        self.latency = latency
+        self.calls = 0
+
+    async def aload_data(self, file_path: str, extra_info: Optional[Dict] = None):
+        """Parse a file the way LlamaParse.aload_data does.
+
+        Args:
+            file_path: Path of the file
+            extra_info: Metadata attached to every document
+
+        Returns:
+            One Document per page
+        """
+        from llama_index.core import Document
+
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        with open(file_path, "r", encoding="utf-8") as f:
+            pages = f.read().split("\f")
+        return [Document(text=page, metadata=dict(extra_info or {})) for page in pages]
+
+
+class InMemoryBatch:
+    """Stand-in for a Weaviate dynamic batch, storing objects in a dict on exit."""
+
+    def __init__(self, collection: "InMemoryCollection"):
+        self.collection = collection
+        self.pending: List[Dict] = []
+
+    def __enter__(self) -> "InMemoryBatch":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            if self.collection.latency:
+                time.sleep(self.collection.latency)
+            for item in self.pending:
+                self.collection.objects[str(item["uuid"])] = item
+            self.collection.batch.failed_objects = []
+
+    def add_object(self, properties: Dict, vector=None, uuid=None) -> None:
+        self.pending.append({"properties": properties, "vector": vector, "uuid": uuid})
+
+
+class InMemoryCollection:
+    """Stand-in for a Weaviate collection with a tenant, as used by DataManager.upload_objects.
+
+    Attributes:
+        latency: Seconds each batch request waits, simulating the network round trip
+        objects: Stored objects by UUID
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.objects: Dict[str, Dict] = {}
+        self.batch = self
+        self.failed_objects: List = []
+
+    def with_tenant(self, tenant: str) -> "InMemoryCollection":
+        return self
+
+    def dynamic(self) -> InMemoryBatch:
+        return InMemoryBatch(self)
+
+
+def peak_rss_mb() -> float:
+    """Return the peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def stage_seconds(before: Dict[str, Dict], after: Dict[str, Dict]) -> Dict[str, float]:
+    """Sum the span time of each ingestion stage recorded between two metric snapshots.
+
+    Stages overlap (files are parsed while others are uploaded), so the sum
+    over stages can exceed the wall-clock time.
+
+    Args:
+        before: telemetry.metrics.snapshot() taken before the run
+        after: telemetry.metrics.snapshot() taken after the run
+
+    Returns:
+        Stage name -> seconds
+    """
+    stages = {}
+    for series, values in after.items():
+        if not series.startswith("rag_span_duration_seconds{"):
+            continue
+        for stage in STAGE_SPANS:
+            if f'span="{stage}"' in series:
+                previous = before.get(series, {}).get("sum", 0.0)
+                stages[stage] = round(stages.get(stage, 0.0) + values["sum"] - previous, 6)
+    return stages
+
+
+def run_scenario(scenario: str, documents: int, args: argparse.Namespace, workdir: str) -> Dict:
+    """Run one scenario in the current process.
+
+    The scratch directories are configured through the environment before
+    the repo modules are imported, so this must run in a fresh process.
+
+    Args:
+        scenario: One of SCENARIOS
+        documents: Number of synthetic documents
+        args: Parsed command line arguments
+        workdir: Scratch directory of the run
+
+    Returns:
+        Result record
+    """
+    os.environ.update(
+        {
+            "LOCAL_FILE_INPUT_DIR": os.path.join(workdir, "input"),
+            "LOCAL_FILE_OUTPUT_DIR": os.path.join(workdir, "output"),
+            "PARSE_CACHE_DIR": os.path.join(workdir, "parse_cache"),
+            "MANIFEST_DIR": os.path.join(workdir, "manifests"),
+            "VECTOR_STORE": "local",
+            "LOCAL_VECTOR_STORE_DIR": os.path.join(workdir, "vector_store"),
+            "EMBEDDER": args.embedder,
+            "EMBEDDING_CACHE_PATH": "",
+            "INGEST_EXPORT_DIR": "",
+        }
+    )
+    from config import CHUNK_OVERLAP, CHUNK_SIZE, PARSE_CONCURRENCY, UPLOAD_BATCH_SIZE
+    import ingestion.doc_processor as doc_processor
+    from ingestion.weaviate_client import DataManager
+    from telemetry import metrics
+
+    parser = FakeParser(latency=args.parse_latency)
+    doc_processor.create_parser = lambda api_key=None: parser
+
+    input_dir = os.environ["LOCAL_FILE_INPUT_DIR"]
+    output_dir = os.environ["LOCAL_FILE_OUTPUT_DIR"]
+    if scenario != "upload_objects":
+        write_corpus(input_dir, documents, args.pages, args.words_per_page, seed=args.seed + documents)
+
+    result = {
+        "scenario": scenario,
+        "documents": documents,
+        "config": {
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "parse_concurrency": PARSE_CONCURRENCY,
+            "upload_batch_size": UPLOAD_BATCH_SIZE,
+            "embedder": args.embedder or None,
+        },
+    }
+    before = metrics.snapshot()
+    start = time.perf_counter()
+
+    if scenario == "llama_parse":
+        ok = asyncio.run(doc_processor.llama_parse(input_dir, output_dir))
+        objects = 0
+        for name in os.listdir(output_dir):
+            with open(os.path.join(output_dir, name), "rb") as f:
+                objects += sum(1 for _ in f)
+    elif scenario == "process_llama_documents":
+        outcome = asyncio.run(
+            doc_processor.process_llama_documents(
+                user_id="bench", collection_name="Bench", input_dir=input_dir, output_dir=output_dir
+            )
+        )
+        ok = bool(outcome)
+        objects = len(outcome[1]) if ok else 0
+    else:
+        rng = random.Random(args.seed + documents)
+        records = [
+            {
+                "text": " ".join(rng.choices(WORDS, k=args.words_per_page // 2)),
+                "filename": f"doc-{index // args.pages:05d}.txt",
+                "chunk_index": index % args.pages,
+            }
+            for index in range(documents * args.pages)
+        ]
+        collection = InMemoryCollection(latency=args.upload_latency)
+        # Skip __init__, which connects to Weaviate; upload_objects only needs get_collection
+        manager = DataManager.__new__(DataManager)
+        manager.get_collection = lambda name: collection
+        ok = True
+        for offset in range(0, len(records), UPLOAD_BATCH_SIZE):
+            status = manager.upload_objects("Bench", records[offset:offset + UPLOAD_BATCH_SIZE], "bench")
+            ok = ok and status.startswith("Successfully")
+        objects = len(collection.objects)
+
+    seconds = time.perf_counter() - start
+    result.update(
+        {
+            "ok": ok,
+            "objects": objects,
+            "seconds": round(seconds, 6),
+            "docs_per_sec": round(documents / seconds, 3) if seconds else None,
+            "objects_per_sec": round(objects / seconds, 3) if seconds else None,
+            "peak_rss_mb": round(peak_rss_mb(), 2),
+            "parser_calls": parser.calls,
+            "stage_seconds": stage_seconds(before, metrics.snapshot()),
+        }
+    )
+    if not ok:
+        result["error"] = f"{scenario} reported a failure; rerun with --worker to see its log"
+    return result
+
+
+def run_isolated(scenario: str, documents: int, argv: List[str]) -> Dict:
+    """Run one scenario in a subprocess with fresh scratch directories.
+
+    Args:
+        scenario: One of SCENARIOS
+        documents: Number of synthetic documents
+        argv: Command line arguments forwarded to the worker
+
+    Returns:
+        Result record
+    """
+    with tempfile.TemporaryDirectory(prefix="bench-ingestion-") as workdir:
+        result_path = os.path.join(workdir, "result.json")
+        command = [
+            sys.executable, "-m", "benchmarks.bench_ingestion", *argv,
+            "--worker", scenario, str(documents), workdir, result_path,
+        ]
+        completed = subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if completed.returncode != 0 or not os.path.exists(result_path):
+            return {
+                "scenario": scenario,
+                "documents": documents,
+                "ok": False,
+                "error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "worker failed",
+            }
+        with open(result_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def git_commit() -> Optional[str]:
+    """Return the current git commit of the repo, if available."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict], baseline_path: str, tolerance: float) -> List[str]:
+    """Compare throughput against a baseline report.
+
+    Args:
+        results: Result records of this run
+        baseline_path: Path of an earlier JSON report
+        tolerance: Allowed relative drop in docs/sec before a run counts as a regression
+
+    Returns:
+        Descriptions of the regressions found
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {
+            (record["scenario"], record["documents"]): record
+            for record in json.load(f)["results"]
+            if record.get("ok")
+        }
+
+    regressions = []
+    for record in results:
+        previous = baseline.get((record["scenario"], record["documents"]))
+        if not record.get("ok") or not previous or not previous.get("docs_per_sec"):
+            continue
+        ratio = record["docs_per_sec"] / previous["docs_per_sec"]
+        record["baseline_ratio"] = round(ratio, 3)
+        if ratio < 1 - tolerance:
+            regressions.append(
+                f"{record['scenario']} @ {record['documents']} docs: {record['docs_per_sec']} docs/s "
+                f"vs {previous['docs_per_sec']} in the baseline ({ratio:.0%})"
+            )
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline ingestion throughput benchmarks")
+    parser.add_argument("--sizes", default="10,100,1000", help="Comma-separated corpus sizes in documents")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios to run")
+    parser.add_argument("--pages", type=int, default=3, help="Pages per synthetic document")
+    parser.add_argument("--words-per-page", type=int, default=400, help="Approximate words per page")
+    parser.add_argument("--parse-latency", type=float, default=0.0, help="Seconds the fake parser waits per file")
+    parser.add_argument("--upload-latency", type=float, default=0.0, help="Seconds the fake Weaviate waits per batch")
+    parser.add_argument("--embedder", default="hashing", help="EMBEDDER used by the local vector store")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic corpora")
+    parser.add_argument("--output", help="Path of the JSON report (defaults to benchmarks/results/ingestion-<time>.json)")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare docs/sec against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative docs/sec drop against the baseline")
+    parser.add_argument("--worker", nargs=4, metavar=("SCENARIO", "DOCUMENTS", "WORKDIR", "RESULT"), help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def check_tokenizer() -> Optional[str]:
+    """Load the encoding the chunker counts tokens with.
+
+    tiktoken downloads it on first use, so an offline machine without a
+    cached copy cannot run the chunking scenarios.
+
+    Returns:
+        None if the encoding loads, otherwise an error message
+    """
+    from ingestion.chunker import get_encoding
+
+    try:
+        get_encoding()
+    except Exception as e:
+        return (
+            f"Could not load tiktoken's cl100k_base encoding ({e.__class__.__name__}: {e}). "
+            f"The {' and '.join(TOKENIZER_SCENARIOS)} scenarios need it; tiktoken downloads it on first use, "
+            "so run once with network access or set TIKTOKEN_CACHE_DIR to a directory holding a cached copy. "
+            "Use --scenarios upload_objects to benchmark uploads without it."
+        )
+    return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+
+    if args.worker:
+        scenario, documents, workdir, result_path = args.worker
+        result = run_scenario(scenario, int(documents), args, workdir)
+        with open(result_path, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return 0
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios {', '.join(sorted(unknown))}, expected {', '.join(SCENARIOS)}")
+    if set(scenarios) & set(TOKENIZER_SCENARIOS):
+        error = check_tokenizer()
+        if error:
+            raise SystemExit(error)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    forwarded = [
+        "--pages", str(args.pages),
+        "--words-per-page", str(args.words_per_page),
+        "--parse-latency", str(args.parse_latency),
+        "--upload-latency", str(args.upload_latency),
+        "--embedder", args.embedder,
+        "--seed", str(args.seed),
+    ]
+
+    results = []
+    for scenario in scenarios:
+        for documents in sizes:
+            result = run_isolated(scenario, documents, forwarded)
+            results.append(result)
+            if result.get("ok"):
+                print(
+                    f"{scenario:<24} {documents:>6} docs  {result['seconds']:>9.3f}s  "
+                    f"{result['docs_per_sec']:>10.1f} docs/s  {result['objects_per_sec']:>10.1f} objects/s  "
+                    f"peak RSS {result['peak_rss_mb']:.0f} MiB"
+                )
+            else:
+                print(f"{scenario:<24} {documents:>6} docs  FAILED: {result.get('error')}")
+
+    regressions = compare(results, args.baseline, args.tolerance) if args.baseline else []
+    report = {
+        "benchmark": "ingestion",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {
+            key: value for key, value in vars(args).items() if key not in ("worker", "output", "baseline")
+        },
+        "results": results,
+        "regressions": regressions,
+    }
+
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"ingestion-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    failed = any(not result.get("ok") for result in results)
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+"""Retrieval quality vs latency evaluation.
+
+Runs a labelled set of questions through VectorStore.query_by_text (the
+configured backend, QueryManager.query_by_text for Weaviate) under every
+combination of the given limits, search modes and hybrid alphas. For each
+configuration it reports recall@k, MRR and hit rate, plus the recall of the
+chunks that survive context assembly. It also reports the prompt tokens the
+ContextAssembler builds from the results and the retrieval latency. It then
+recommends the cheapest configuration whose quality stays within a
+tolerance of the best one.
+
+The labelled set is a JSON Lines file, one question per line:
+
+    {"tenant": "acme", "question": "What is the notice period?", "relevant_filenames": ["contract.pdf"]}
+    {"tenant": "acme", "question": "Who signs invoices?", "relevant_chunks": ["invoices.pdf#3", "<object uuid>"]}
+
+With ``relevant_chunks`` (object IDs or ``<filename>#<chunk index>``)
+relevance is judged per chunk; otherwise per file, using the logical
+filename without the upload prefix.
+
+Usage:
+    python -m benchmarks.eval_retrieval --dataset eval.jsonl --limits 2,4,8 --search-modes near_text,hybrid,bm25
+    python -m benchmarks.eval_retrieval --dataset eval.jsonl --search-modes hybrid --alphas 0.25,0.5,0.75
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.bench_ingestion import git_commit
+from benchmarks.load_chat import percentiles
+
+
+@dataclass
+class LabelledQuestion:
+    """A question with the documents or chunks that answer it.
+
+    Attributes:
+        tenant: Tenant whose documents are searched
+        question: User question
+        relevant_filenames: Logical filenames of the relevant documents
+        relevant_chunks: Relevant chunks, as object IDs or "<filename>#<chunk index>"
+    """
+
+    tenant: str
+    question: str
+    relevant_filenames: List[str] = field(default_factory=list)
+    relevant_chunks: List[str] = field(default_factory=list)
+
+
+def load_dataset(path: str) -> List[LabelledQuestion]:
+    """Load a labelled set from a JSON Lines file.
+
+    Args:
+        path: Path of the file
+
+    Returns:
+        Labelled questions
+    """
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            question = LabelledQuestion(
+                tenant=item["tenant"],
+                question=item["question"],
+                relevant_filenames=list(item.get("relevant_filenames", [])),
+                relevant_chunks=[str(chunk) for chunk in item.get("relevant_chunks", [])],
+            )
+            if not question.relevant_filenames and not question.relevant_chunks:
+                raise ValueError(f"{path}:{number} has neither relevant_filenames nor relevant_chunks")
+            questions.append(question)
+    return questions
+
+
+def relevance_keys(obj: Any, by_chunk: bool) -> List[str]:
+    """Return the keys a retrieved object may be labelled under.
+
+    Args:
+        obj: Object returned by query_by_text
+        by_chunk: Judge relevance per chunk rather than per file
+
+    Returns:
+        Object ID and "<filename>#<chunk index>" for chunks, the logical filename for files
+    """
+    from ingestion.manifest import logical_filename
+
+    filename = logical_filename(str(obj.properties.get("filename", "")))
+    if not by_chunk:
+        return [filename]
+    return [str(obj.uuid), f"{filename}#{obj.properties.get('chunk_index', '')}"]
+
+
+def score_ranking(ranked_keys: Sequence[List[str]], relevant: Sequence[str]) -> Dict[str, float]:
+    """Score one ranking against the relevant items.
+
+    Each relevant item counts once, however many retrieved objects match it
+    (several chunks of a relevant file, for instance).
+
+    Args:
+        ranked_keys: Relevance keys of each retrieved object, best ranked first
+        relevant: Relevant items
+
+    Returns:
+        {"recall", "reciprocal_rank", "hit"}
+    """
+    relevant = set(relevant)
+    found = set()
+    first_rank = None
+    for rank, keys in enumerate(ranked_keys, start=1):
+        matches = relevant.intersection(keys)
+        if matches and first_rank is None:
+            first_rank = rank
+        found.update(matches)
+    return {
+        "recall": len(found) / len(relevant) if relevant else 0.0,
+        "reciprocal_rank": 1.0 / first_rank if first_rank else 0.0,
+        "hit": 1.0 if found else 0.0,
+    }
+
+
+def mean(values: List[float]) -> float:
+    return round(sum(values) / len(values), 4) if values else 0.0
+
+
+def evaluate(
+    vector_store,
+    assembler,
+    questions: List[LabelledQuestion],
+    collection_name: str,
+    limit: int,
+    search_mode: str,
+    alpha: Optional[float],
+    repeat: int,
+) -> Dict:
+    """Evaluate one retrieval configuration.
+
+    Args:
+        vector_store: Open vector store
+        assembler: ContextAssembler building the prompts
+        questions: Labelled questions
+        collection_name: Name of the collection
+        limit: Number of chunks retrieved per question (the k of recall@k)
+        search_mode: "near_text", "hybrid" or "bm25"
+        alpha: Hybrid weighting (None for the configured HYBRID_ALPHA)
+        repeat: Times each question is queried, for steadier latency figures
+
+    Returns:
+        Configuration report
+    """
+    scores, prompt_scores, latencies, prompt_tokens, context_tokens, dropped = [], [], [], [], [], []
+    for item in questions:
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            objects = vector_store.query_by_text(
+                collection_name=collection_name,
+                tenant=item.tenant,
+                query_text=item.question,
+                limit=limit,
+                search_mode=search_mode,
+                alpha=alpha,
+            )
+            latencies.append(time.perf_counter() - start)
+
+        by_chunk = bool(item.relevant_chunks)
+        relevant = item.relevant_chunks if by_chunk else item.relevant_filenames
+        ranked = [relevance_keys(obj, by_chunk) for obj in objects]
+        scores.append(score_ranking(ranked, relevant))
+
+        # The chunks that survive the token budget are what the LLM actually sees
+        assembled = assembler.assemble(
+            query=item.question, history=[], chunks=[(str(obj.uuid), obj.properties.get("text", "")) for obj in objects]
+        )
+        included = set(assembled.chunk_ids)
+        prompt_scores.append(score_ranking([keys for obj, keys in zip(objects, ranked) if str(obj.uuid) in included], relevant))
+        prompt_tokens.append(assembled.total_tokens)
+        context_tokens.append(assembled.context_tokens)
+        dropped.append(assembled.dropped_chunks)
+
+    return {
+        "limit": limit,
+        "search_mode": search_mode,
+        "alpha": alpha,
+        "questions": len(questions),
+        "recall": mean([score["recall"] for score in scores]),
+        "mrr": mean([score["reciprocal_rank"] for score in scores]),
+        "hit_rate": mean([score["hit"] for score in scores]),
+        "prompt_recall": mean([score["recall"] for score in prompt_scores]),
+        "prompt_tokens": {"mean": mean(prompt_tokens), "max": max(prompt_tokens, default=0)},
+        "context_tokens": {"mean": mean(context_tokens), "max": max(context_tokens, default=0)},
+        "dropped_chunks": mean(dropped),
+        "latency_ms": percentiles(latencies),
+    }
+
+
+def recommend(results: List[Dict], tolerance: float) -> Optional[Dict]:
+    """Pick the cheapest configuration whose quality stays close to the best.
+
+    A configuration qualifies when both its prompt recall and its MRR are
+    within ``tolerance`` (relative) of the best values; among those the one
+    with the fewest mean prompt tokens wins, then the lowest p95 latency.
+
+    Args:
+        results: Configuration reports
+        tolerance: Allowed relative drop in prompt recall and MRR
+
+    Returns:
+        The recommended configuration report, or None without results
+    """
+    if not results:
+        return None
+    best_recall = max(result["prompt_recall"] for result in results)
+    best_mrr = max(result["mrr"] for result in results)
+    qualifying = [
+        result
+        for result in results
+        if result["prompt_recall"] >= best_recall * (1 - tolerance) and result["mrr"] >= best_mrr * (1 - tolerance)
+    ]
+    return min(
+        qualifying,
+        key=lambda result: (result["prompt_tokens"]["mean"], result["latency_ms"]["p95"] or 0.0),
+    )
+
+
+def describe(result: Dict) -> str:
+    alpha = f" alpha={result['alpha']:g}" if result["alpha"] is not None else ""
+    return f"{result['search_mode']}{alpha} limit={result['limit']}"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Retrieval quality vs latency evaluation")
+    parser.add_argument("--dataset", required=True, help="JSON Lines file of labelled questions")
+    parser.add_argument("--collection", help="Collection to search (defaults to WEAVIATE_COLLECTION_NAME)")
+    parser.add_argument("--limits", default="1,2,4,8", help="Comma-separated numbers of chunks retrieved per question")
+    parser.add_argument("--search-modes", default="near_text,hybrid,bm25", help="Comma-separated search modes")
+    parser.add_argument("--alphas", default="", help="Comma-separated hybrid alphas (defaults to HYBRID_ALPHA)")
+    parser.add_argument("--repeat", type=int, default=1, help="Times each question is queried for the latency figures")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Allowed relative quality drop of the recommended configuration")
+    parser.add_argument("--cache", action="store_true", help="Keep the retrieval cache enabled (latency then reflects cache hits)")
+    parser.add_argument("--output", help="Path of the JSON report (defaults to benchmarks/results/eval-retrieval-<time>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if not args.cache:
+        # Every configuration must reach the backend, or later ones would be timed against the cache
+        os.environ.update({"RETRIEVAL_CACHE_MAX_ENTRIES": "0", "RETRIEVAL_CACHE_PATH": ""})
+
+    from config import VECTOR_STORE, WEAVIATE_COLLECTION_NAME
+    from context_assembler import ContextAssembler
+    from ingestion.vector_store import get_vector_store
+    from ingestion.weaviate_client import SEARCH_MODES
+
+    questions = load_dataset(args.dataset)
+    limits = [int(limit) for limit in args.limits.split(",") if limit.strip()]
+    search_modes = [mode.strip() for mode in args.search_modes.split(",") if mode.strip()]
+    unknown = set(search_modes) - set(SEARCH_MODES)
+    if unknown:
+        raise SystemExit(f"Unknown search modes {', '.join(sorted(unknown))}, expected {', '.join(SEARCH_MODES)}")
+    alphas = [float(alpha) for alpha in args.alphas.split(",") if alpha.strip()] or [None]
+    collection_name = args.collection or WEAVIATE_COLLECTION_NAME
+
+    configurations = [
+        (limit, mode, alpha)
+        for limit, mode in itertools.product(limits, search_modes)
+        for alpha in (alphas if mode == "hybrid" else [None])
+    ]
+    print(f"Evaluating {len(configurations)} configurations on {len(questions)} questions ({VECTOR_STORE} vector store)")
+
+    assembler = ContextAssembler()
+    results = []
+    with get_vector_store() as vector_store:
+        for limit, mode, alpha in configurations:
+            results.append(
+                evaluate(vector_store, assembler, questions, collection_name, limit, mode, alpha, args.repeat)
+            )
+
+    print(f"{'configuration':<32} {'recall@k':>8} {'mrr':>6} {'hit':>6} {'in prompt':>9} {'tokens':>7} {'p50 ms':>7} {'p95 ms':>7}")
+    for result in results:
+        print(
+            f"{describe(result):<32} {result['recall']:>8.3f} {result['mrr']:>6.3f} {result['hit_rate']:>6.3f} "
+            f"{result['prompt_recall']:>9.3f} {result['prompt_tokens']['mean']:>7.0f} "
+            f"{result['latency_ms']['p50'] or 0:>7.1f} {result['latency_ms']['p95'] or 0:>7.1f}"
+        )
+
+    recommended = recommend(results, args.tolerance)
+    if recommended:
+        print(
+            f"Recommended: {describe(recommended)} (prompt recall {recommended['prompt_recall']:.3f}, "
+            f"MRR {recommended['mrr']:.3f}, {recommended['prompt_tokens']['mean']:.0f} prompt tokens on average)"
+        )
+
+    report = {
+        "benchmark": "eval_retrieval",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "vector_store": VECTOR_STORE,
+        "collection": collection_name,
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results,
+        "recommended": recommended,
+    }
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"eval-retrieval-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
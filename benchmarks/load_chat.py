@@ -0,0 +1,635 @@
+"""Concurrent chat load generator for the query path.
+
+Simulates concurrent chat sessions, each asking questions through
+QueryPipeline.aanswer the way app.py does: QueryManager.query_by_text,
+context assembly and LLMProvider.aquery. Weaviate and Groq are replaced by
+local stand-ins that answer after a latency drawn from a configurable
+distribution. The real Weaviate connection pool (WEAVIATE_POOL_SIZE) and LLM
+limiter (LLM_MAX_CONCURRENCY) stay in the path, so requests queue for them
+exactly as they would on a server.
+
+The load follows a ramp-up profile of stages, each a number of concurrent
+sessions held for a number of seconds. For every stage it reports
+throughput and p50/p95/p99 of the end-to-end latency, of each step
+(retrieve, assemble, llm) and of the time spent waiting for a Weaviate
+connection or an LLM slot, and it flags the first stage where queueing
+takes a noticeable share of the latency.
+
+Usage:
+    python -m benchmarks.load_chat --stages 1x10,4x10,16x20,64x20
+    python -m benchmarks.load_chat --ramp 64 --steps 8 --stage-seconds 15
+    python -m benchmarks.load_chat --llm-latency lognormal:1.5,0.4 --llm-concurrency 16 --pool-size 8
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.bench_ingestion import WORDS, git_commit
+
+# Spans of QueryPipeline reported as per-step latency
+STEP_SPANS = {"query.retrieve": "retrieve", "query.assemble": "assemble", "llm.complete": "llm"}
+
+PERCENTILES = (50, 95, 99)
+
+LOAD_TEST_URL = "https://load-test.invalid"
+LOAD_TEST_KEY = "load-test"
+
+Distribution = Callable[[random.Random], float]
+
+
+def parse_distribution(spec: str) -> Distribution:
+    """Parse a latency distribution.
+
+    Supported forms, in seconds:
+
+    - ``const:0.05``
+    - ``uniform:0.02,0.08``
+    - ``normal:0.05,0.01`` (mean, standard deviation; negative draws become 0)
+    - ``lognormal:0.05,0.5`` (median, sigma; long-tailed, like most service latencies)
+    - ``exp:0.05`` (mean)
+
+    Args:
+        spec: Distribution specification
+
+    Returns:
+        Function drawing a latency from a random generator
+    """
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(value) for value in params.split(",") if value.strip()]
+    except ValueError:
+        raise ValueError(f"Invalid latency distribution {spec!r}")
+
+    expected = {"const": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+    if kind not in expected:
+        raise ValueError(f"Unknown latency distribution {kind!r}, expected one of {', '.join(expected)}")
+    if len(values) != expected[kind]:
+        raise ValueError(f"Latency distribution {kind!r} takes {expected[kind]} parameters, got {spec!r}")
+
+    if kind == "const":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1]) if values[0] > 0 else 0.0
+    return lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+
+
+def parse_stages(spec: str) -> List[Tuple[int, float]]:
+    """Parse a ramp-up profile such as ``1x10,4x10,16x20``.
+
+    Args:
+        spec: Comma-separated ``<sessions>x<seconds>`` stages
+
+    Returns:
+        List of (concurrent sessions, seconds)
+    """
+    stages = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        sessions, _, seconds = item.strip().partition("x")
+        try:
+            stages.append((int(sessions), float(seconds)))
+        except ValueError:
+            raise ValueError(f"Invalid stage {item!r}, expected <sessions>x<seconds>")
+    if not stages or any(sessions < 1 or seconds <= 0 for sessions, seconds in stages):
+        raise ValueError(f"Invalid ramp-up profile {spec!r}")
+    return stages
+
+
+def linear_stages(max_sessions: int, steps: int, seconds: float) -> List[Tuple[int, float]]:
+    """Build a linear ramp-up from max_sessions / steps up to max_sessions sessions.
+
+    Args:
+        max_sessions: Sessions of the last stage
+        steps: Number of stages
+        seconds: Duration of each stage
+
+    Returns:
+        List of (concurrent sessions, seconds)
+    """
+    steps = max(1, min(steps, max_sessions))
+    return [(max(1, round(max_sessions * (step + 1) / steps)), seconds) for step in range(steps)]
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Compute nearest-rank percentiles and the mean, in milliseconds.
+
+    Args:
+        values: Durations in seconds
+
+    Returns:
+        {"p50", "p95", "p99", "mean"} in milliseconds (None without values)
+    """
+    if not values:
+        return {**{f"p{p}": None for p in PERCENTILES}, "mean": None}
+    ordered = sorted(values)
+    result = {
+        f"p{p}": round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] * 1000, 3)
+        for p in PERCENTILES
+    }
+    result["mean"] = round(sum(ordered) / len(ordered) * 1000, 3)
+    return result
+
+
+@dataclass
+class RequestRecord:
+    """Timings of one simulated chat message.
+
+    Attributes:
+        stage: Index of the load stage the request started in
+        session: Index of the session that sent it
+        latency: End-to-end seconds
+        finished: time.perf_counter() value when the request ended
+        steps: Seconds per pipeline step, from the spans that ended during the request
+        pool_wait: Seconds spent waiting for a Weaviate connection
+        llm_wait: Seconds spent waiting for an LLM concurrency slot
+        error: Error description of a failed request
+    """
+
+    stage: int
+    session: int
+    latency: float = 0.0
+    finished: float = 0.0
+    steps: Dict[str, float] = field(default_factory=dict)
+    pool_wait: float = 0.0
+    llm_wait: float = 0.0
+    error: Optional[str] = None
+
+
+# Request the current thread or task is working on, read by the stand-ins and the span listener
+current_request: ContextVar[Optional[RequestRecord]] = ContextVar("current_request", default=None)
+
+
+def record_step(span) -> None:
+    """Span listener adding the duration of pipeline steps to the current request."""
+    record = current_request.get()
+    step = STEP_SPANS.get(span.name)
+    if record is not None and step is not None:
+        record.steps[step] = record.steps.get(step, 0.0) + span.duration
+
+
+class LatencySource:
+    """Thread-safe draws from a latency distribution.
+
+    Attributes:
+        distribution: Latency distribution
+    """
+
+    def __init__(self, distribution: Distribution, seed: int):
+        self.distribution = distribution
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> float:
+        with self._lock:
+            return self.distribution(self._rng)
+
+
+class StandInQuery:
+    """Stand-in for ``collection.query`` returning synthetic chunks after a sampled latency."""
+
+    def __init__(self, latency: LatencySource, texts: List[str]):
+        self.latency = latency
+        self.texts = texts
+
+    def _respond(self, limit: int, vector_distance: bool) -> SimpleNamespace:
+        time.sleep(self.latency.draw())
+        objects = []
+        for rank, text in enumerate(self.texts[:limit]):
+            distance = 0.1 + 0.05 * rank if vector_distance else None
+            objects.append(
+                SimpleNamespace(
+                    uuid=uuid.uuid4(),
+                    properties={"text": text, "filename": f"doc-{rank:05d}.pdf", "chunk_index": rank},
+                    metadata=SimpleNamespace(distance=distance, score=None if vector_distance else 1.0 / (rank + 1)),
+                )
+            )
+        return SimpleNamespace(objects=objects)
+
+    def near_text(self, query, filters=None, limit=5, return_metadata=None):
+        return self._respond(limit, vector_distance=True)
+
+    def near_vector(self, near_vector, target_vector=None, filters=None, limit=5, return_metadata=None):
+        return self._respond(limit, vector_distance=True)
+
+    def hybrid(self, query, alpha=None, vector=None, filters=None, limit=5, return_metadata=None):
+        return self._respond(limit, vector_distance=False)
+
+    def bm25(self, query, filters=None, limit=5, return_metadata=None):
+        return self._respond(limit, vector_distance=False)
+
+
+class StandInWeaviateClient:
+    """Stand-in for a Weaviate client connection, as used by QueryManager.query_by_text."""
+
+    def __init__(self, latency: LatencySource, texts: List[str]):
+        collection = SimpleNamespace(query=StandInQuery(latency, texts))
+        collection.with_tenant = lambda tenant: collection
+        self.collections = SimpleNamespace(get=lambda name: collection)
+
+    def is_connected(self) -> bool:
+        return True
+
+    def is_ready(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+class StandInCompletions:
+    """Stand-in for ``AsyncGroq().chat.completions`` answering after a sampled latency."""
+
+    def __init__(self, latency: LatencySource, answer_tokens: int):
+        self.latency = latency
+        self.answer = " ".join(WORDS[index % len(WORDS)] for index in range(answer_tokens))
+        self.answer_tokens = answer_tokens
+
+    async def create(self, messages, model, **kwargs) -> SimpleNamespace:
+        await asyncio.sleep(self.latency.draw())
+        prompt_chars = sum(len(message["content"]) for message in messages)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.answer))],
+            # Roughly four characters per token; the stand-in does not tokenize
+            usage=SimpleNamespace(prompt_tokens=prompt_chars // 4, completion_tokens=self.answer_tokens),
+        )
+
+
+def install_stand_ins(args: argparse.Namespace):
+    """Wire the stand-ins into the query path and return the pipeline to load.
+
+    Must run after configure_environment, which the imported modules read.
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        QueryPipeline answering through the stand-ins
+    """
+    import llm_provider
+    from ingestion.weaviate_client import ConnectionPool, register_connection_pool
+    from query_pipeline import QueryPipeline
+    from telemetry import add_span_listener
+
+    rng = random.Random(args.seed)
+    texts = [" ".join(rng.choices(WORDS, k=args.chunk_words)) for _ in range(max(args.top_k, 1))]
+    retrieval_latency = LatencySource(parse_distribution(args.retrieval_latency), args.seed + 1)
+    llm_latency = LatencySource(parse_distribution(args.llm_latency), args.seed + 2)
+
+    class StandInConnectionPool(ConnectionPool):
+        """Connection pool handing out stand-in connections and timing the wait for one."""
+
+        def acquire(self, timeout: Optional[float] = None):
+            start = time.perf_counter()
+            try:
+                return super().acquire(timeout)
+            finally:
+                record = current_request.get()
+                if record is not None:
+                    record.pool_wait += time.perf_counter() - start
+
+        def _connect(self):
+            return StandInWeaviateClient(retrieval_latency, texts)
+
+    class TimedConcurrencyLimiter(llm_provider.ConcurrencyLimiter):
+        """LLM limiter timing the wait for a slot."""
+
+        async def __aenter__(self):
+            start = time.perf_counter()
+            try:
+                return await super().__aenter__()
+            finally:
+                record = current_request.get()
+                if record is not None:
+                    record.llm_wait += time.perf_counter() - start
+
+    class StandInLLMProvider(llm_provider.LLMProvider):
+        """LLMProvider whose async client is the stand-in."""
+
+        def _get_async_client(self):
+            return SimpleNamespace(chat=SimpleNamespace(completions=StandInCompletions(llm_latency, args.answer_tokens)))
+
+    register_connection_pool(StandInConnectionPool(LOAD_TEST_URL, LOAD_TEST_KEY))
+    # _with_retries looks the limiter up at call time, so replacing the module attribute is enough
+    llm_provider.llm_limiter = TimedConcurrencyLimiter(llm_provider.LLM_MAX_CONCURRENCY)
+    add_span_listener(record_step)
+
+    return QueryPipeline(StandInLLMProvider(), collection_name="LoadTest", top_k=args.top_k, search_mode=args.search_mode)
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Point the configuration at the stand-ins; must run before the repo modules are imported.
+
+    Args:
+        args: Parsed command line arguments
+    """
+    overrides = {
+        "VECTOR_STORE": "weaviate",
+        "WEAVIATE_REST_URL": LOAD_TEST_URL,
+        "WEAVIATE_API_KEY": LOAD_TEST_KEY,
+        "WEAVIATE_COLLECTION_NAME": "LoadTest",
+        "GROQ_API_KEY": LOAD_TEST_KEY,
+        "EMBEDDER": args.embedder,
+        "EMBEDDING_CACHE_PATH": "",
+        "RETRIEVAL_CACHE_PATH": "",
+    }
+    if not args.cache:
+        # Every question reaches the stand-ins; pass --cache to measure with the configured caches
+        overrides.update({"RETRIEVAL_CACHE_MAX_ENTRIES": "0", "ANSWER_CACHE_MAX_ENTRIES": "0"})
+    if args.pool_size:
+        overrides["WEAVIATE_POOL_SIZE"] = str(args.pool_size)
+    if args.llm_concurrency:
+        overrides["LLM_MAX_CONCURRENCY"] = str(args.llm_concurrency)
+    os.environ.update(overrides)
+
+
+class LoadController:
+    """Shared view of the load profile: which stage runs and how many sessions are active.
+
+    Attributes:
+        stages: List of (concurrent sessions, seconds)
+        stage: Index of the current stage, len(stages) once the run is over
+    """
+
+    def __init__(self, stages: List[Tuple[int, float]]):
+        self.stages = stages
+        self.stage = 0
+        self.stopped = threading.Event()
+
+    @property
+    def active_sessions(self) -> int:
+        return self.stages[self.stage][0] if self.stage < len(self.stages) else 0
+
+    def run(self) -> List[Tuple[float, float]]:
+        """Advance through the stages in real time.
+
+        Returns:
+            Actual (start, end) perf_counter values of each stage
+        """
+        windows = []
+        for index, (_, seconds) in enumerate(self.stages):
+            self.stage = index
+            start = time.perf_counter()
+            time.sleep(seconds)
+            windows.append((start, time.perf_counter()))
+        self.stage = len(self.stages)
+        self.stopped.set()
+        return windows
+
+
+def run_session(
+    index: int,
+    pipeline,
+    controller: LoadController,
+    records: List[RequestRecord],
+    args: argparse.Namespace,
+) -> None:
+    """Send chat messages while the session is part of the active load.
+
+    Each message runs in its own event loop, as app.py does for every chat
+    message, and carries the session's recent history.
+
+    Args:
+        index: Session index; the session is active while it is below the stage's session count
+        pipeline: QueryPipeline to query
+        controller: Load controller
+        records: List the request records are appended to
+        args: Parsed command line arguments
+    """
+    rng = random.Random(args.seed * 7919 + index)
+    think_time = parse_distribution(args.think_time)
+    tenant = f"tenant-{index % args.tenants}"
+    history: List[Dict[str, str]] = []
+
+    while not controller.stopped.is_set():
+        stage = controller.stage
+        if index >= controller.active_sessions:
+            controller.stopped.wait(0.05)
+            continue
+
+        question = f"What does the {rng.choice(WORDS)} {rng.choice(WORDS)} clause say about item {rng.randrange(args.questions)}?"
+        record = RequestRecord(stage=stage, session=index)
+        token = current_request.set(record)
+        start = time.perf_counter()
+        try:
+            answer = asyncio.run(pipeline.aanswer(query=question, tenant=tenant, history=history))
+            history = (history + [{"role": "user", "content": question}, {"role": "assistant", "content": answer}])[-6:]
+        except Exception as e:
+            record.error = f"{e.__class__.__name__}: {e}"
+        finally:
+            current_request.reset(token)
+        record.finished = time.perf_counter()
+        record.latency = record.finished - start
+        records.append(record)
+
+        pause = think_time(rng)
+        if pause:
+            controller.stopped.wait(pause)
+
+
+def summarize_stage(
+    index: int,
+    sessions: int,
+    window: Tuple[float, float],
+    records: List[RequestRecord],
+) -> Dict:
+    """Aggregate one stage.
+
+    Latencies are those of the requests that started in the stage;
+    throughput counts the requests that completed during it, so requests
+    still running when the load steps up are not credited to the lighter stage.
+
+    Args:
+        index: Stage index
+        sessions: Concurrent sessions of the stage
+        window: (start, end) perf_counter values of the stage
+        records: Every request of the run
+
+    Returns:
+        Stage report
+    """
+    ok = [record for record in records if record.stage == index and record.error is None]
+    errors = sum(1 for record in records if record.stage == index and record.error is not None)
+    completed = sum(1 for record in records if record.error is None and window[0] <= record.finished < window[1])
+    seconds = window[1] - window[0]
+    steps = sorted({step for record in ok for step in record.steps})
+    end_to_end = percentiles([record.latency for record in ok])
+    waits = {
+        "weaviate_pool": percentiles([record.pool_wait for record in ok]),
+        "llm_slot": percentiles([record.llm_wait for record in ok]),
+    }
+    mean_wait = sum(record.pool_wait + record.llm_wait for record in ok) / len(ok) if ok else 0.0
+    return {
+        "stage": index,
+        "sessions": sessions,
+        "seconds": round(seconds, 3),
+        "requests": len(ok),
+        "errors": errors,
+        "throughput_rps": round(completed / seconds, 3) if seconds else None,
+        "latency_ms": end_to_end,
+        "step_latency_ms": {step: percentiles([record.steps.get(step, 0.0) for record in ok]) for step in steps},
+        "queue_wait_ms": waits,
+        "queue_share": round(mean_wait * 1000 / end_to_end["mean"], 4) if end_to_end["mean"] else 0.0,
+    }
+
+
+def find_queueing(stages: List[Dict], threshold: float) -> Optional[Dict]:
+    """Find the first stage where requests spend a noticeable share of their time queueing.
+
+    Args:
+        stages: Stage reports
+        threshold: Share of the mean latency spent waiting that counts as queueing
+
+    Returns:
+        {"stage", "sessions", "queue_share", "bottleneck"} of that stage, or None if there is none
+    """
+    for stage in stages:
+        if stage["requests"] and stage["queue_share"] >= threshold:
+            waits = stage["queue_wait_ms"]
+            bottleneck = max(waits, key=lambda name: waits[name]["mean"] or 0.0)
+            return {
+                "stage": stage["stage"],
+                "sessions": stage["sessions"],
+                "queue_share": stage["queue_share"],
+                "bottleneck": bottleneck,
+            }
+    return None
+
+
+def format_ms(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Concurrent chat load generator for the query path")
+    parser.add_argument("--stages", default="1x10,2x10,4x10,8x10,16x10,32x10", help="Ramp-up profile as <sessions>x<seconds>,...")
+    parser.add_argument("--ramp", type=int, help="Linear ramp-up to this many sessions instead of --stages")
+    parser.add_argument("--steps", type=int, default=8, help="Number of stages of a linear ramp-up")
+    parser.add_argument("--stage-seconds", type=float, default=10.0, help="Duration of each stage of a linear ramp-up")
+    parser.add_argument("--retrieval-latency", default="lognormal:0.05,0.4", help="Latency of the Weaviate stand-in per query")
+    parser.add_argument("--llm-latency", default="lognormal:1.0,0.4", help="Latency of the Groq stand-in per completion")
+    parser.add_argument("--think-time", default="const:0", help="Pause of a session between its messages")
+    parser.add_argument("--pool-size", type=int, help="WEAVIATE_POOL_SIZE for the run (defaults to the configured one)")
+    parser.add_argument("--llm-concurrency", type=int, help="LLM_MAX_CONCURRENCY for the run (defaults to the configured one)")
+    parser.add_argument("--top-k", type=int, default=4, help="Chunks retrieved per question")
+    parser.add_argument("--search-mode", help="Search mode (defaults to SEARCH_MODE)")
+    parser.add_argument("--chunk-words", type=int, default=350, help="Words per retrieved chunk")
+    parser.add_argument("--answer-tokens", type=int, default=200, help="Tokens per stand-in answer")
+    parser.add_argument("--embedder", default="", help="EMBEDDER for client-side query embeddings (default: server-side)")
+    parser.add_argument("--tenants", type=int, default=4, help="Number of tenants the sessions are spread over")
+    parser.add_argument("--questions", type=int, default=50, help="Distinct questions per clause, which matters with --cache")
+    parser.add_argument("--cache", action="store_true", help="Keep the retrieval and answer caches enabled")
+    parser.add_argument("--queue-threshold", type=float, default=0.1, help="Share of latency spent waiting that counts as queueing")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", help="Path of the JSON report (defaults to benchmarks/results/load-chat-<time>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    stages = linear_stages(args.ramp, args.steps, args.stage_seconds) if args.ramp else parse_stages(args.stages)
+    for spec in (args.retrieval_latency, args.llm_latency, args.think_time):
+        parse_distribution(spec)
+
+    configure_environment(args)
+    import logging
+    # QueryPipeline logs the prompt token counts of every message
+    logging.getLogger("query_pipeline").setLevel(logging.WARNING)
+    pipeline = install_stand_ins(args)
+    from config import LLM_MAX_CONCURRENCY, WEAVIATE_POOL_SIZE
+
+    controller = LoadController(stages)
+    records: List[RequestRecord] = []
+    max_sessions = max(sessions for sessions, _ in stages)
+    threads = [
+        threading.Thread(
+            target=run_session,
+            args=(index, pipeline, controller, records, args),
+            name=f"session-{index}",
+            daemon=True,
+        )
+        for index in range(max_sessions)
+    ]
+    print(
+        f"Load profile: {', '.join(f'{sessions} sessions x {seconds:g}s' for sessions, seconds in stages)} "
+        f"(pool size {WEAVIATE_POOL_SIZE}, LLM concurrency {LLM_MAX_CONCURRENCY})"
+    )
+    for thread in threads:
+        thread.start()
+    windows = controller.run()
+    for thread in threads:
+        thread.join()
+
+    stage_reports = [
+        summarize_stage(index, sessions, windows[index], records)
+        for index, (sessions, _) in enumerate(stages)
+    ]
+    print(f"{'sessions':>8} {'req/s':>8} {'p50':>7} {'p95':>7} {'p99':>7}  {'retrieve p95':>12} {'llm p95':>8} {'pool wait p95':>13} {'llm wait p95':>12}  errors")
+    for stage in stage_reports:
+        latency, steps, waits = stage["latency_ms"], stage["step_latency_ms"], stage["queue_wait_ms"]
+        print(
+            f"{stage['sessions']:>8} {stage['throughput_rps'] or 0:>8.2f} {format_ms(latency['p50']):>7} "
+            f"{format_ms(latency['p95']):>7} {format_ms(latency['p99']):>7}  "
+            f"{format_ms(steps.get('retrieve', {}).get('p95')):>12} {format_ms(steps.get('llm', {}).get('p95')):>8} "
+            f"{format_ms(waits['weaviate_pool']['p95']):>13} {format_ms(waits['llm_slot']['p95']):>12}  {stage['errors']}"
+        )
+
+    queueing = find_queueing(stage_reports, args.queue_threshold)
+    if queueing:
+        print(
+            f"Queueing starts at {queueing['sessions']} sessions: {queueing['queue_share']:.0%} of the latency "
+            f"is spent waiting, mostly for {'a Weaviate connection' if queueing['bottleneck'] == 'weaviate_pool' else 'an LLM slot'}"
+        )
+    else:
+        print(f"No queueing above {args.queue_threshold:.0%} of the latency at any stage")
+
+    errors = [record.error for record in records if record.error]
+    if errors:
+        print(f"{len(errors)} requests failed, e.g. {errors[0]}")
+
+    report = {
+        "benchmark": "load_chat",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "parameters": {
+            **{key: value for key, value in vars(args).items() if key != "output"},
+            "stages": [list(stage) for stage in stages],
+            "weaviate_pool_size": WEAVIATE_POOL_SIZE,
+            "llm_max_concurrency": LLM_MAX_CONCURRENCY,
+        },
+        "stages": stage_reports,
+        "queueing": queueing,
+    }
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"load-chat-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {output}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
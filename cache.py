@@ -0,0 +1,411 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, MutableMapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import CACHE_GENERATION_DIR
+
+# Every cache registers itself here so ingestion can invalidate a tenant everywhere at once
+_registry: "weakref.WeakSet" = weakref.WeakSet()
+
+# tenant -> generation, used when CACHE_GENERATION_DIR is empty; callers put the generation in
+# their cache keys so a result computed from data read before an invalidation is never looked up again
+_generations: Dict[str, str] = {}
+_generations_lock = threading.Lock()
+
+_MISSING = object()
+
+
+class TTLLRUCache:
+    """Thread-safe cache with a time-to-live per entry and LRU eviction.
+
+    Entries can be tagged with a tenant so that everything cached for that
+    tenant is dropped when its data changes. Values live in ``store``, a plain
+    dict by default; any MutableMapping with string keys (e.g. a ``shelve``
+    shelf) can be passed to keep entries in a local store across restarts.
+
+    Attributes:
+        name: Name used when reporting metrics
+        max_entries: Maximum number of entries before the least recently used is evicted
+        ttl_seconds: Seconds an entry stays valid
+        hits: Number of lookups served from the cache
+        misses: Number of lookups not found or expired
+        evictions: Number of entries evicted to respect max_entries
+        invalidations: Number of entries dropped by tenant invalidation
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        ttl_seconds: float = 300,
+        store: Optional[MutableMapping[str, Any]] = None,
+    ):
+        """Initialize the cache.
+
+        Args:
+            name: Name used when reporting metrics
+            max_entries: Maximum number of entries
+            ttl_seconds: Seconds an entry stays valid
+            store: Optional mapping holding the entries (defaults to an in-memory dict)
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._lock = threading.RLock()
+        self._store = store if store is not None else {}
+        # key id -> (expires_at, tenant, size in bytes), in LRU order
+        self._entries: "OrderedDict[str, Tuple[float, Optional[str], int]]" = OrderedDict()
+
+        # Rebuild the bookkeeping for entries already present in a persistent store
+        for key_id, (expires_at, tenant, size, _) in list(self._store.items()):
+            self._entries[key_id] = (expires_at, tenant, size)
+        self._evict()
+
+        _registry.add(self)
+
+    @staticmethod
+    def make_key_id(key: Hashable) -> str:
+        """Turn a cache key into the string id used in the store.
+
+        Args:
+            key: Any hashable key with a stable repr
+
+        Returns:
+            SHA-256 hex digest of the key's repr
+        """
+        return hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for a key, or ``default`` if missing or expired.
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+
+        Returns:
+            Cached value or default
+        """
+        key_id = self.make_key_id(key)
+        with self._lock:
+            entry = self._entries.get(key_id)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            if entry[0] < time.time():
+                self._remove(key_id)
+                self.misses += 1
+                return default
+
+            item = self._store.get(key_id, _MISSING)
+            if item is _MISSING:
+                self._entries.pop(key_id, None)
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key_id)
+            self.hits += 1
+            return item[3]
+
+    def set(self, key: Hashable, value: Any, tenant: Optional[str] = None) -> None:
+        """Cache a value, evicting the least recently used entries if needed.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+            tenant: Optional tenant the value belongs to, for invalidation
+        """
+        key_id = self.make_key_id(key)
+        expires_at = time.time() + self.ttl_seconds
+        size = self._size_of(value)
+        with self._lock:
+            self._store[key_id] = (expires_at, tenant, size, value)
+            self._entries[key_id] = (expires_at, tenant, size)
+            self._entries.move_to_end(key_id)
+            self._evict()
+
+    def invalidate_tenant(self, tenant: str) -> int:
+        """Drop every entry tagged with a tenant.
+
+        Args:
+            tenant: Tenant whose entries should be dropped
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            key_ids = [key_id for key_id, entry in self._entries.items() if entry[1] == tenant]
+            for key_id in key_ids:
+                self._remove(key_id)
+            self.invalidations += len(key_ids)
+            return len(key_ids)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            for key_id in list(self._entries):
+                self._remove(key_id)
+
+    def close(self) -> None:
+        """Close the store if it can be closed (e.g. flush a ``shelve`` shelf to disk)."""
+        with self._lock:
+            close = getattr(self._store, "close", None)
+            if close is not None:
+                close()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the cache metrics.
+
+        Returns:
+            Dictionary with hits, misses, evictions, invalidations, entries and bytes
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": sum(entry[2] for entry in self._entries.values()),
+            }
+
+    def _remove(self, key_id: str) -> None:
+        self._entries.pop(key_id, None)
+        self._store.pop(key_id, None)
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            key_id = next(iter(self._entries))
+            self._remove(key_id)
+            self.evictions += 1
+
+    @staticmethod
+    def _size_of(value: Any) -> int:
+        # A cheap estimate: the value plus, for containers, their direct items
+        size = sys.getsizeof(value)
+        if isinstance(value, dict):
+            size += sum(sys.getsizeof(key) + sys.getsizeof(item) for key, item in value.items())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            size += sum(sys.getsizeof(item) for item in value)
+        return size
+
+
+class SemanticCache:
+    """Cache that matches lookups by embedding distance instead of exact keys.
+
+    Entries live in scopes (e.g. a tenant plus the IDs of the chunks an answer
+    was built from); a lookup returns the value of the closest entry in its
+    scope when the cosine distance is at most ``max_distance``.
+
+    Attributes:
+        name: Name used when reporting metrics
+        max_entries: Maximum number of entries across all scopes
+        max_distance: Maximum cosine distance for a lookup to count as a hit
+        ttl_seconds: Seconds an entry stays valid
+        hits: Number of lookups served from the cache
+        misses: Number of lookups without a close enough entry
+        evictions: Number of entries evicted to respect max_entries
+        invalidations: Number of entries dropped by tenant invalidation
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024, max_distance: float = 0.05, ttl_seconds: float = 300):
+        """Initialize the cache.
+
+        Args:
+            name: Name used when reporting metrics
+            max_entries: Maximum number of entries across all scopes
+            max_distance: Maximum cosine distance for a lookup to count as a hit
+            ttl_seconds: Seconds an entry stays valid
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._lock = threading.RLock()
+        # scope -> list of (unit vector, value, expires_at, tenant), oldest first
+        self._scopes: Dict[Hashable, List[Tuple[np.ndarray, Any, float, Optional[str]]]] = {}
+        self._size = 0
+
+        _registry.add(self)
+
+    def get(self, scope: Hashable, vector: Sequence[float], default: Any = None) -> Any:
+        """Return the value of the closest entry in a scope, or ``default``.
+
+        Args:
+            scope: Scope to search
+            vector: Embedding of the lookup
+            default: Value returned on a miss
+
+        Returns:
+            Cached value or default
+        """
+        query = self._unit(vector)
+        now = time.time()
+        with self._lock:
+            entries = [entry for entry in self._scopes.get(scope, []) if entry[2] >= now]
+            self._replace_scope(scope, entries)
+            if entries:
+                similarities = np.stack([entry[0] for entry in entries]) @ query
+                best = int(np.argmax(similarities))
+                if 1.0 - float(similarities[best]) <= self.max_distance:
+                    # Move the hit to the end so it is evicted last
+                    entries.append(entries.pop(best))
+                    self.hits += 1
+                    return entries[-1][1]
+            self.misses += 1
+            return default
+
+    def set(self, scope: Hashable, vector: Sequence[float], value: Any, tenant: Optional[str] = None) -> None:
+        """Cache a value under an embedding in a scope.
+
+        Args:
+            scope: Scope the entry belongs to
+            vector: Embedding the entry is matched by
+            value: Value to cache
+            tenant: Optional tenant the value belongs to, for invalidation
+        """
+        entry = (self._unit(vector), value, time.time() + self.ttl_seconds, tenant)
+        with self._lock:
+            self._scopes.setdefault(scope, []).append(entry)
+            self._size += 1
+            while self._size > self.max_entries:
+                # Evict the oldest entry of the scope holding the oldest expiry
+                oldest_scope = min(self._scopes, key=lambda key: self._scopes[key][0][2])
+                self._scopes[oldest_scope].pop(0)
+                if not self._scopes[oldest_scope]:
+                    del self._scopes[oldest_scope]
+                self._size -= 1
+                self.evictions += 1
+
+    def invalidate_tenant(self, tenant: str) -> int:
+        """Drop every entry tagged with a tenant.
+
+        Args:
+            tenant: Tenant whose entries should be dropped
+
+        Returns:
+            Number of entries dropped
+        """
+        dropped = 0
+        with self._lock:
+            for scope in list(self._scopes):
+                kept = [entry for entry in self._scopes[scope] if entry[3] != tenant]
+                dropped += len(self._scopes[scope]) - len(kept)
+                self._replace_scope(scope, kept)
+            self.invalidations += dropped
+        return dropped
+
+    def stats(self) -> Dict[str, int]:
+        """Return the cache metrics.
+
+        Returns:
+            Dictionary with hits, misses, evictions, invalidations, entries and bytes
+        """
+        with self._lock:
+            entries = [entry for scope in self._scopes.values() for entry in scope]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(entries),
+                "bytes": sum(entry[0].nbytes + sys.getsizeof(entry[1]) for entry in entries),
+            }
+
+    def _replace_scope(self, scope: Hashable, entries: List) -> None:
+        self._size += len(entries) - len(self._scopes.get(scope, []))
+        if entries:
+            self._scopes[scope] = entries
+        else:
+            self._scopes.pop(scope, None)
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+
+def _generation_path(tenant: str, generation_dir: str) -> str:
+    return os.path.join(generation_dir, hashlib.sha256(tenant.encode("utf-8")).hexdigest())
+
+
+def tenant_generation(tenant: Optional[str], generation_dir: str = CACHE_GENERATION_DIR) -> str:
+    """Return the current cache generation of a tenant, which changes on every invalidation.
+
+    Include it in a cache key, read before the data the value is computed
+    from: a lookup racing with an upload then caches its result under the
+    previous generation, which later lookups no longer use. Generations are
+    kept in ``generation_dir``, so they survive restarts (keeping persistent
+    stores consistent) and invalidations by other processes, such as the
+    bulk-ingestion command, reach this one.
+
+    Args:
+        tenant: Tenant name
+        generation_dir: Directory holding one generation file per tenant (empty keeps
+            them in memory, for this process only)
+
+    Returns:
+        Current generation of the tenant
+    """
+    tenant = tenant or ""
+    if not generation_dir:
+        with _generations_lock:
+            return _generations.get(tenant, "")
+    try:
+        with open(_generation_path(tenant, generation_dir), "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return ""
+
+
+def invalidate_tenant(tenant: str, generation_dir: str = CACHE_GENERATION_DIR) -> int:
+    """Drop everything cached for a tenant in every cache and start a new generation.
+
+    Args:
+        tenant: Tenant whose entries should be dropped
+        generation_dir: Directory holding one generation file per tenant (see tenant_generation)
+
+    Returns:
+        Total number of entries dropped
+    """
+    # A random generation needs no read-modify-write, so concurrent processes cannot lose a bump
+    generation = uuid.uuid4().hex
+    if generation_dir:
+        os.makedirs(generation_dir, exist_ok=True)
+        path = _generation_path(tenant, generation_dir)
+        tmp_path = f"{path}.{generation}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(generation)
+        os.replace(tmp_path, path)
+    else:
+        with _generations_lock:
+            _generations[tenant] = generation
+    return sum(cache.invalidate_tenant(tenant) for cache in list(_registry))
+
+
+def get_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Return the metrics of every cache, keyed by cache name.
+
+    Returns:
+        Dictionary of cache name to its metrics
+    """
+    return {cache.name: cache.stats() for cache in list(_registry)}
@@ -3,16 +3,79 @@ load_dotenv()
 import os
 
 
-LOCAL_FILE_INPUT_DIR=os.getenv("LOCAL_FILE_INPUT_DIR")
-LOCAL_FILE_OUTPUT_DIR=os.getenv("LOCAL_FILE_OUTPUT_DIR")
+LOCAL_FILE_INPUT_DIR=os.getenv("LOCAL_FILE_INPUT_DIR", "./input_docs/")
+LOCAL_FILE_OUTPUT_DIR=os.getenv("LOCAL_FILE_OUTPUT_DIR", "./output_docs/")
 
 LLAMAPARSE_API_KEY=os.getenv("LLAMAPARSE_API_KEY")
 
 WEAVIATE_REST_URL=os.getenv("WEAVIATE_REST_URL")
 WEAVIATE_API_KEY=os.getenv("WEAVIATE_API_KEY")
 WEAVIATE_COLLECTION_NAME=os.getenv("WEAVIATE_COLLECTION_NAME")
+WEAVIATE_POOL_SIZE=int(os.getenv("WEAVIATE_POOL_SIZE", 4))
+WEAVIATE_HEALTH_CHECK_INTERVAL=float(os.getenv("WEAVIATE_HEALTH_CHECK_INTERVAL", 30))
+
+VECTOR_STORE=os.getenv("VECTOR_STORE", "weaviate")
+LOCAL_VECTOR_STORE_DIR=os.getenv("LOCAL_VECTOR_STORE_DIR", "./.vector_store/")
+EMBEDDER=os.getenv("EMBEDDER", "")
+EMBEDDING_MODEL=os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_DIMENSION=int(os.getenv("EMBEDDING_DIMENSION", 384))
+EMBEDDING_BATCH_SIZE=int(os.getenv("EMBEDDING_BATCH_SIZE", 256))
+EMBEDDING_CACHE_PATH=os.getenv("EMBEDDING_CACHE_PATH", "./.embedding_cache/embeddings.sqlite")
+
+RETRIEVAL_CACHE_MAX_ENTRIES=int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", 1024))
+RETRIEVAL_CACHE_TTL=float(os.getenv("RETRIEVAL_CACHE_TTL", 300))
+RETRIEVAL_CACHE_PATH=os.getenv("RETRIEVAL_CACHE_PATH")
+CACHE_GENERATION_DIR=os.getenv("CACHE_GENERATION_DIR", "./.cache_generations/")
 
 GROQ_API_KEY=os.getenv("GROQ_API_KEY")
+LLM_TIMEOUT=float(os.getenv("LLM_TIMEOUT", 60))
+LLM_MAX_RETRIES=int(os.getenv("LLM_MAX_RETRIES", 4))
+LLM_BACKOFF_BASE=float(os.getenv("LLM_BACKOFF_BASE", 1.0))
+LLM_MAX_CONCURRENCY=int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+SUMMARY_GROUP_TOKENS=int(os.getenv("SUMMARY_GROUP_TOKENS", 6000))
+SUMMARY_FALLBACK_TOKENS=int(os.getenv("SUMMARY_FALLBACK_TOKENS", 200))
+
+ANSWER_CACHE_MAX_ENTRIES=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1024))
+ANSWER_CACHE_TTL=float(os.getenv("ANSWER_CACHE_TTL", 600))
+ANSWER_CACHE_SEMANTIC_DISTANCE=float(os.getenv("ANSWER_CACHE_SEMANTIC_DISTANCE", 0.05))
 
 TOP_K = os.getenv("TOP_K", 2)
+SEARCH_MODE=os.getenv("SEARCH_MODE", "near_text")
+HYBRID_ALPHA=float(os.getenv("HYBRID_ALPHA", 0.5))
+
+CONTEXT_MAX_TOKENS=int(os.getenv("CONTEXT_MAX_TOKENS", 6000))
+CONTEXT_HISTORY_SHARE=float(os.getenv("CONTEXT_HISTORY_SHARE", 0.25))
+CONTEXT_HISTORY_MESSAGES=int(os.getenv("CONTEXT_HISTORY_MESSAGES", 6))
+CONTEXT_MIN_CHUNK_TOKENS=int(os.getenv("CONTEXT_MIN_CHUNK_TOKENS", 64))
+
+PARSE_CONCURRENCY=int(os.getenv("PARSE_CONCURRENCY", 4))
+PARSE_CACHE_DIR=os.getenv("PARSE_CACHE_DIR", "./.parse_cache/")
+PARSE_CACHE_MAX_BYTES=int(os.getenv("PARSE_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+
+INGEST_QUEUE_SIZE=int(os.getenv("INGEST_QUEUE_SIZE", 8))
+UPLOAD_BATCH_SIZE=int(os.getenv("UPLOAD_BATCH_SIZE", 100))
+UPLOAD_MAX_RETRIES=int(os.getenv("UPLOAD_MAX_RETRIES", 3))
+UPLOAD_BACKOFF_BASE=float(os.getenv("UPLOAD_BACKOFF_BASE", 1.0))
+MANIFEST_DIR=os.getenv("MANIFEST_DIR", "./.manifests/")
+JOB_MAX_WORKERS=int(os.getenv("JOB_MAX_WORKERS", 2))
+JOBS_DIR=os.getenv("JOBS_DIR", "./.jobs/")
+JOB_POLL_INTERVAL=float(os.getenv("JOB_POLL_INTERVAL", 1.0))
+JOB_RETENTION_HOURS=float(os.getenv("JOB_RETENTION_HOURS", 168))
+INGEST_STATE_DIR=os.getenv("INGEST_STATE_DIR", "./.ingest/")
+
+INGEST_EXPORT_DIR=os.getenv("INGEST_EXPORT_DIR")
+INGEST_EXPORT_COMPRESS=os.getenv("INGEST_EXPORT_COMPRESS", "false").lower() == "true"
+
+CHUNK_SIZE=int(os.getenv("CHUNK_SIZE", 512))
+CHUNK_OVERLAP=int(os.getenv("CHUNK_OVERLAP", 64))
+
+TELEMETRY_LOG_PATH=os.getenv("TELEMETRY_LOG_PATH", "")
+TELEMETRY_TEXTFILE_PATH=os.getenv("TELEMETRY_TEXTFILE_PATH", "")
+TELEMETRY_HTTP_PORT=int(os.getenv("TELEMETRY_HTTP_PORT", 0))
+TELEMETRY_EXPORT_INTERVAL=float(os.getenv("TELEMETRY_EXPORT_INTERVAL", 15))
 
+PROFILE_ENABLED=os.getenv("PROFILE_ENABLED", "false").lower() == "true"
+PROFILE_TENANTS=os.getenv("PROFILE_TENANTS", "")
+PROFILE_MODE=os.getenv("PROFILE_MODE", "sampling")
+PROFILE_SAMPLE_INTERVAL=float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))
+PROFILE_DIR=os.getenv("PROFILE_DIR", "./.profiles/")
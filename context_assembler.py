@@ -0,0 +1,195 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from config import (
+    CONTEXT_HISTORY_MESSAGES,
+    CONTEXT_HISTORY_SHARE,
+    CONTEXT_MAX_TOKENS,
+    CONTEXT_MIN_CHUNK_TOKENS,
+)
+from ingestion.chunker import count_tokens
+from llm_provider import QUERY_SYSTEM_PROMPT, truncate_to_tokens
+
+
+@dataclass
+class AssembledContext:
+    """Prompt produced by the ContextAssembler together with its token accounting.
+
+    Attributes:
+        prompt: Final user message sent to the LLM
+        chunk_ids: IDs of the retrieved chunks included in the prompt
+        system_tokens: Tokens in the system prompt
+        query_tokens: Tokens in the user question
+        history_tokens: Tokens of conversation history included
+        context_tokens: Tokens of retrieved chunks included
+        total_tokens: Tokens of the system prompt plus the final prompt
+        dropped_chunks: Number of retrieved chunks left out entirely
+        truncated_chunks: Number of retrieved chunks cut short to fit
+    """
+
+    prompt: str
+    chunk_ids: List[str] = field(default_factory=list)
+    system_tokens: int = 0
+    query_tokens: int = 0
+    history_tokens: int = 0
+    context_tokens: int = 0
+    total_tokens: int = 0
+    dropped_chunks: int = 0
+    truncated_chunks: int = 0
+
+
+class ContextAssembler:
+    """Build the query prompt within a fixed token budget.
+
+    The budget left after the system prompt, the question and the prompt
+    template is split between conversation history and retrieved chunks.
+    History may use up to ``history_share`` of it (most recent messages
+    first); chunks get the rest plus whatever history leaves unused. Chunks
+    are added in rank order; the first one that does not fit is truncated if
+    at least ``min_chunk_tokens`` remain, and every lower-ranked chunk is dropped.
+    Separators between chunks and history lines and the history header count
+    against the budget; if the rendered prompt still exceeds it (tokens do
+    not add up exactly across piece boundaries), the lowest-ranked chunks and
+    then the oldest history lines are dropped until it fits.
+
+    Attributes:
+        max_tokens: Token budget for the system prompt plus the user message
+        history_share: Maximum share of the free budget given to history
+        history_messages: Maximum number of past messages considered
+        min_chunk_tokens: Smallest remaining budget worth filling with a truncated chunk
+        system_prompt: System prompt the question is sent with
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = CONTEXT_MAX_TOKENS,
+        history_share: float = CONTEXT_HISTORY_SHARE,
+        history_messages: int = CONTEXT_HISTORY_MESSAGES,
+        min_chunk_tokens: int = CONTEXT_MIN_CHUNK_TOKENS,
+        system_prompt: str = QUERY_SYSTEM_PROMPT,
+    ):
+        """Initialize the assembler.
+
+        Args:
+            max_tokens: Token budget for the system prompt plus the user message
+            history_share: Maximum share of the free budget given to history
+            history_messages: Maximum number of past messages considered
+            min_chunk_tokens: Smallest remaining budget worth filling with a truncated chunk
+            system_prompt: System prompt the question is sent with
+        """
+        self.max_tokens = max_tokens
+        self.history_share = history_share
+        self.history_messages = history_messages
+        self.min_chunk_tokens = min_chunk_tokens
+        self.system_prompt = system_prompt
+
+    def assemble(
+        self,
+        query: str,
+        history: List[Dict[str, str]],
+        chunks: List[Tuple[str, str]],
+    ) -> AssembledContext:
+        """Assemble the prompt for a question.
+
+        Args:
+            query: User question
+            history: Previous messages, oldest first, as {"role", "content"} dictionaries
+            chunks: Retrieved (chunk_id, text) pairs, best ranked first
+
+        Returns:
+            AssembledContext: Final prompt and token counts
+        """
+        system_tokens = count_tokens(self.system_prompt)
+        query_tokens = count_tokens(query)
+        template_tokens = count_tokens(self._render(query, "", []))
+        available = max(0, self.max_tokens - system_tokens - template_tokens)
+        chunk_separator_tokens = count_tokens("\n\n")
+        line_separator_tokens = count_tokens("\n")
+        # Rendered around the history lines once there is any history
+        history_header_tokens = count_tokens(self._render(query, "\n", [])) - template_tokens
+
+        history_lines = [
+            f"{msg['role']}: {msg['content']}" for msg in history[-self.history_messages:]
+        ] if self.history_messages else []
+        history_need = sum(count_tokens(line) + line_separator_tokens for line in history_lines)
+        history_need += history_header_tokens if history_lines else 0
+        history_cap = int(available * self.history_share)
+
+        # Chunks get everything history is not entitled to
+        chunk_budget = available - min(history_need, history_cap)
+        selected_ids, selected_texts, selected_tokens, truncated = [], [], [], 0
+        # Chunk tokens plus the separators between them
+        chunks_used = 0
+        for chunk_id, text in chunks:
+            tokens = count_tokens(text)
+            remaining = chunk_budget - chunks_used - (chunk_separator_tokens if selected_texts else 0)
+            if tokens > remaining:
+                if remaining >= self.min_chunk_tokens:
+                    text = truncate_to_tokens(text, remaining)
+                    tokens = count_tokens(text)
+                    truncated += 1
+                else:
+                    break
+            chunks_used += tokens + (chunk_separator_tokens if selected_texts else 0)
+            selected_ids.append(chunk_id)
+            selected_texts.append(text)
+            selected_tokens.append(tokens)
+            if truncated:
+                break
+
+        # History keeps the most recent messages that fit, including what chunks left unused
+        history_budget = available - chunks_used - history_header_tokens
+        kept_lines, kept_tokens, history_used = [], [], 0
+        for line in reversed(history_lines):
+            tokens = count_tokens(line)
+            cost = tokens + (line_separator_tokens if kept_lines else 0)
+            if history_used + cost > history_budget:
+                if not kept_lines and history_budget > 0:
+                    line = truncate_to_tokens(line, history_budget)
+                    kept_lines.insert(0, line)
+                    kept_tokens.insert(0, count_tokens(line))
+                break
+            kept_lines.insert(0, line)
+            kept_tokens.insert(0, tokens)
+            history_used += cost
+
+        prompt = self._render(query, "\n".join(kept_lines), selected_texts)
+        prompt_tokens = count_tokens(prompt)
+        while system_tokens + prompt_tokens > self.max_tokens and (selected_texts or kept_lines):
+            if selected_texts:
+                selected_ids.pop()
+                selected_texts.pop()
+                selected_tokens.pop()
+                # Only the last selected chunk can have been truncated
+                truncated = 0
+            else:
+                kept_lines.pop(0)
+                kept_tokens.pop(0)
+            prompt = self._render(query, "\n".join(kept_lines), selected_texts)
+            prompt_tokens = count_tokens(prompt)
+
+        return AssembledContext(
+            prompt=prompt,
+            chunk_ids=selected_ids,
+            system_tokens=system_tokens,
+            query_tokens=query_tokens,
+            history_tokens=sum(kept_tokens),
+            context_tokens=sum(selected_tokens),
+            total_tokens=system_tokens + prompt_tokens,
+            dropped_chunks=len(chunks) - len(selected_ids),
+            truncated_chunks=truncated,
+        )
+
+    @staticmethod
+    def _render(query: str, user_context: str, context_texts: List[str]) -> str:
+        previous = f"Previous Conversation:\n{user_context}\n\n" if user_context else ""
+        context = "\n\n".join(context_texts)
+        return (
+            f"Query: {query}\n"
+            "----------\n--------\n"
+            f"{previous}"
+            "----------\n--------\n"
+            "<Context Starts>:\n"
+            f"{context}\n"
+            "</Context Ends>\n"
+        )
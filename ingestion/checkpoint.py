@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import threading
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class IngestCheckpoint:
+    """Per-file progress of an ingestion job, kept in the job's output directory.
+
+    For every file it records the chunk records produced by the parse and
+    normalize stages (in a JSONL file next to the checkpoint) and the IDs of
+    the chunks uploaded so far. When a job fails, its directories are kept and
+    a re-run with the same output directory skips parsing and chunking for
+    files that got that far and uploads only the chunks that are missing.
+    Entries are tied to the file's content hash, so a file replaced under the
+    same name starts over. Uploaded IDs are appended to a JSON-lines log after
+    every batch and folded into the checkpoint when it is saved or compacted,
+    so a batch costs one appended line rather than a rewrite of the whole file.
+
+    Attributes:
+        directory: Directory holding the checkpoint and the chunk files
+        files: Stored filename -> {"hash", "chunks_path", "uploaded_ids"}
+    """
+
+    CHECKPOINT_FILE = "checkpoint.json"
+    UPLOADED_LOG = "uploaded.jsonl"
+
+    def __init__(self, directory: str):
+        """Load the checkpoint of a job, starting empty if there is none.
+
+        Args:
+            directory: Directory holding the checkpoint and the chunk files
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, self.CHECKPOINT_FILE)
+        self.log_path = os.path.join(directory, self.UPLOADED_LOG)
+        self._lock = threading.Lock()
+        self.files: Dict[str, Dict] = {}
+
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.files = json.load(f).get("files", {})
+                logger.info(f"Resuming from checkpoint {self.path} ({len(self.files)} files)")
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable checkpoint {self.path}: {str(e)}")
+        if os.path.exists(self.log_path):
+            self._replay_log()
+            self.compact()
+
+    def _replay_log(self) -> None:
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by an interrupted write
+                    break
+                entry = self._entry(item["filename"], item["hash"])
+                if entry is not None:
+                    entry["uploaded_ids"].extend(item["ids"])
+
+    def _entry(self, filename: str, file_hash: str) -> Optional[Dict]:
+        entry = self.files.get(filename)
+        return entry if entry is not None and entry["hash"] == file_hash else None
+
+    def has_chunks(self, filename: str, file_hash: str) -> bool:
+        """Check whether a file's chunk records are checkpointed.
+
+        Args:
+            filename: Stored filename
+            file_hash: SHA-256 hex digest of the file's content
+
+        Returns:
+            True if the chunks of this content can be loaded
+        """
+        with self._lock:
+            entry = self._entry(filename, file_hash)
+            return entry is not None and os.path.exists(entry["chunks_path"])
+
+    def load_chunks(self, filename: str, file_hash: str) -> Optional[List[Dict]]:
+        """Load a file's checkpointed chunk records.
+
+        Args:
+            filename: Stored filename
+            file_hash: SHA-256 hex digest of the file's content
+
+        Returns:
+            Chunk records, or None if they were not checkpointed (or none were produced)
+        """
+        if not self.has_chunks(filename, file_hash):
+            return None
+        with open(self.files[filename]["chunks_path"], "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        return records or None
+
+    def save_chunks(self, filename: str, file_hash: str, records: List[Dict]) -> None:
+        """Checkpoint the chunk records of a file.
+
+        Args:
+            filename: Stored filename
+            file_hash: SHA-256 hex digest of the file's content
+            records: Chunk records produced for the file; an empty list is not checkpointed
+        """
+        if not records:
+            return
+        # Keyed by name and content: identical files in one job each keep their own records
+        chunks_key = hashlib.sha256(f"{filename}:{file_hash}".encode("utf-8")).hexdigest()
+        chunks_path = os.path.join(self.directory, f"{chunks_key}.chunks.jsonl")
+        with open(chunks_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")))
+                f.write("\n")
+        with self._lock:
+            self.files[filename] = {"hash": file_hash, "chunks_path": chunks_path, "uploaded_ids": []}
+        self.save()
+
+    def uploaded_ids(self, filename: str, file_hash: str) -> Set[str]:
+        """Return the IDs of a file's chunks already uploaded.
+
+        Args:
+            filename: Stored filename
+            file_hash: SHA-256 hex digest of the file's content
+
+        Returns:
+            Set of object IDs
+        """
+        with self._lock:
+            entry = self._entry(filename, file_hash)
+            return set(entry["uploaded_ids"]) if entry else set()
+
+    def mark_uploaded(self, filename: str, object_ids: Iterable[str]) -> None:
+        """Record chunks of a file as uploaded by appending them to the log.
+
+        Args:
+            filename: Stored filename
+            object_ids: IDs of the uploaded chunks
+        """
+        object_ids = list(object_ids)
+        with self._lock:
+            entry = self.files.get(filename)
+            if entry is None:
+                return
+            entry["uploaded_ids"].extend(object_ids)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"filename": filename, "hash": entry["hash"], "ids": object_ids}) + "\n")
+
+    def save(self) -> None:
+        """Write the checkpoint to disk atomically, folding in the uploaded IDs log."""
+        with self._lock:
+            for entry in self.files.values():
+                entry["uploaded_ids"] = sorted(set(entry["uploaded_ids"]))
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"files": self.files}, f)
+            os.replace(tmp_path, self.path)
+            # Everything in the log is now in the checkpoint; replaying it again would be harmless
+            if os.path.exists(self.log_path):
+                os.remove(self.log_path)
+
+    def compact(self) -> None:
+        """Fold the uploaded IDs log into the checkpoint file."""
+        self.save()
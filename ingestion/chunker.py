@@ -0,0 +1,168 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import tiktoken
+
+HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+PARAGRAPH_BOUNDARY = re.compile(r"\n\s*\n")
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = "cl100k_base") -> tiktoken.Encoding:
+    """Return a (cached) tiktoken encoding.
+
+    Args:
+        encoding_name: Name of the tiktoken encoding
+
+    Returns:
+        tiktoken encoding
+    """
+    return tiktoken.get_encoding(encoding_name)
+
+
+def count_tokens(text: str, encoding_name: str = "cl100k_base") -> int:
+    """Count the tokens in a text.
+
+    Args:
+        text: Text to count
+        encoding_name: Name of the tiktoken encoding
+
+    Returns:
+        Number of tokens
+    """
+    return len(get_encoding(encoding_name).encode(text, disallowed_special=()))
+
+
+class TextChunker:
+    """Split markdown text into token-bounded chunks.
+
+    Text is split at markdown headings first, then at paragraphs, then at
+    sentences, and only falls back to raw token windows for a single sentence
+    longer than the chunk size. Consecutive pieces are packed greedily into
+    chunks of up to ``chunk_size`` tokens (not counting joining whitespace),
+    and each chunk repeats up to ``chunk_overlap`` tokens of trailing pieces
+    from the previous one.
+
+    Attributes:
+        chunk_size: Maximum number of tokens per chunk
+        chunk_overlap: Maximum number of tokens repeated from the previous chunk
+        encoding_name: Name of the tiktoken encoding used for counting
+    """
+
+    def __init__(self, chunk_size: int = 512, chunk_overlap: int = 64, encoding_name: str = "cl100k_base"):
+        """Initialize the chunker.
+
+        Args:
+            chunk_size: Maximum number of tokens per chunk
+            chunk_overlap: Maximum number of tokens repeated from the previous chunk
+            encoding_name: Name of the tiktoken encoding used for counting
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.encoding_name = encoding_name
+        self.encoding = get_encoding(encoding_name)
+
+    def split_text(self, text: str) -> List[str]:
+        """Split a text into chunks.
+
+        Args:
+            text: Markdown text to split
+
+        Returns:
+            List of chunk texts
+        """
+        chunks = []
+        current: List[Tuple[str, str, int]] = []
+        current_tokens = 0
+
+        for piece, separator, tokens, starts_section in self._pieces(text):
+            # Prefer to start a new chunk at a heading once the current one has some substance
+            at_heading = starts_section and current_tokens >= self.chunk_size // 4
+            if current and (at_heading or current_tokens + tokens > self.chunk_size):
+                chunks.append(self._join(current))
+                current = [] if at_heading else self._overlap(current, tokens)
+                current_tokens = sum(item[2] for item in current)
+
+            current.append((piece, separator, tokens))
+            current_tokens += tokens
+
+        if current:
+            chunks.append(self._join(current))
+        return chunks
+
+    def chunk_records(self, records: List[Dict]) -> List[Dict]:
+        """Split normalized records into chunk records.
+
+        Each output record keeps the fields of its source record and gains a
+        ``chunk_index`` that counts chunks per filename.
+
+        Args:
+            records: Records with at least filename and text fields
+
+        Returns:
+            List of chunk records
+        """
+        chunk_records = []
+        chunk_counters: Dict[str, int] = {}
+        for record in records:
+            filename = record["filename"]
+            for chunk in self.split_text(record["text"]):
+                chunk_index = chunk_counters.get(filename, 0)
+                chunk_counters[filename] = chunk_index + 1
+                chunk_records.append({**record, "text": chunk, "chunk_index": chunk_index})
+        return chunk_records
+
+    def _count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def _pieces(self, text: str):
+        """Yield (piece, separator, token_count, starts_section) tuples no longer than chunk_size."""
+        for paragraph in PARAGRAPH_BOUNDARY.split(text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+
+            starts_section = bool(HEADING_PATTERN.match(paragraph))
+            tokens = self._count(paragraph)
+            if tokens <= self.chunk_size:
+                yield paragraph, "\n\n", tokens, starts_section
+                continue
+
+            separator = "\n\n"
+            for sentence in SENTENCE_BOUNDARY.split(paragraph):
+                sentence_tokens = self._count(sentence)
+                if sentence_tokens <= self.chunk_size:
+                    yield sentence, separator, sentence_tokens, starts_section
+                else:
+                    token_ids = self.encoding.encode(sentence, disallowed_special=())
+                    for start in range(0, len(token_ids), self.chunk_size):
+                        window = token_ids[start:start + self.chunk_size]
+                        yield self.encoding.decode(window), separator, len(window), starts_section
+                        separator = " "
+                        starts_section = False
+                separator = " "
+                starts_section = False
+
+    def _overlap(self, pieces: List[Tuple[str, str, int]], next_tokens: int) -> List[Tuple[str, str, int]]:
+        """Return the trailing pieces that fit in the overlap budget and leave room for the next piece."""
+        budget = min(self.chunk_overlap, self.chunk_size - next_tokens)
+        overlap = []
+        total = 0
+        for piece in reversed(pieces):
+            if total + piece[2] > budget:
+                break
+            overlap.insert(0, piece)
+            total += piece[2]
+        return overlap
+
+    @staticmethod
+    def _join(pieces: List[Tuple[str, str, int]]) -> str:
+        text = pieces[0][0]
+        for piece, separator, _ in pieces[1:]:
+            text += separator + piece
+        return text
@@ -0,0 +1,361 @@
+"""Headless bulk ingestion.
+
+Ingests a directory, or a manifest listing files, for one tenant and
+collection through process_llama_documents, without the Streamlit UI.
+
+Runs are restartable. Each source gets a state directory under
+INGEST_STATE_DIR holding the checkpoint of its last run. Running the same
+command again after a crash or a failure skips files that were already
+ingested and uploads only the missing chunks of the others. Unchanged files
+are skipped as usual through the tenant manifest. A lock file makes
+overlapping runs of the same source exit immediately, so the command can
+run from cron.
+
+Exit codes: 0 on success, 1 when ingestion still failed after every
+attempt, 2 on invalid arguments, 3 when another run of the same source is
+in progress.
+
+Usage:
+    python -m ingestion.cli ./contracts --tenant acme --collection Documents
+    python -m ingestion.cli --manifest nightly.txt --tenant acme --collection Documents \\
+        --parse-concurrency 8 --batch-size 200 --upload-retries 5 --attempts 3
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import (
+    INGEST_STATE_DIR,
+    PARSE_CONCURRENCY,
+    UPLOAD_BACKOFF_BASE,
+    UPLOAD_BATCH_SIZE,
+    UPLOAD_MAX_RETRIES,
+    WEAVIATE_COLLECTION_NAME,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows; runs are not locked there
+    fcntl = None
+
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_LOCKED = 3
+
+
+def read_manifest(path: str) -> List[str]:
+    """Read the files listed in a manifest.
+
+    A manifest is either a JSON array of paths or a text file with one path
+    per line (blank lines and lines starting with ``#`` are ignored).
+    Relative paths are resolved against the manifest's directory.
+
+    Args:
+        path: Path of the manifest
+
+    Returns:
+        Absolute paths of the listed files, in order and without duplicates
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            entries = [str(entry) for entry in json.load(f)]
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+    base = os.path.dirname(os.path.abspath(path))
+    paths = [os.path.abspath(os.path.join(base, os.path.expanduser(entry))) for entry in entries]
+    return list(dict.fromkeys(paths))
+
+
+def stage_manifest(file_paths: List[str], staging_dir: str) -> None:
+    """Link the files of a manifest into a staging directory for process_llama_documents.
+
+    Args:
+        file_paths: Absolute paths of the files
+        staging_dir: Directory to create the links in; rebuilt from scratch
+    """
+    if os.path.isdir(staging_dir):
+        shutil.rmtree(staging_dir)
+    os.makedirs(staging_dir)
+    for file_path in file_paths:
+        os.symlink(file_path, os.path.join(staging_dir, os.path.basename(file_path)))
+
+
+def run_directory(state_dir: str, collection_name: str, tenant: str, source: str) -> str:
+    """Return the state directory of a source, stable across runs so they can resume.
+
+    Args:
+        state_dir: Root of the command-line ingestion state (INGEST_STATE_DIR)
+        collection_name: Name of the collection
+        tenant: Tenant name
+        source: Absolute path of the directory or manifest
+
+    Returns:
+        Directory path
+    """
+    safe = lambda name: re.sub(r"[^\w.-]", "_", name)
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(state_dir, safe(collection_name), safe(tenant), f"{safe(os.path.basename(source))}-{digest}")
+
+
+class ProgressReporter:
+    """Tracks the progress events of an ingestion run and prints throughput.
+
+    Attributes:
+        interval: Seconds between progress lines
+        counters: Latest counters of the run
+        failed_files: File name -> error of the files that failed
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.counters: Dict[str, int] = {
+            "files_total": 0,
+            "files_skipped": 0,
+            "files_parsed": 0,
+            "files_failed": 0,
+            "chunks": 0,
+            "objects_uploaded": 0,
+            "upload_errors": 0,
+        }
+        self.failed_files: Dict[str, str] = {}
+        self._last_print = self.started
+
+    def __call__(self, event: str, details: Dict[str, Any]) -> None:
+        from ingestion.manifest import logical_filename
+
+        for key in ("files_total", "files_skipped", "files_parsed", "files_failed", "objects_uploaded", "upload_errors"):
+            if key in details:
+                self.counters[key] = details[key]
+        if event == "file_normalized":
+            self.counters["chunks"] += details["chunks"]
+        elif event == "file_failed":
+            self.failed_files[logical_filename(details.get("file_path", ""))] = details.get("error", "")
+
+        now = time.perf_counter()
+        if event == "files_listed" or now - self._last_print >= self.interval:
+            self._last_print = now
+            print(self.describe(), flush=True)
+
+    @property
+    def seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def describe(self) -> str:
+        counters, seconds = self.counters, self.seconds
+        done = counters["files_parsed"] + counters["files_failed"]
+        return (
+            f"[{seconds:7.1f}s] {done}/{counters['files_total']} files parsed "
+            f"({counters['files_failed']} failed, {counters['files_skipped']} unchanged skipped), "
+            f"{counters['objects_uploaded']}/{counters['chunks']} chunks uploaded, "
+            f"{counters['files_parsed'] / seconds if seconds else 0:.2f} files/s, "
+            f"{counters['objects_uploaded'] / seconds if seconds else 0:.1f} objects/s"
+        )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Ingest documents for a tenant without the UI")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("directory", nargs="?", help="Directory of documents to ingest (searched recursively)")
+    source.add_argument("--manifest", help="File listing the documents to ingest, one path per line or a JSON array")
+    parser.add_argument("--tenant", required=True, help="Tenant the documents are ingested for")
+    parser.add_argument("--collection", help="Collection to ingest into (defaults to WEAVIATE_COLLECTION_NAME)")
+    parser.add_argument("--parse-concurrency", type=int, help="Files parsed at the same time (defaults to PARSE_CONCURRENCY)")
+    parser.add_argument("--batch-size", type=int, help="Objects per upload call (defaults to UPLOAD_BATCH_SIZE)")
+    parser.add_argument("--upload-retries", type=int, help="Retries of objects that failed to upload (defaults to UPLOAD_MAX_RETRIES)")
+    parser.add_argument("--upload-backoff", type=float, help="Seconds before the first upload retry (defaults to UPLOAD_BACKOFF_BASE)")
+    parser.add_argument("--attempts", type=int, default=1, help="Runs of the whole ingestion before giving up; each resumes the previous one")
+    parser.add_argument("--retry-delay", type=float, default=30.0, help="Seconds before the second attempt, doubled for every further one")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="Seconds between progress lines")
+    parser.add_argument("--report", help="Path of the JSON summary (defaults to INGEST_STATE_DIR/reports/)")
+    return parser.parse_args(argv)
+
+
+def resolve_source(args: argparse.Namespace) -> Tuple[str, List[str]]:
+    """Validate the source and list the files of a manifest.
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        Absolute path of the source and the manifest's files (empty for a directory)
+    """
+    if args.directory:
+        source = os.path.abspath(args.directory)
+        if not os.path.isdir(source):
+            raise ValueError(f"{args.directory} is not a directory")
+        return source, []
+
+    source = os.path.abspath(args.manifest)
+    file_paths = read_manifest(source)
+    missing = [path for path in file_paths if not os.path.isfile(path)]
+    if missing:
+        raise ValueError(f"{len(missing)} files listed in the manifest do not exist, e.g. {missing[0]}")
+    check_unique_names(file_paths)
+    return source, file_paths
+
+
+def check_unique_names(file_paths: List[str]) -> None:
+    """Reject files that share a name.
+
+    Checkpoints, manifests and stored objects are keyed by file name, so two
+    files with the same name in different directories would overwrite each
+    other.
+
+    Args:
+        file_paths: Paths of the files to ingest
+
+    Raises:
+        ValueError: If two files share a name
+    """
+    names: Dict[str, str] = {}
+    for path in file_paths:
+        name = os.path.basename(path)
+        if name in names:
+            raise ValueError(f"Files are tracked by name, but {names[name]} and {path} share the name {name}")
+        names[name] = path
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    try:
+        source, manifest_files = resolve_source(args)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    from ingestion.doc_processor import SUPPORTED_EXTENSIONS, list_input_files, process_llama_documents
+    from telemetry import configure as configure_telemetry
+
+    collection_name = args.collection or WEAVIATE_COLLECTION_NAME
+    if not collection_name:
+        print("error: --collection is required when WEAVIATE_COLLECTION_NAME is not set", file=sys.stderr)
+        return EXIT_USAGE
+    unsupported = [path for path in manifest_files if not path.lower().endswith(SUPPORTED_EXTENSIONS)]
+    if unsupported:
+        print(f"Ignoring {len(unsupported)} files with unsupported extensions, e.g. {unsupported[0]}")
+    if not manifest_files:
+        # The directory is walked recursively, so a/report.pdf and b/report.pdf would collide
+        try:
+            check_unique_names(list_input_files(source))
+        except ValueError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return EXIT_USAGE
+
+    # Passed to process_llama_documents, so the options only apply to this run
+    settings = {
+        "parse_concurrency": PARSE_CONCURRENCY if args.parse_concurrency is None else args.parse_concurrency,
+        "upload_batch_size": UPLOAD_BATCH_SIZE if args.batch_size is None else args.batch_size,
+        "upload_max_retries": UPLOAD_MAX_RETRIES if args.upload_retries is None else args.upload_retries,
+        "upload_backoff_base": UPLOAD_BACKOFF_BASE if args.upload_backoff is None else args.upload_backoff,
+    }
+
+    configure_telemetry()
+    state_dir = run_directory(INGEST_STATE_DIR, collection_name, args.tenant, source)
+    os.makedirs(state_dir, exist_ok=True)
+
+    # Held until the process exits
+    lock_file = open(os.path.join(state_dir, "lock"), "w")
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            print(f"Another ingestion of {source} for tenant '{args.tenant}' is running; exiting")
+            return EXIT_LOCKED
+
+    # A directory is ingested in place and kept; a manifest is staged as links, which are removed on success
+    input_dir = source if not manifest_files else os.path.join(state_dir, "input")
+    output_dir = os.path.join(state_dir, "output")
+    started_at = time.time()
+    attempts = []
+    succeeded = False
+    for attempt in range(1, max(1, args.attempts) + 1):
+        if attempt > 1:
+            delay = args.retry_delay * 2 ** (attempt - 2)
+            print(f"Attempt {attempt - 1} failed; resuming in {delay:.0f}s")
+            time.sleep(delay)
+        if manifest_files:
+            stage_manifest(manifest_files, input_dir)
+
+        reporter = ProgressReporter(args.progress_interval)
+        result = asyncio.run(
+            process_llama_documents(
+                user_id=args.tenant,
+                collection_name=collection_name,
+                input_dir=input_dir,
+                output_dir=output_dir,
+                on_progress=reporter,
+                cleanup_input=bool(manifest_files),
+                **settings,
+            )
+        )
+        succeeded = bool(result)
+        print(reporter.describe())
+        attempts.append(
+            {
+                "attempt": attempt,
+                "succeeded": succeeded,
+                "seconds": round(reporter.seconds, 3),
+                **reporter.counters,
+                "failed_files": reporter.failed_files,
+            }
+        )
+        if succeeded:
+            break
+
+    seconds = sum(item["seconds"] for item in attempts)
+    # Resumed attempts skip what earlier ones uploaded, so uploads add up across attempts
+    objects_uploaded = sum(item["objects_uploaded"] for item in attempts)
+    report = {
+        "status": "completed" if succeeded else "failed",
+        "tenant": args.tenant,
+        "collection": collection_name,
+        "source": source,
+        "source_type": "manifest" if manifest_files else "directory",
+        "started_at": started_at,
+        "finished_at": time.time(),
+        "seconds": round(seconds, 3),
+        "files_total": attempts[0]["files_total"] + attempts[0]["files_skipped"],
+        "files_skipped": attempts[0]["files_skipped"],
+        "files_failed": attempts[-1]["files_failed"],
+        "objects_uploaded": objects_uploaded,
+        "objects_per_sec": round(objects_uploaded / seconds, 3) if seconds else None,
+        "settings": {
+            **settings,
+            "attempts": args.attempts,
+            "retry_delay": args.retry_delay,
+        },
+        "state_dir": state_dir,
+        "attempts": attempts,
+    }
+    safe = lambda name: re.sub(r"[^\w.-]", "_", name)
+    report_path = args.report or os.path.join(
+        INGEST_STATE_DIR,
+        "reports",
+        f"{safe(collection_name)}-{safe(args.tenant)}-{time.strftime('%Y%m%d-%H%M%S')}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(
+        f"Ingestion {report['status']} for tenant '{args.tenant}' in {seconds:.1f}s: "
+        f"{objects_uploaded} objects uploaded ({report['objects_per_sec'] or 0:.1f} objects/s), "
+        f"{report['files_skipped']} unchanged files skipped, {report['files_failed']} files failed"
+    )
+    print(f"Wrote {report_path}")
+    if not succeeded:
+        print(f"Run the same command again to resume from {output_dir}")
+    return 0 if succeeded else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,37 @@
 import nest_asyncio
+import asyncio
+import contextlib
 import os
 import logging
-from typing import Optional
+from typing import Callable, Dict, List, Optional
 from llama_cloud_services import LlamaParse
-from llama_index.core import SimpleDirectoryReader
+from llama_index.core import Document
 import uuid, shutil
 
 from config import (
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
     LLAMAPARSE_API_KEY,
+    INGEST_EXPORT_COMPRESS,
+    INGEST_EXPORT_DIR,
+    INGEST_QUEUE_SIZE,
     LOCAL_FILE_INPUT_DIR,
     LOCAL_FILE_OUTPUT_DIR,
-    WEAVIATE_API_KEY,
-    WEAVIATE_REST_URL,
+    MANIFEST_DIR,
+    PARSE_CONCURRENCY,
+    PARSE_CACHE_DIR,
+    PARSE_CACHE_MAX_BYTES,
+    UPLOAD_BATCH_SIZE,
 )
-from ingestion.weaviate_client import DataManager
-import json
+from ingestion.checkpoint import IngestCheckpoint
+from ingestion.chunker import TextChunker
+from ingestion.embeddings import CachedEmbedder, get_embedder
+from ingestion.manifest import TenantManifest, chunk_object_id, logical_filename
+from ingestion.parse_cache import ParseCache, hash_file
+from ingestion.pipeline import run_pipeline
+from ingestion.vector_store import get_vector_store
+from profiling import to_thread
+from telemetry import span
 
 # Configure logging
 logging.basicConfig(
@@ -25,11 +42,148 @@ logger = logging.getLogger(__name__)
 
 nest_asyncio.apply()
 
-from ingestion.script_llamaparse import run_llama_script
+from ingestion.script_llamaparse import export_records, normalize_documents
 
+# Settings that change LlamaParse output; they are part of the parse cache key
+PARSER_SETTINGS = {
+    "result_type": "markdown",
+}
 
-def llama_parse(
-    input_directory: str, output_directory: str, api_key: Optional[str] = None
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".docx", ".pptx")
+
+parse_cache = ParseCache(cache_dir=PARSE_CACHE_DIR, max_bytes=PARSE_CACHE_MAX_BYTES)
+
+
+def list_input_files(input_directory: str) -> List[str]:
+    """
+    Recursively list the parseable files in a directory.
+
+    Args:
+        input_directory: Path to the directory containing input documents
+
+    Returns:
+        List[str]: Sorted list of file paths with a supported extension
+    """
+    file_paths = []
+    for root, _, files in os.walk(input_directory):
+        for name in files:
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                file_paths.append(os.path.join(root, name))
+    return sorted(file_paths)
+
+
+def create_parser(api_key: Optional[str] = None) -> LlamaParse:
+    """
+    Create the LlamaParse instance used for all supported file types.
+
+    Args:
+        api_key: LlamaParse API key (optional, will use default if not provided)
+
+    Returns:
+        LlamaParse: Configured parser
+    """
+    return LlamaParse(
+        api_key=api_key or LLAMAPARSE_API_KEY,
+        verbose=True,
+        # Raise on failed or timed-out parses instead of returning no documents
+        ignore_errors=False,
+        **PARSER_SETTINGS,
+    )
+
+
+async def parse_file(
+    file_path: str, parser: LlamaParse, semaphore: Optional[asyncio.Semaphore] = None
+) -> List[Document]:
+    """
+    Parse a single file, serving it from the parse cache when the same bytes were parsed before.
+
+    Args:
+        file_path: Path to the file to parse
+        parser: LlamaParse instance used on a cache miss
+        semaphore: Optional semaphore bounding the number of files parsed concurrently
+
+    Returns:
+        List[Document]: Parsed documents for the file
+    """
+    async with semaphore or contextlib.nullcontext():
+        file_hash = await to_thread(hash_file, file_path)
+        cache_key = ParseCache.make_key(file_hash, PARSER_SETTINGS)
+        documents = await to_thread(parse_cache.get, cache_key)
+
+        extra_info = {
+            "file_name": os.path.basename(file_path),
+            "file_path": file_path,
+        }
+
+        if documents is not None:
+            logger.info(f"Parse cache hit for {file_path}")
+            # Cached documents carry the metadata of the upload that populated the cache
+            for doc in documents:
+                doc.metadata.update(extra_info)
+            return documents
+
+        documents = await parser.aload_data(file_path, extra_info=extra_info)
+        if documents:
+            # An empty result is never cached, so the next upload of the same bytes parses again
+            await to_thread(parse_cache.put, cache_key, documents)
+        return documents
+
+
+async def parse_files(
+    file_paths: List[str],
+    parser: LlamaParse,
+    concurrency: int = PARSE_CONCURRENCY,
+    on_file_parsed: Optional[Callable[[str, int, Optional[Exception]], None]] = None,
+) -> Dict[str, List[Document]]:
+    """
+    Parse files concurrently over a bounded number of workers.
+
+    A failure in one file is logged and reported but does not affect the
+    others. A file that parses to no documents counts as failed.
+
+    Args:
+        file_paths: Paths of the files to parse
+        parser: LlamaParse instance used on cache misses
+        concurrency: Maximum number of files parsed at the same time
+        on_file_parsed: Optional callback invoked as (file_path, document_count, error)
+            when each file finishes
+
+    Returns:
+        Dict[str, List[Document]]: Parsed documents per successfully parsed file
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    total = len(file_paths)
+    completed = 0
+    results = {}
+
+    async def worker(file_path: str) -> None:
+        nonlocal completed
+        error = None
+        documents = []
+        try:
+            documents = await parse_file(file_path, parser, semaphore)
+            if not documents:
+                raise ValueError("Parser returned no documents")
+            results[file_path] = documents
+        except Exception as e:
+            error = e
+            logger.error(f"Error parsing file {file_path}: {str(e)}")
+
+        completed += 1
+        logger.info(f"Parsed {completed}/{total} files ({file_path})")
+        if on_file_parsed:
+            on_file_parsed(file_path, len(documents), error)
+
+    await asyncio.gather(*(worker(file_path) for file_path in file_paths))
+    return results
+
+
+async def llama_parse(
+    input_directory: str,
+    output_directory: str,
+    api_key: Optional[str] = None,
+    concurrency: int = PARSE_CONCURRENCY,
+    compress: bool = False,
 ) -> bool:
     """
     Process documents from the input directory and save extracted content to the output directory.
@@ -38,6 +192,8 @@ def llama_parse(
         input_directory: Path to the directory containing input documents
         output_directory: Path where processed documents will be saved
         api_key: LlamaParse API key (optional, will use default if not provided)
+        concurrency: Maximum number of files parsed at the same time
+        compress: Whether to gzip the saved JSON Lines file
 
     Returns:
         bool: True if processing was successful, False otherwise
@@ -54,41 +210,27 @@ def llama_parse(
             return False
 
         # Initialize LlamaParse
-        parser = LlamaParse(
-            api_key=LLAMAPARSE_API_KEY,
-            result_type="markdown",
-            verbose=True,
-        )
-
-        # Configure file extractors
-        file_extractor = {
-            ".pdf": parser,
-            ".txt": parser,
-            ".docx": parser,
-            ".pptx": parser,
-        }
+        parser = create_parser(api_key)
 
-        # Load documents
-        logger.info(f"Loading documents from {input_directory}")
-        documents = SimpleDirectoryReader(
-            input_dir=input_directory, file_extractor=file_extractor, recursive=True
-        ).load_data(show_progress=True)
+        # Load documents, fanning files out over concurrent workers
+        file_paths = list_input_files(input_directory)
+        logger.info(f"Loading {len(file_paths)} files from {input_directory}")
+        parsed = await parse_files(file_paths, parser, concurrency=concurrency)
 
-        logger.info(f"Processing {len(documents)} documents")
-
-        # Process and save each document
-        for i, doc in enumerate(documents):
-            try:
-                document_data = doc.model_dump_json()
-                output_path = f"{output_directory}/docs-{uuid.uuid4()}.json"
+        # Keep the input file order regardless of completion order
+        documents = []
+        for file_path in file_paths:
+            documents.extend(parsed.get(file_path, []))
 
-                with open(output_path, "w") as f:
-                    f.write(str(document_data))
-
-                logger.info(f"Saved document to {output_path}")
+        logger.info(f"Processing {len(documents)} documents")
+        logger.info(f"Parse cache stats: {parse_cache.stats()}")
 
-            except Exception as e:
-                logger.error(f"Error processing document {i}: {str(e)}")
+        # Save the chunked records as one compact JSON Lines file
+        chunker = TextChunker(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        records = chunker.chunk_records(normalize_documents(documents))
+        output_path = os.path.join(output_directory, f"docs-{uuid.uuid4()}.jsonl")
+        export_records(records, output_path, compress=compress)
+        logger.info(f"Saved documents to {output_path}")
 
         logger.info("Document processing completed successfully")
         return True
@@ -98,86 +240,287 @@ def llama_parse(
         return False
 
 
-async def process_llama_documents(user_id: str, collection_name: str) -> str:
+async def process_llama_documents(
+    user_id: str,
+    collection_name: str,
+    input_dir: Optional[str] = None,
+    output_dir: Optional[str] = None,
+    on_progress: Optional[Callable[[str, Dict], None]] = None,
+    cleanup_input: bool = True,
+    parse_concurrency: Optional[int] = None,
+    upload_batch_size: Optional[int] = None,
+    upload_max_retries: Optional[int] = None,
+    upload_backoff_base: Optional[float] = None,
+) -> str:
     """
     Process documents using LlamaParse.
 
+    Documents stream through parse, normalize and upload stages, so each one is
+    uploaded to the vector store as soon as it has been parsed instead of after the whole
+    directory has been processed.
+
+    Files are tracked in the tenant's manifest by their name without the upload
+    prefix: files whose content hash is unchanged are skipped, and once a changed
+    file is fully uploaded the chunks of its previous version are deleted.
+
+    Chunk IDs are derived from the tenant, filename, file hash and chunk
+    index, so uploads are idempotent. Chunks and upload progress are checkpointed in the
+    output directory, and the input and output directories are only removed
+    on success: calling this again after a failure resumes the job, skipping
+    parsing for checkpointed files and uploading only the missing chunks.
+
+    Each job should get its own input and output directories (see
+    ingestion.jobs.job_directories); only those are read and removed, so jobs
+    of different users can run at the same time.
+
+    Args:
+        user_id: Tenant the documents are ingested for
+        collection_name: Name of the collection
+        input_dir: Directory holding this job's documents (defaults to LOCAL_FILE_INPUT_DIR)
+        output_dir: Scratch directory of this job (defaults to LOCAL_FILE_OUTPUT_DIR)
+        on_progress: Optional callback invoked as (event, details); see run_pipeline
+            for the pipeline events, plus "files_listed" once the changed files are known
+        cleanup_input: Remove the input directory on success; pass False when it holds
+            the caller's own files rather than a copy made for the job
+        parse_concurrency: Files parsed at the same time (defaults to PARSE_CONCURRENCY)
+        upload_batch_size: Objects per upload call (defaults to UPLOAD_BATCH_SIZE)
+        upload_max_retries: Retries of objects that failed to upload (defaults to the vector store's)
+        upload_backoff_base: Seconds before the first upload retry (defaults to the vector store's)
+
     Returns:
         str: Status message about the processing result
     """
-    try:
-        input_dir = LOCAL_FILE_INPUT_DIR
-        output_dir = LOCAL_FILE_OUTPUT_DIR
-
-        results = llama_parse(input_directory=input_dir, output_directory=output_dir)
-        await run_llama_script(output_dir)
-
-        # Collect all data objects for the session
-        json_dir_path = output_dir
-        print(f"Scanning for JSON files in: {json_dir_path}")
-        file_count = 0
-        object_count = 0
-        data_objects = []
-        # Iterate over all JSON files in the directory
-        for filename in os.listdir(json_dir_path):
-            if filename.endswith(".json"):
-                file_count += 1
-                json_file_path = os.path.join(json_dir_path, filename)
-                try:
-                    with open(json_file_path, "r") as json_file:
-                        data_objects += json.load(json_file)
-
-                    object_count += len(data_objects)
-
-                except json.JSONDecodeError as je:
-                    logger.error(f"JSON parse error in file {filename}: {je}")
-                    continue
-                except Exception as e:
-                    logger.error(
-                        f"Error processing file {filename}: {e}", exc_info=True
-                    )
-                    continue
-
-
-        print(
-            f"Uploading {len(data_objects)} objects to Weaviate collection '{collection_name}' for tenant '{user_id}'"
-        )
-
-        # print("\n----------Data Objects----------\n:", data_objects)
-        chunk = data_objects[0] if data_objects else None
-        first_chunk = chunk.get("text")
-        # print(f"First chunk of data object: {first_chunk}")
-        with DataManager(
-            wcd_url=WEAVIATE_REST_URL, wcd_api_key=WEAVIATE_API_KEY
-        ) as weaviate_uploader:
-            res = weaviate_uploader.upload_objects(
-                collection_name=collection_name,
-                data_objects=data_objects,
-                tenant=user_id,
+    succeeded = False
+    input_dir = input_dir or LOCAL_FILE_INPUT_DIR
+    output_dir = output_dir or LOCAL_FILE_OUTPUT_DIR
+    parse_concurrency = PARSE_CONCURRENCY if parse_concurrency is None else parse_concurrency
+    upload_batch_size = UPLOAD_BATCH_SIZE if upload_batch_size is None else upload_batch_size
+    with span("ingest", tenant=user_id, collection=collection_name) as ingest_span:
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+
+            parser = create_parser()
+            file_paths = list_input_files(input_dir)
+
+            # Only files that are new or whose content changed since the last run are ingested
+            manifest = TenantManifest.for_tenant(MANIFEST_DIR, collection_name, user_id)
+            hashes = await asyncio.gather(*(to_thread(hash_file, path) for path in file_paths))
+            file_hashes = dict(zip(file_paths, hashes))
+            changed_paths, unchanged_paths = [], []
+            for path in file_paths:
+                if manifest.is_unchanged(logical_filename(path), file_hashes[path]):
+                    unchanged_paths.append(path)
+                else:
+                    changed_paths.append(path)
+            logger.info(
+                f"Skipping {len(unchanged_paths)} unchanged files, ingesting {len(changed_paths)} new or changed files"
+            )
+            ingest_span.count("files", len(changed_paths))
+            ingest_span.count("files_skipped", len(unchanged_paths))
+            if on_progress:
+                on_progress("files_listed", {"files_total": len(changed_paths), "files_skipped": len(unchanged_paths)})
+
+            # Per stored filename: content hash, number of chunks produced and IDs of the chunks uploaded
+            checkpoint = IngestCheckpoint(output_dir)
+            stored_hashes = {os.path.basename(path): file_hashes[path] for path in changed_paths}
+            expected_chunks: Dict[str, int] = {}
+            uploaded_ids: Dict[str, List[str]] = {}
+            failed_files = set()
+            # Texts of chunks uploaded by an earlier, interrupted run of this job
+            resumed_texts: List[str] = []
+
+            export_path = None
+            if INGEST_EXPORT_DIR:
+                os.makedirs(INGEST_EXPORT_DIR, exist_ok=True)
+                export_path = os.path.join(INGEST_EXPORT_DIR, f"{user_id}-{uuid.uuid4()}.jsonl")
+
+            chunker = TextChunker(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+            embedder = get_embedder()
+
+            async def parse_fn(file_path: str) -> List[Document]:
+                if checkpoint.has_chunks(os.path.basename(file_path), file_hashes[file_path]):
+                    # Already parsed and chunked by an earlier run
+                    return []
+                with span("ingest.parse", file=os.path.basename(file_path)) as parse_span:
+                    documents = await parse_file(file_path, parser)
+                    parse_span.count("documents", len(documents))
+                if not documents:
+                    # Reported as a failed file by the pipeline rather than silently dropped
+                    raise ValueError("Parser returned no documents")
+                return documents
+
+            async def normalize_fn(file_path: str, documents: List[Document]) -> List[Dict]:
+                stored_filename = os.path.basename(file_path)
+                file_hash = file_hashes[file_path]
+                records = await to_thread(checkpoint.load_chunks, stored_filename, file_hash)
+                if records is None:
+                    with span("ingest.normalize", file=stored_filename) as normalize_span:
+                        records = await to_thread(
+                            chunker.chunk_records, normalize_documents(documents)
+                        )
+                        normalize_span.count("chunks", len(records))
+                        if not records:
+                            # Fails the file: it stays out of the checkpoint and the manifest and is retried next time
+                            raise ValueError("Document produced no chunks")
+                        await to_thread(checkpoint.save_chunks, stored_filename, file_hash, records)
+                        if export_path:
+                            await to_thread(
+                                export_records, records, export_path, INGEST_EXPORT_COMPRESS
+                            )
+                expected_chunks[stored_filename] = len(records)
+
+                # Skip chunks an earlier run already uploaded
+                done = checkpoint.uploaded_ids(stored_filename, file_hash)
+                uploaded_ids[stored_filename] = sorted(done)
+                pending = []
+                for record in records:
+                    if chunk_object_id(user_id, logical_filename(file_path), file_hash, record["chunk_index"]) in done:
+                        resumed_texts.append(record["text"])
+                    else:
+                        pending.append(record)
+                return pending
+            print(
+                f"Streaming {len(changed_paths)} files to collection '{collection_name}' for tenant '{user_id}'"
             )
-           
 
-        if not results:
-            raise Exception("LlamaParse processing returned no results or failed")
+            with get_vector_store() as vector_store:
+
+                async def upload(batch: List[Dict]) -> bool:
+                    # Client-side vectors; unchanged chunks come from the embedding cache
+                    vectors = None
+                    if embedder:
+                        with span("ingest.embed", model=embedder.model_name) as embed_span:
+                            vectors = await to_thread(
+                                embedder.embed, [record["text"] for record in batch]
+                            )
+                            embed_span.count("texts", len(batch))
+                    object_ids = [
+                        chunk_object_id(
+                            user_id,
+                            logical_filename(record["filename"]),
+                            stored_hashes[record["filename"]],
+                            record["chunk_index"],
+                        )
+                        for record in batch
+                    ]
+                    with span("ingest.upload") as upload_span:
+                        res = await to_thread(
+                            vector_store.upload_objects,
+                            collection_name=collection_name,
+                            data_objects=batch,
+                            tenant=user_id,
+                            vectors=vectors,
+                            uuids=object_ids,
+                            max_retries=upload_max_retries,
+                            backoff_base=upload_backoff_base,
+                        )
+                        logger.info(res)
+                        success = res.startswith("Successfully")
+                        if success:
+                            upload_span.count("objects", len(batch))
+                        else:
+                            upload_span.record_error(res)
+                    batch_ids: Dict[str, List[str]] = {}
+                    for record, object_id in zip(batch, object_ids):
+                        batch_ids.setdefault(record["filename"], []).append(object_id)
+                    for stored_filename, ids in batch_ids.items():
+                        if success:
+                            uploaded_ids.setdefault(stored_filename, []).extend(ids)
+                            await to_thread(checkpoint.mark_uploaded, stored_filename, ids)
+                        else:
+                            failed_files.add(stored_filename)
+                    return success
+
+                result = await run_pipeline(
+                    file_paths=changed_paths,
+                    parse_fn=parse_fn,
+                    normalize_fn=normalize_fn,
+                    upload_fn=upload,
+                    parse_concurrency=parse_concurrency,
+                    queue_size=INGEST_QUEUE_SIZE,
+                    upload_batch_size=upload_batch_size,
+                    on_progress=on_progress,
+                )
+                await to_thread(checkpoint.compact)
+
+                with TenantManifest.lock_for(manifest.path):
+                    # Reload, since another job of this tenant may have saved the manifest meanwhile
+                    manifest = TenantManifest(manifest.path)
+                    for file_path in changed_paths:
+                        stored_filename = os.path.basename(file_path)
+                        filename = logical_filename(file_path)
+                        object_ids = uploaded_ids.get(stored_filename, [])
+                        complete = (
+                            expected_chunks.get(stored_filename, 0) > 0
+                            and stored_filename not in failed_files
+                            and len(set(object_ids)) == expected_chunks[stored_filename]
+                        )
+                        if not complete:
+                            # Leave the file out of the manifest; the checkpoint lets the next run finish it
+                            continue
+
+                        previous = manifest.get(filename)
+                        manifest.record(filename, file_hashes[file_path], stored_filename, object_ids)
+                        if previous:
+                            # Kept if another file references them (see TenantManifest.referenced_ids)
+                            stale_ids = sorted(
+                                set(previous["object_ids"]) - manifest.referenced_ids()
+                            )
+                            if stale_ids:
+                                logger.info(
+                                    vector_store.delete_objects_by_id(collection_name, user_id, stale_ids)
+                                )
+                    manifest.save()
+
+                # Unchanged files are summarized from the chunks already stored for them
+                texts = resumed_texts + result.texts
+                if unchanged_paths:
+                    entries = [manifest.get(logical_filename(path)) for path in unchanged_paths]
+                    objects = vector_store.fetch_objects(
+                        collection_name,
+                        user_id,
+                        filters={"filename": [entry["stored_filename"] for entry in entries]},
+                        limit=sum(len(entry["object_ids"]) for entry in entries) or None,
+                    )
+                    objects.sort(
+                        key=lambda obj: (obj.properties.get("filename", ""), obj.properties.get("chunk_index", 0))
+                    )
+                    texts.extend(obj.properties.get("text", "") for obj in objects)
+
+            logger.info(f"Parse cache stats: {parse_cache.stats()}")
+            if isinstance(embedder, CachedEmbedder):
+                logger.info(
+                    f"Embedding cache stats: {embedder.cache.stats()}, texts embedded: {embedder.embedded}"
+                )
 
-        if not res:
-            raise Exception("Weaviate upload failed or returned no results")
+            if changed_paths and not result.files_parsed:
+                raise Exception("LlamaParse processing returned no results or failed")
 
-        print(
-            f"Documents processed successfully and Uploaded to Weaviate collection '{collection_name}' for tenant '{user_id}'"
-        )
-        return [True, first_chunk]
+            if result.upload_errors or result.files_failed or not texts:
+                raise Exception("Vector store upload failed or returned no results")
 
-    except Exception as e:
-        error_msg = f"Error processing documents with LlamaParse: {str(e)}"
-        print(error_msg)
-        return False
+            ingest_span.count("objects", result.objects_uploaded)
+            print(
+                f"Documents processed successfully and Uploaded {result.objects_uploaded} objects to collection '{collection_name}' for tenant '{user_id}' ({len(unchanged_paths)} unchanged files skipped)"
+            )
+            succeeded = True
+            return [True, texts]
+
+        except Exception as e:
+            error_msg = f"Error processing documents with LlamaParse: {str(e)}"
+            print(error_msg)
+            ingest_span.record_error(e)
+            return False
 
-    finally:
-        if os.path.exists(input_dir):
-            shutil.rmtree(input_dir)
-            print(f"Cleaned up user-specific input directory: {input_dir}")
-        
-        if os.path.exists(output_dir):
-            shutil.rmtree(output_dir)
-            print(f"Cleaned up user-specific output directory: {output_dir}")
+        finally:
+            if succeeded:
+                if cleanup_input and os.path.exists(input_dir):
+                    shutil.rmtree(input_dir)
+                    print(f"Cleaned up job input directory: {input_dir}")
+
+                if os.path.exists(output_dir):
+                    shutil.rmtree(output_dir)
+                    print(f"Cleaned up job output directory: {output_dir}")
+            else:
+                # Keep the files and the checkpoint so the job can be resumed
+                print(f"Keeping {input_dir} and {output_dir} to resume the failed job")
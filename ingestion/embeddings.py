@@ -0,0 +1,363 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import (
+    EMBEDDER,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_DIMENSION,
+    EMBEDDING_MODEL,
+)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class Embedder(ABC):
+    """Base class for turning texts into embedding vectors.
+
+    Subclasses implement ``embed``; vectors are float32 and L2-normalized so a
+    dot product between two of them is their cosine similarity.
+
+    Attributes:
+        model_name: Name identifying the embedding model
+        dimension: Length of the produced vectors
+    """
+
+    model_name: str = ""
+    dimension: int = 0
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Array of shape (len(texts), dimension)
+        """
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a single query.
+
+        Args:
+            text: Query text
+
+        Returns:
+            Vector of length dimension
+        """
+        return self.embed([text])[0]
+
+
+@lru_cache(maxsize=65536)
+def _token_bucket(token: str, dimension: int):
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dimension, 1.0 if value >> 63 else -1.0
+
+
+class HashingEmbedder(Embedder):
+    """Offline embedder hashing lower-cased word unigrams and bigrams into a fixed-size vector.
+
+    It needs no model download or network access, which makes it suitable for
+    the local vector store, tests and benchmarks; it captures lexical overlap
+    only, not meaning.
+
+    Attributes:
+        model_name: Name identifying the embedding model
+        dimension: Length of the produced vectors
+    """
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION):
+        """Initialize the embedder.
+
+        Args:
+            dimension: Length of the produced vectors
+        """
+        self.dimension = dimension
+        self.model_name = f"hashing-{dimension}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Array of shape (len(texts), dimension)
+        """
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = TOKEN_PATTERN.findall(text.casefold())
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                index, sign = _token_bucket(feature, self.dimension)
+                vectors[row, index] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """Embedder running a sentence-transformers model locally.
+
+    Requires the optional ``sentence-transformers`` package.
+
+    Attributes:
+        model_name: Name identifying the embedding model
+        dimension: Length of the produced vectors
+        batch_size: Number of texts encoded per forward pass
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, batch_size: int = EMBEDDING_BATCH_SIZE):
+        """Load the model.
+
+        Args:
+            model_name: sentence-transformers model name or path
+            batch_size: Number of texts encoded per forward pass
+        """
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDER=sentence-transformers requires the sentence-transformers package"
+            ) from e
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model_name)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Array of shape (len(texts), dimension)
+        """
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        return np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dimension)
+
+
+class EmbeddingCache:
+    """SQLite store of embeddings keyed by the hash of (model, text).
+
+    Vectors are kept as raw float32 blobs, so an entry costs 4 bytes per
+    dimension plus its 32-byte key. Safe to share between threads.
+
+    Attributes:
+        path: Path of the SQLite database
+        hits: Number of vectors served from the cache
+        misses: Number of vectors not found
+    """
+
+    # SQLite limits the number of parameters per statement
+    _LOOKUP_CHUNK = 500
+
+    def __init__(self, path: str):
+        """Open (or create) the cache database.
+
+        Args:
+            path: Path of the SQLite database
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL) WITHOUT ROWID"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> bytes:
+        """Build the cache key of a text embedded by a model.
+
+        Args:
+            model_name: Name identifying the embedding model
+            text: Embedded text
+
+        Returns:
+            SHA-256 digest of the model name and text
+        """
+        return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).digest()
+
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """Look several keys up at once.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Dictionary of the keys found to their vectors
+        """
+        found: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(keys), self._LOOKUP_CHUNK):
+                chunk = keys[start:start + self._LOOKUP_CHUNK]
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items: Dict[bytes, np.ndarray]) -> None:
+        """Store several vectors at once.
+
+        Args:
+            items: Dictionary of cache key to vector
+        """
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items.items()],
+            )
+            self._connection.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the cache metrics.
+
+        Returns:
+            Dictionary with hits, misses and entries
+        """
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+class CachedEmbedder(Embedder):
+    """Embedder that serves vectors from an EmbeddingCache and embeds only the misses.
+
+    Misses are deduplicated and sent to the wrapped embedder in batches of
+    ``batch_size``, so re-embedding unchanged content costs no model calls.
+
+    Attributes:
+        embedder: Wrapped embedder
+        cache: Cache the vectors are read from and written to
+        batch_size: Maximum number of texts per call to the wrapped embedder
+        embedded: Number of texts sent to the wrapped embedder
+    """
+
+    def __init__(self, embedder: Embedder, cache: EmbeddingCache, batch_size: int = EMBEDDING_BATCH_SIZE):
+        """Wrap an embedder.
+
+        Args:
+            embedder: Embedder computing vectors on a cache miss
+            cache: Cache the vectors are read from and written to
+            batch_size: Maximum number of texts per call to the wrapped embedder
+        """
+        self.embedder = embedder
+        self.cache = cache
+        self.batch_size = batch_size
+        self.model_name = embedder.model_name
+        self.dimension = embedder.dimension
+        self.embedded = 0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts, using cached vectors where available.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Array of shape (len(texts), dimension)
+        """
+        keys = [EmbeddingCache.make_key(self.model_name, text) for text in texts]
+        vectors = self.cache.get_many(keys)
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        missing_keys = list(missing)
+        for start in range(0, len(missing_keys), self.batch_size):
+            batch_keys = missing_keys[start:start + self.batch_size]
+            batch_vectors = self.embedder.embed([missing[key] for key in batch_keys])
+            computed = dict(zip(batch_keys, batch_vectors))
+            self.cache.put_many(computed)
+            vectors.update(computed)
+            self.embedded += len(batch_keys)
+
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys]).astype(np.float32, copy=False)
+
+
+# Embedding caches by path, shared so every embedder uses one connection per database
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(path: str = EMBEDDING_CACHE_PATH) -> EmbeddingCache:
+    """Return the shared embedding cache for a database path.
+
+    Args:
+        path: Path of the SQLite database
+
+    Returns:
+        EmbeddingCache instance
+    """
+    path = os.path.abspath(path)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = EmbeddingCache(path)
+        return _caches[path]
+
+
+# Embedders by name, loaded once per process
+_embedders: Dict[str, Embedder] = {}
+_embedders_lock = threading.Lock()
+
+
+def get_embedder(name: Optional[str] = None) -> Optional[Embedder]:
+    """Return the embedder used for client-side vectors.
+
+    Embedders are created once per process. Model-backed embedders are
+    wrapped in a CachedEmbedder backed by EMBEDDING_CACHE_PATH unless that is
+    empty; the hashing embedder is cheaper to run than a cache lookup.
+
+    Args:
+        name: "hashing" or "sentence-transformers" (defaults to EMBEDDER)
+
+    Returns:
+        Embedder instance, or None when no client-side embedder is configured
+    """
+    name = name if name is not None else EMBEDDER
+    if not name:
+        return None
+
+    with _embedders_lock:
+        if name not in _embedders:
+            if name == "hashing":
+                embedder = HashingEmbedder()
+            elif name == "sentence-transformers":
+                embedder = SentenceTransformerEmbedder()
+                if EMBEDDING_CACHE_PATH:
+                    embedder = CachedEmbedder(embedder, get_embedding_cache(EMBEDDING_CACHE_PATH))
+            else:
+                raise ValueError(f"Unknown embedder {name!r}, expected 'hashing' or 'sentence-transformers'")
+            _embedders[name] = embedder
+        return _embedders[name]
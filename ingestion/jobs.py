@@ -0,0 +1,414 @@
+import asyncio
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import JOB_MAX_WORKERS, JOB_RETENTION_HOURS, JOBS_DIR, LOCAL_FILE_INPUT_DIR, LOCAL_FILE_OUTPUT_DIR
+from ingestion.doc_processor import process_llama_documents
+from ingestion.manifest import logical_filename
+from profiling import profile_request
+
+logger = logging.getLogger(__name__)
+
+# Number of recent progress messages kept per job
+MAX_JOB_EVENTS = 20
+
+
+def job_directories(tenant: str, job_id: str) -> Tuple[str, str]:
+    """Return the input and output directories of a job.
+
+    Both are scoped to the tenant and the job, so concurrent jobs never read
+    or clean up each other's files.
+
+    Args:
+        tenant: Tenant the documents are ingested for
+        job_id: Job ID
+
+    Returns:
+        Tuple of (input directory, output directory)
+    """
+    safe_tenant = re.sub(r"[^\w.-]", "_", tenant)
+    return (
+        os.path.join(LOCAL_FILE_INPUT_DIR, safe_tenant, job_id),
+        os.path.join(LOCAL_FILE_OUTPUT_DIR, safe_tenant, job_id),
+    )
+
+
+@dataclass
+class JobState:
+    """State of an ingestion job, updated from its progress events.
+
+    Attributes:
+        job_id: Job ID
+        tenant: Tenant the documents are ingested for
+        collection_name: Name of the collection
+        input_dir: Directory holding the job's documents
+        output_dir: Scratch directory of the job
+        profile: Whether the job is profiled even if the configuration does not ask for it
+        status: "queued", "running", "completed" or "failed"
+        created_at: Submission time (epoch seconds)
+        started_at: Time a worker picked the job up
+        finished_at: Time the job completed or failed
+        files_total: Number of new or changed files to ingest
+        files_skipped: Number of unchanged files skipped
+        files_parsed: Number of files parsed, not counting those that then failed to normalize
+        files_failed: Number of files that failed to parse or normalize
+        chunks: Number of chunks produced by normalization
+        objects_uploaded: Number of chunks uploaded
+        upload_errors: Number of upload batches that failed
+        error: Error message of a failed job
+        events: Most recent progress messages, oldest first
+        profile_paths: Files of the job's profile, if it was profiled
+    """
+
+    job_id: str
+    tenant: str
+    collection_name: str
+    input_dir: str = ""
+    output_dir: str = ""
+    profile: bool = False
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    files_total: int = 0
+    files_skipped: int = 0
+    files_parsed: int = 0
+    files_failed: int = 0
+    chunks: int = 0
+    objects_uploaded: int = 0
+    upload_errors: int = 0
+    error: Optional[str] = None
+    events: List[str] = field(default_factory=list)
+    profile_paths: List[str] = field(default_factory=list)
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job completed or failed."""
+        return self.status in ("completed", "failed")
+
+    @property
+    def progress(self) -> float:
+        """Estimated completion between 0 and 1.
+
+        Parsing accounts for the first half; uploading for the second half,
+        scaled by the share of files whose chunks are known.
+        """
+        if self.status == "completed":
+            return 1.0
+        if not self.files_total:
+            return 0.0
+        parsed = (self.files_parsed + self.files_failed) / self.files_total
+        uploaded = self.objects_uploaded / self.chunks if self.chunks else 0.0
+        return min(1.0, 0.5 * parsed + 0.5 * parsed * uploaded)
+
+
+class JobManager:
+    """Runs ingestion jobs on a bounded pool of worker threads.
+
+    Each job gets an ID, its own input and output directories and a JSON state file in ``jobs_dir`` that is rewritten
+    on every progress event, so the UI can poll it and a user can leave the
+    page and find the job again. The texts of the uploaded chunks are saved
+    next to it for the post-ingestion summary until it is generated. Jobs that
+    were queued or running when the process stopped are marked failed on startup.
+    Finished jobs older than the retention period are removed with their files.
+
+    Attributes:
+        jobs_dir: Directory holding the job state files
+        max_workers: Maximum number of jobs running at the same time
+        retention_hours: Hours a finished job is kept, 0 to keep jobs forever
+    """
+
+    def __init__(
+        self,
+        jobs_dir: str = JOBS_DIR,
+        max_workers: int = JOB_MAX_WORKERS,
+        process_fn: Callable[..., Awaitable[Any]] = process_llama_documents,
+        retention_hours: float = JOB_RETENTION_HOURS,
+    ):
+        """Load the persisted jobs and start the worker pool.
+
+        Args:
+            jobs_dir: Directory holding the job state files
+            max_workers: Maximum number of jobs running at the same time
+            process_fn: Coroutine function ingesting a tenant's documents, called as
+                process_fn(user_id=, collection_name=, input_dir=, output_dir=, on_progress=)
+            retention_hours: Hours a finished job is kept, 0 to keep jobs forever
+        """
+        self.jobs_dir = jobs_dir
+        self.max_workers = max(1, max_workers)
+        self._process_fn = process_fn
+        self.retention_hours = retention_hours
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, JobState] = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest-job")
+
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._load()
+        self._prune()
+
+    def _state_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _texts_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.texts.json")
+
+    def _load(self) -> None:
+        names = {item.name for item in fields(JobState)}
+        for entry in os.listdir(self.jobs_dir):
+            if not entry.endswith(".json") or entry.endswith(".texts.json"):
+                continue
+            try:
+                with open(os.path.join(self.jobs_dir, entry), "r", encoding="utf-8") as f:
+                    job = JobState(**{key: value for key, value in json.load(f).items() if key in names})
+            except (OSError, json.JSONDecodeError, TypeError) as e:
+                logger.warning(f"Ignoring unreadable job state {entry}: {str(e)}")
+                continue
+            if not job.finished:
+                job.status = "failed"
+                job.error = "Interrupted by a restart"
+                job.finished_at = time.time()
+                self._save(job)
+            self._jobs[job.job_id] = job
+
+    def _prune(self) -> None:
+        """Remove the finished jobs older than the retention period, with their files."""
+        if self.retention_hours <= 0:
+            return
+        cutoff = time.time() - self.retention_hours * 3600
+        with self._lock:
+            expired = [job for job in self._jobs.values() if job.finished and (job.finished_at or 0) < cutoff]
+            for job in expired:
+                del self._jobs[job.job_id]
+        for job in expired:
+            for path in (self._state_path(job.job_id), self._texts_path(job.job_id)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            # Failed jobs keep their documents for a retry
+            for directory in (job.input_dir, job.output_dir):
+                if directory:
+                    shutil.rmtree(directory, ignore_errors=True)
+        if expired:
+            logger.info(f"Removed {len(expired)} ingestion jobs older than {self.retention_hours} hours")
+
+    def _save(self, job: JobState) -> None:
+        tmp_path = f"{self._state_path(job.job_id)}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(job), f)
+        os.replace(tmp_path, self._state_path(job.job_id))
+
+    def _update(self, job_id: str, event: Optional[str] = None, **changes: Any) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            for key, value in changes.items():
+                setattr(job, key, value)
+            if event:
+                job.events = (job.events + [event])[-MAX_JOB_EVENTS:]
+            self._save(job)
+
+    def _on_progress(self, job_id: str, event: str, details: Dict[str, Any]) -> None:
+        counters = {
+            key: details[key]
+            for key in ("files_total", "files_parsed", "files_failed", "objects_uploaded", "upload_errors")
+            if key in details
+        }
+        name = logical_filename(details.get("file_path", ""))
+        if event == "files_listed":
+            counters["files_skipped"] = details["files_skipped"]
+            message = f"Found {details['files_total']} new or changed files, skipping {details['files_skipped']} unchanged"
+        elif event == "file_parsed":
+            message = f"Parsed {name}"
+        elif event == "file_failed":
+            message = f"Failed {name}: {details.get('error', '')}"
+        elif event == "file_normalized":
+            with self._lock:
+                counters["chunks"] = self._jobs[job_id].chunks + details["chunks"]
+            message = f"Split {name} into {details['chunks']} chunks"
+        elif event == "batch_uploaded":
+            message = f"Uploaded {details['batch_size']} chunks"
+        elif event == "batch_failed":
+            message = f"Failed to upload {details['batch_size']} chunks"
+        else:
+            message = event
+        self._update(job_id, event=message, **counters)
+
+    def _run(self, job_id: str) -> None:
+        self._prune()
+        job = self.get(job_id)
+        self._update(job_id, event="Started", status="running", started_at=time.time())
+        try:
+            with profile_request("ingest", job.tenant, request_id=job_id, force=job.profile) as profile:
+                result = asyncio.run(
+                    self._process_fn(
+                        user_id=job.tenant,
+                        collection_name=job.collection_name,
+                        input_dir=job.input_dir,
+                        output_dir=job.output_dir,
+                        on_progress=lambda event, details: self._on_progress(job_id, event, details),
+                    )
+                )
+            if profile is not None:
+                self._update(job_id, profile_paths=profile.paths)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            self._update(job_id, event="Failed", status="failed", error=str(e), finished_at=time.time())
+            return
+
+        if not result:
+            self._update(
+                job_id,
+                event="Failed",
+                status="failed",
+                error="Processing failed; retry the job to resume it",
+                finished_at=time.time(),
+            )
+            return
+
+        with open(self._texts_path(job_id), "w", encoding="utf-8") as f:
+            json.dump(result[1], f)
+        self._update(job_id, event="Completed", status="completed", finished_at=time.time())
+
+    def submit(self, tenant: str, collection_name: str, file_paths: List[str], profile: bool = False) -> str:
+        """Queue an ingestion job for a set of files.
+
+        The files are moved into the job's input directory, which the job
+        removes once it succeeds.
+
+        Args:
+            tenant: Tenant the documents are ingested for
+            collection_name: Name of the collection
+            file_paths: Paths of the documents to ingest
+            profile: Profile the job even if the configuration does not ask for it
+
+        Returns:
+            Job ID
+        """
+        job_id = uuid.uuid4().hex
+        input_dir, output_dir = job_directories(tenant, job_id)
+        os.makedirs(input_dir, exist_ok=True)
+        for file_path in file_paths:
+            shutil.move(file_path, os.path.join(input_dir, os.path.basename(file_path)))
+
+        job = JobState(
+            job_id=job_id,
+            tenant=tenant,
+            collection_name=collection_name,
+            input_dir=input_dir,
+            output_dir=output_dir,
+            profile=profile,
+        )
+        with self._lock:
+            self._jobs[job_id] = job
+            self._save(job)
+        self._executor.submit(self._run, job_id)
+        logger.info(f"Queued ingestion job {job_id} for tenant '{tenant}' with {len(file_paths)} files")
+        return job_id
+
+    def resume(self, job_id: str) -> bool:
+        """Queue a failed job again.
+
+        The job keeps its directories, so it picks up from its checkpoint.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            True if the job was queued, False if it is unknown, not failed or its files are gone
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != "failed" or not os.path.isdir(job.input_dir):
+                return False
+            job.status = "queued"
+            job.error = None
+            job.finished_at = None
+            # The counters restart with the new run
+            job.files_parsed = job.files_failed = job.chunks = job.objects_uploaded = job.upload_errors = 0
+            job.events = (job.events + ["Resumed"])[-MAX_JOB_EVENTS:]
+            self._save(job)
+        self._executor.submit(self._run, job_id)
+        logger.info(f"Resumed ingestion job {job_id}")
+        return True
+
+    def get(self, job_id: str) -> Optional[JobState]:
+        """Return a snapshot of a job's state.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Copy of the job state, or None if the job is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return JobState(**asdict(job)) if job else None
+
+    def list_jobs(self, tenant: Optional[str] = None) -> List[JobState]:
+        """Return snapshots of the known jobs, most recent first.
+
+        Args:
+            tenant: Only return the jobs of this tenant
+
+        Returns:
+            List of job states
+        """
+        with self._lock:
+            jobs = [
+                JobState(**asdict(job))
+                for job in self._jobs.values()
+                if tenant is None or job.tenant == tenant
+            ]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def get_texts(self, job_id: str) -> List[str]:
+        """Return the texts of the chunks a completed job ingested.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Chunk texts, or an empty list if the job has not completed or its texts were discarded
+        """
+        try:
+            with open(self._texts_path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return []
+
+    def discard_texts(self, job_id: str) -> None:
+        """Delete the saved chunk texts of a job once its summary no longer needs them.
+
+        Args:
+            job_id: Job ID
+        """
+        try:
+            os.remove(self._texts_path(job_id))
+        except FileNotFoundError:
+            pass
+
+
+_job_manager: Optional[JobManager] = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Return the process-wide job manager, creating it on first use.
+
+    Returns:
+        JobManager instance
+    """
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+        return _job_manager
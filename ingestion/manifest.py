@@ -0,0 +1,202 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+import logging
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Prefix app.save_uploaded_pdf adds to make stored upload names unique
+UPLOAD_PREFIX = re.compile(
+    r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_", re.IGNORECASE
+)
+
+# Namespace of the deterministic chunk IDs
+CHUNK_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "rag-chunks")
+
+
+def chunk_object_id(tenant: str, filename: str, file_hash: str, chunk_index: int) -> str:
+    """Return the deterministic object ID of a chunk.
+
+    Uploading the same content again under the same name for the same tenant
+    produces the same IDs, so re-uploads replace objects instead of
+    duplicating them. Identical files under different names get their own
+    objects, since each name's chunks are stored and deleted separately.
+
+    Args:
+        tenant: Tenant name
+        filename: Logical filename of the source file
+        file_hash: SHA-256 hex digest of the source file
+        chunk_index: Index of the chunk within the file
+
+    Returns:
+        UUIDv5 string
+    """
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{tenant}:{filename}:{file_hash}:{chunk_index}"))
+
+
+def logical_filename(file_path: str) -> str:
+    """Return the name a file is tracked under, without the upload prefix.
+
+    Args:
+        file_path: Path or name of an uploaded file
+
+    Returns:
+        Base name with any leading ``<uuid4>_`` removed
+    """
+    return UPLOAD_PREFIX.sub("", os.path.basename(file_path), count=1)
+
+
+class TenantManifest:
+    """Record of the files ingested for one tenant of one collection.
+
+    Maps each logical filename to the SHA-256 of its content, the filename
+    property its chunks were stored under and the IDs of those chunks, so
+    ingestion can skip files whose content has not changed and remove the
+    previous chunks of files that have. Saved as a JSON file, replaced
+    atomically on every save.
+
+    Attributes:
+        path: Path of the manifest file
+        files: Logical filename -> {"hash", "stored_filename", "object_ids", "updated_at"}
+    """
+
+    # Locks serializing load-modify-save cycles, by manifest path
+    _locks: Dict[str, threading.Lock] = {}
+    _locks_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        """Load the manifest, starting empty if the file does not exist.
+
+        Args:
+            path: Path of the manifest file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self.files: Dict[str, Dict] = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.files = json.load(f).get("files", {})
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable manifest {path}: {str(e)}")
+
+    @classmethod
+    def for_tenant(cls, manifest_dir: str, collection_name: str, tenant: str) -> "TenantManifest":
+        """Open the manifest of a tenant in a collection.
+
+        Args:
+            manifest_dir: Directory holding the manifests
+            collection_name: Name of the collection
+            tenant: Tenant name
+
+        Returns:
+            TenantManifest instance
+        """
+        safe = lambda name: re.sub(r"[^\w.-]", "_", name)
+        return cls(os.path.join(manifest_dir, safe(collection_name), f"{safe(tenant)}.json"))
+
+    @classmethod
+    def lock_for(cls, path: str) -> threading.Lock:
+        """Return the process-wide lock of a manifest file.
+
+        Concurrent jobs of the same tenant hold it while they reload, update and
+        save the manifest, so neither overwrites the other's entries.
+
+        Args:
+            path: Path of the manifest file
+
+        Returns:
+            Lock shared by every job using this manifest
+        """
+        path = os.path.abspath(path)
+        with cls._locks_lock:
+            return cls._locks.setdefault(path, threading.Lock())
+
+    def get(self, filename: str) -> Optional[Dict]:
+        """Return the entry of a logical filename.
+
+        Args:
+            filename: Logical filename
+
+        Returns:
+            Entry dictionary, or None if the file was never ingested
+        """
+        with self._lock:
+            return self.files.get(filename)
+
+    def is_unchanged(self, filename: str, file_hash: str) -> bool:
+        """Check whether a file was already ingested with the same content.
+
+        Args:
+            filename: Logical filename
+            file_hash: SHA-256 hex digest of the file's current content
+
+        Returns:
+            True if the recorded hash matches
+        """
+        entry = self.get(filename)
+        return entry is not None and entry["hash"] == file_hash
+
+    def record(self, filename: str, file_hash: str, stored_filename: str, object_ids: List[str]) -> None:
+        """Record the chunks uploaded for a file, replacing any previous entry.
+
+        Args:
+            filename: Logical filename
+            file_hash: SHA-256 hex digest of the ingested content
+            stored_filename: Value of the filename property of the chunks
+            object_ids: IDs of the uploaded chunks
+        """
+        with self._lock:
+            self.files[filename] = {
+                "hash": file_hash,
+                "stored_filename": stored_filename,
+                "object_ids": list(object_ids),
+                "updated_at": time.time(),
+            }
+
+    def referenced_ids(self, exclude: Optional[str] = None) -> Set[str]:
+        """Return the object IDs recorded for every file.
+
+        Chunk IDs include the filename, so files no longer share IDs. Files
+        ingested before they did may still share them when their content is
+        identical, which is why the previous chunks of a changed file are only
+        deleted if no other file references them.
+
+        Args:
+            exclude: Logical filename whose IDs are left out
+
+        Returns:
+            Set of object IDs
+        """
+        with self._lock:
+            return {
+                object_id
+                for filename, entry in self.files.items()
+                if filename != exclude
+                for object_id in entry["object_ids"]
+            }
+
+    def remove(self, filename: str) -> None:
+        """Forget a file.
+
+        Args:
+            filename: Logical filename
+        """
+        with self._lock:
+            self.files.pop(filename, None)
+
+    def save(self) -> None:
+        """Write the manifest to disk atomically."""
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"files": self.files}, f)
+            os.replace(tmp_path, self.path)
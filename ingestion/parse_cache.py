@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+from llama_index.core import Document
+
+logger = logging.getLogger(__name__)
+
+
+def hash_file(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 hex digest of a file's bytes.
+
+    Args:
+        file_path: Path to the file
+        block_size: Number of bytes read per iteration
+
+    Returns:
+        Hex digest of the file content
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """Persistent, size-bounded on-disk cache of parsed documents.
+
+    Entries are keyed by the SHA-256 of the file bytes combined with the parser
+    settings, so the same PDF uploaded under a different name (or by a different
+    user) is only ever parsed once. When the total size exceeds ``max_bytes`` the
+    least recently used entries are evicted.
+
+    Attributes:
+        cache_dir: Directory holding the cached entries and the index
+        max_bytes: Maximum total size of cached entries in bytes
+        hits: Number of cache hits since the cache was opened
+        misses: Number of cache misses since the cache was opened
+        evictions: Number of entries evicted since the cache was opened
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        """Open (or create) the cache directory and load its index.
+
+        Args:
+            cache_dir: Directory holding the cached entries
+            max_bytes: Maximum total size of cached entries in bytes
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    @staticmethod
+    def make_key(file_hash: str, settings: Dict[str, Any]) -> str:
+        """Build a cache key from a file hash and the parser settings.
+
+        Args:
+            file_hash: SHA-256 hex digest of the file bytes
+            settings: Parser settings that influence the output (e.g. result_type)
+
+        Returns:
+            Cache key
+        """
+        payload = json.dumps(settings, sort_keys=True)
+        return hashlib.sha256(f"{file_hash}:{payload}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Document]]:
+        """Return the cached documents for a key, or None on a miss.
+
+        Args:
+            key: Cache key from ``make_key``
+
+        Returns:
+            List of documents, or None if the key is not cached
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            try:
+                with open(self._entry_path(key), "r") as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Dropping unreadable parse cache entry {key}: {e}")
+                self._remove(key)
+                self._save_index()
+                self.misses += 1
+                return None
+
+            entry["last_access"] = time.time()
+            self._save_index()
+            self.hits += 1
+
+        return [Document(**item) for item in data]
+
+    def put(self, key: str, documents: List[Document]) -> None:
+        """Store parsed documents under a key and evict old entries if needed.
+
+        Empty results are not stored: they usually mean the parse failed, and
+        caching them would hide the file's content for good.
+
+        Args:
+            key: Cache key from ``make_key``
+            documents: Parsed documents to cache
+        """
+        if not documents:
+            return
+        data = json.dumps(
+            [{"id_": doc.id_, "text": doc.text, "metadata": doc.metadata} for doc in documents]
+        )
+
+        with self._lock:
+            entry_path = self._entry_path(key)
+            tmp_path = f"{entry_path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, entry_path)
+
+            self._index[key] = {
+                "size": len(data.encode("utf-8")),
+                "last_access": time.time(),
+            }
+            self._evict()
+            self._save_index()
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache counters and current size.
+
+        Returns:
+            Dictionary with hits, misses, evictions, entries and bytes
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "bytes": sum(entry["size"] for entry in self._index.values()),
+            }
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_index(self) -> Dict[str, Dict[str, float]]:
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return {}
+        try:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Parse cache index is unreadable, starting empty: {e}")
+            return {}
+        # Forget entries whose payload has disappeared from disk
+        return {key: entry for key, entry in index.items() if os.path.exists(self._entry_path(key))}
+
+    def _save_index(self) -> None:
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, index_path)
+
+    def _remove(self, key: str) -> None:
+        self._index.pop(key, None)
+        try:
+            os.remove(self._entry_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        total = sum(entry["size"] for entry in self._index.values())
+        if total <= self.max_bytes:
+            return
+
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= entry["size"]
+            self._remove(key)
+            self.evictions += 1
+            logger.info(f"Evicted parse cache entry {key}")
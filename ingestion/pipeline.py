@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's output on its queue
+_END = object()
+
+
+@dataclass
+class PipelineResult:
+    """Counters collected while a pipeline run streams documents through its stages.
+
+    Attributes:
+        files_total: Number of files handed to the parse stage
+        files_parsed: Number of files parsed successfully, less those that then failed to normalize
+        files_failed: Number of files that failed to parse or normalize
+        documents: Number of parsed documents
+        objects: Number of normalized objects handed to the upload stage
+        objects_uploaded: Number of objects in batches that uploaded successfully
+        upload_errors: Status messages of batches that failed to upload
+        texts: Texts of the uploaded objects, in upload order
+    """
+
+    files_total: int = 0
+    files_parsed: int = 0
+    files_failed: int = 0
+    documents: int = 0
+    objects: int = 0
+    objects_uploaded: int = 0
+    upload_errors: List[str] = field(default_factory=list)
+    texts: List[str] = field(default_factory=list)
+
+    def counters(self) -> Dict[str, int]:
+        """Return the numeric counters, for progress reporting.
+
+        Returns:
+            Dictionary of counter name to value
+        """
+        return {
+            "files_total": self.files_total,
+            "files_parsed": self.files_parsed,
+            "files_failed": self.files_failed,
+            "documents": self.documents,
+            "objects": self.objects,
+            "objects_uploaded": self.objects_uploaded,
+            "upload_errors": len(self.upload_errors),
+        }
+
+
+async def run_pipeline(
+    file_paths: List[str],
+    parse_fn: Callable[[str], Awaitable[List[Any]]],
+    normalize_fn: Callable[[str, List[Any]], Awaitable[List[Dict]]],
+    upload_fn: Callable[[List[Dict]], Awaitable[bool]],
+    parse_concurrency: int = 4,
+    queue_size: int = 8,
+    upload_batch_size: int = 100,
+    on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> PipelineResult:
+    """Stream files through parse -> normalize -> upload stages.
+
+    Each stage runs concurrently and hands work to the next one through a
+    bounded queue, so a slow stage applies backpressure to the stages before it
+    and only ``queue_size`` items per queue are ever held in memory. Objects are
+    uploaded in batches of ``upload_batch_size`` as soon as they are normalized,
+    so the first chunks become searchable before the last file finishes parsing.
+
+    Args:
+        file_paths: Paths of the files to ingest
+        parse_fn: Coroutine parsing one file into documents
+        normalize_fn: Coroutine turning one file's documents into upload records
+        upload_fn: Coroutine uploading one batch of records, returning success
+        parse_concurrency: Number of files parsed at the same time
+        queue_size: Maximum number of items buffered between two stages
+        upload_batch_size: Number of records sent per upload call
+        on_progress: Optional callback invoked as (event, details) whenever a file is
+            parsed, fails or is normalized and whenever a batch is uploaded or fails;
+            details hold the event's file or batch size plus the run's counters
+
+    Returns:
+        PipelineResult: Counters for the run
+    """
+    result = PipelineResult(files_total=len(file_paths))
+    pending_files: asyncio.Queue = asyncio.Queue()
+    parsed_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    record_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size * upload_batch_size)
+
+    for file_path in file_paths:
+        pending_files.put_nowait(file_path)
+
+    def report(event: str, **details: Any) -> None:
+        if on_progress:
+            try:
+                on_progress(event, {**details, **result.counters()})
+            except Exception as e:
+                logger.warning(f"Progress callback failed for {event}: {str(e)}")
+
+    async def parse_worker() -> None:
+        while True:
+            try:
+                file_path = pending_files.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                documents = await parse_fn(file_path)
+            except Exception as e:
+                result.files_failed += 1
+                logger.error(f"Error parsing file {file_path}: {str(e)}")
+                report("file_failed", file_path=file_path, error=str(e))
+                continue
+            result.files_parsed += 1
+            result.documents += len(documents)
+            logger.info(f"Parsed {result.files_parsed + result.files_failed}/{result.files_total} files ({file_path})")
+            report("file_parsed", file_path=file_path)
+            await parsed_queue.put((file_path, documents))
+
+    async def parse_stage() -> None:
+        workers = max(1, min(parse_concurrency, len(file_paths)))
+        await asyncio.gather(*(parse_worker() for _ in range(workers)))
+        await parsed_queue.put(_END)
+
+    async def normalize_stage() -> None:
+        while (item := await parsed_queue.get()) is not _END:
+            file_path, documents = item
+            try:
+                records = await normalize_fn(file_path, documents)
+            except Exception as e:
+                # Counted as parsed when it was parsed; each file is counted only once
+                result.files_parsed -= 1
+                result.files_failed += 1
+                logger.error(f"Error normalizing file {file_path}: {str(e)}")
+                report("file_failed", file_path=file_path, error=str(e))
+                continue
+            report("file_normalized", file_path=file_path, chunks=len(records))
+            for record in records:
+                await record_queue.put(record)
+        await record_queue.put(_END)
+
+    async def upload_batch(batch: List[Dict]) -> None:
+        if await upload_fn(batch):
+            result.objects_uploaded += len(batch)
+            result.texts.extend(record.get("text", "") for record in batch)
+            report("batch_uploaded", batch_size=len(batch))
+        else:
+            result.upload_errors.append(f"Failed to upload a batch of {len(batch)} objects")
+            report("batch_failed", batch_size=len(batch))
+
+    async def upload_stage() -> None:
+        batch = []
+        while (record := await record_queue.get()) is not _END:
+            result.objects += 1
+            batch.append(record)
+            if len(batch) >= upload_batch_size:
+                await upload_batch(batch)
+                batch = []
+        if batch:
+            await upload_batch(batch)
+
+    async with asyncio.TaskGroup() as group:
+        group.create_task(parse_stage())
+        group.create_task(normalize_stage())
+        group.create_task(upload_stage())
+
+    return result
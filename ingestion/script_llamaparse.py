@@ -1,92 +1,76 @@
+import gzip
 import json
-import os
-import asyncio
-from typing import List, Dict
+from typing import Any, Iterable, List, Dict, Optional
 
 
-async def process_json_file(file_path: str) -> None:
+def normalize_item(item: Dict[str, Any]) -> Optional[Dict[str, str]]:
     """
-    Process a single JSON file to extract filename and text fields
-    and save the processed data back to the same file
-    
+    Extract the filename and text fields from a serialized document
+
     Args:
-        file_path: Path to the JSON file to process
+        item: Document as a dictionary (LlamaIndex dump or an already normalized record)
+
+    Returns:
+        Record with filename and text, or None if either field is missing
     """
-    try:
-        # Read the JSON file
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        
-        # Check if the data is a dictionary (single document) or list (multiple documents)
-        if isinstance(data, dict):
-            data = [data]  # Convert to list for consistent processing
-        
-        # Create a list to store processed items
-        processed_items = []
-        
-        for item in data:
-            processed_item = {}
-            
-            # Extract filename from metadata if it exists
-            if 'metadata' in item and 'file_name' in item['metadata']:
-                processed_item['filename'] = item['metadata']['file_name']
-            elif 'filename' in item:
-                processed_item['filename'] = item['filename']
-            
-            # Extract text content
-            if 'text' in item:
-                processed_item['text'] = item['text']
-            
-            # Only add items that have both text and filename
-            if 'text' in processed_item and 'filename' in processed_item:
-                processed_items.append(processed_item)
-        
-        # Write back to the same file
-        if processed_items:
-            with open(file_path, 'w') as f:
-                json.dump(processed_items, f, indent=2)
-            
-            print(f"Successfully processed and updated {file_path}")
-        else:
-            print(f"No valid data found in {file_path}")
-            
-    except Exception as e:
-        print(f"Error processing {file_path}: {str(e)}")
+    processed_item = {}
+
+    # Extract filename from metadata if it exists
+    if 'metadata' in item and 'file_name' in item['metadata']:
+        processed_item['filename'] = item['metadata']['file_name']
+    elif 'filename' in item:
+        processed_item['filename'] = item['filename']
+
+    # Extract text content
+    if 'text' in item:
+        processed_item['text'] = item['text']
 
-def find_json_files(directory: str) -> List[str]:
+    # Only keep items that have both text and filename
+    if 'text' in processed_item and 'filename' in processed_item:
+        return processed_item
+    return None
+
+
+def normalize_documents(documents: Iterable[Any]) -> List[Dict[str, Any]]:
     """
-    Find all JSON files in the given directory.
+    Turn LlamaIndex Document objects into filename/text records in memory
+
+    LlamaParse returns one document per page, in page order, so each record
+    also gets the 1-based page number of its document within its file.
     
     Args:
-        directory: Directory to search for JSON files
+        documents: Parsed documents
         
     Returns:
-        List of paths to JSON files
+        List of records with filename, text and page fields
     """
-    json_files = []
-    for file in os.listdir(directory):
-        if file.endswith('.json'):
-            json_files.append(os.path.join(directory, file))
-    return json_files
+    records = []
+    page_counters = {}
+    for doc in documents:
+        record = normalize_item({'text': doc.text, 'metadata': doc.metadata})
+        if record:
+            page = page_counters.get(record['filename'], 0) + 1
+            page_counters[record['filename']] = page
+            record['page'] = page
+            records.append(record)
+    return records
 
-async def run_llama_script(input_dir: str):
+
+def export_records(records: List[Dict], output_path: str, compress: bool = False) -> None:
     """
-    Asynchronously process all JSON files in a directory and save results back to the same files.
+    Append records to a compact JSON Lines file for debugging or export
     
     Args:
-        input_dir: Directory containing JSON files to process
+        records: Records to write
+        output_path: Path of the JSONL file (".gz" is appended when compressing)
+        compress: Whether to gzip the output
     """
-    json_files = find_json_files(input_dir)
-    
-    if not json_files:
-        print(f"No JSON files found in {input_dir}")
-        return
-    
-    print(f"Found {len(json_files)} JSON files in {input_dir}")
-    
-    # Process each file, saving back to the original file
-    for file_path in json_files:
-        await process_json_file(file_path)
-    
-    print(f"All files processed. Results saved back to original files.")
+    if compress and not output_path.endswith('.gz'):
+        output_path = f"{output_path}.gz"
+
+    opener = gzip.open if compress else open
+    with opener(output_path, 'at', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(',', ':')))
+            f.write('\n')
 
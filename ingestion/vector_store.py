@@ -0,0 +1,954 @@
+import json
+import math
+import os
+import re
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cache import invalidate_tenant
+from config import (
+    HYBRID_ALPHA,
+    LOCAL_VECTOR_STORE_DIR,
+    SEARCH_MODE,
+    VECTOR_STORE,
+    WEAVIATE_API_KEY,
+    WEAVIATE_REST_URL,
+)
+from ingestion.embeddings import TOKEN_PATTERN, Embedder, get_embedder
+from ingestion.weaviate_client import SEARCH_MODES, Filter, QueryManager
+
+try:
+    import fcntl
+except ImportError:  # Windows; index files are not locked there
+    fcntl = None
+
+# Property name -> required value, or list of accepted values
+PropertyFilters = Dict[str, Any]
+
+
+@dataclass
+class ObjectMetadata:
+    """Ranking metadata of a returned object, mirroring Weaviate's MetadataReturn.
+
+    Attributes:
+        distance: Cosine distance to the query vector (None for keyword-only results)
+        score: Ranking score, higher is better
+    """
+
+    distance: Optional[float] = None
+    score: Optional[float] = None
+
+
+@dataclass
+class StoredObject:
+    """Object returned by a vector store, shaped like a Weaviate result object.
+
+    Attributes:
+        uuid: Object ID
+        properties: Object properties (filename, text, ...)
+        metadata: Ranking metadata
+    """
+
+    uuid: str
+    properties: Dict[str, Any]
+    metadata: ObjectMetadata = field(default_factory=ObjectMetadata)
+
+
+def to_weaviate_filter(filters: Optional[PropertyFilters]) -> Optional[Filter]:
+    """Translate property filters into a Weaviate filter.
+
+    Args:
+        filters: Property filters, all of which must match
+
+    Returns:
+        Equivalent Weaviate filter, or None when there are no filters
+    """
+    if not filters:
+        return None
+    conditions = [
+        Filter.by_property(name).contains_any(list(value))
+        if isinstance(value, (list, tuple, set))
+        else Filter.by_property(name).equal(value)
+        for name, value in filters.items()
+    ]
+    return conditions[0] if len(conditions) == 1 else Filter.all_of(conditions)
+
+
+def matches_filters(properties: Dict[str, Any], filters: Optional[PropertyFilters]) -> bool:
+    """Check whether an object's properties satisfy property filters.
+
+    Args:
+        properties: Object properties
+        filters: Property filters, all of which must match
+
+    Returns:
+        True if every filter matches
+    """
+    for name, value in (filters or {}).items():
+        accepted = value if isinstance(value, (list, tuple, set)) else [value]
+        if properties.get(name) not in accepted:
+            return False
+    return True
+
+
+class VectorStore(ABC):
+    """Tenant-scoped object storage with text and vector search.
+
+    Covers what the app needs from ``DataManager`` and ``QueryManager`` so the
+    backend can be swapped through ``get_vector_store``. Stores are context
+    managers; ``close`` releases whatever the backend holds.
+    """
+
+    @abstractmethod
+    def upload_objects(
+        self,
+        collection_name: str,
+        data_objects: List[Dict],
+        tenant: str,
+        vectors: Optional[Sequence[Sequence[float]]] = None,
+        uuids: Optional[Sequence[str]] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+    ) -> str:
+        """Upload data objects for a tenant.
+
+        Args:
+            collection_name: Name of the collection
+            data_objects: Objects to upload, each with at least a text property
+            tenant: Tenant name
+            vectors: Optional precomputed vectors, one per object
+            uuids: Optional object IDs, one per object; an existing object with the same ID is replaced
+            max_retries: Retries of objects that failed to upload, for stores that retry
+                (None uses the store's default)
+            backoff_base: Seconds before the first retry (None uses the store's default)
+
+        Returns:
+            Status message, starting with "Successfully" when every object was stored
+        """
+
+    @abstractmethod
+    def delete_objects(self, collection_name: str, tenant: str, filenames: List[str]) -> str:
+        """Delete every object of the given files for a tenant.
+
+        Args:
+            collection_name: Name of the collection
+            tenant: Tenant name
+            filenames: Values of the filename property to delete
+
+        Returns:
+            Status message
+        """
+
+    @abstractmethod
+    def delete_objects_by_id(self, collection_name: str, tenant: str, object_ids: List[str]) -> str:
+        """Delete objects by ID for a tenant.
+
+        Args:
+            collection_name: Name of the collection
+            tenant: Tenant name
+            object_ids: IDs of the objects to delete
+
+        Returns:
+            Status message, starting with "Successfully" when the delete went through
+        """
+
+    @abstractmethod
+    def query_by_text(
+        self,
+        collection_name: str,
+        tenant: str,
+        query_text: str,
+        filters: Optional[PropertyFilters] = None,
+        limit: int = 5,
+        search_mode: Optional[str] = None,
+        alpha: Optional[float] = None,
+    ) -> List[Any]:
+        """Search objects by text.
+
+        Args:
+            collection_name: Name of the collection
+            tenant: Tenant name
+            query_text: Text to search for
+            filters: Optional property filters
+            limit: Maximum number of results
+            search_mode: "near_text", "hybrid" or "bm25" (defaults to SEARCH_MODE)
+            alpha: Hybrid weighting, 0.0 is pure keyword and 1.0 pure vector (defaults to HYBRID_ALPHA)
+
+        Returns:
+            Objects with uuid, properties and metadata.distance/score, best first
+        """
+
+    @abstractmethod
+    def query_by_vector(
+        self,
+        collection_name: str,
+        tenant: str,
+        vector: Sequence[float],
+        filters: Optional[PropertyFilters] = None,
+        limit: int = 5,
+    ) -> List[Any]:
+        """Search objects by similarity to a precomputed vector.
+
+        Args:
+            collection_name: Name of the collection
+            tenant: Tenant name
+            vector: Query embedding
+            filters: Optional property filters
+            limit: Maximum number of results
+
+        Returns:
+            Objects with uuid, properties and metadata.distance/score, best first
+        """
+
+    @abstractmethod
+    def fetch_objects(
+        self,
+        collection_name: str,
+        tenant: str,
+        filters: Optional[PropertyFilters] = None,
+        limit: Optional[int] = None,
+    ) -> List[Any]:
+        """Fetch objects matching property filters, without ranking.
+
+        Args:
+            collection_name: Name of the collection
+            tenant: Tenant name
+            filters: Optional property filters
+            limit: Maximum number of results
+
+        Returns:
+            Objects with uuid and properties
+        """
+
+    def query_docs(
+        self,
+        collection_name: str,
+        tenant: str,
+        property_name: str,
+        property_values: Dict[str, str],
+    ) -> Dict[str, str]:
+        """Fetch objects by property value and join their texts per file.
+
+        Args:
+            collection_name: Name of the collection
+            tenant: Tenant name
+            property_name: Property name to filter on
+            property_values: Mapping of property value to the display filename
+
+        Returns:
+            Dictionary of display filename to the combined text of its objects
+        """
+        objects = self.fetch_objects(
+            collection_name, tenant, filters={property_name: list(property_values)}
+        )
+        texts_by_file: Dict[str, List[str]] = {}
+        for obj in objects:
+            filename = property_values[obj.properties[property_name]]
+            texts_by_file.setdefault(filename, []).append(obj.properties["text"])
+        return {filename: " ".join(texts) for filename, texts in texts_by_file.items()}
+
+    def close(self, discard: bool = False) -> None:
+        """Release the resources held by the store.
+
+        Args:
+            discard: Drop any pooled connection instead of reusing it
+        """
+
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit; pooled connections are discarded if an error escaped."""
+        self.close(discard=exc_type is not None)
+
+
+class WeaviateVectorStore(VectorStore):
+    """Vector store backed by a Weaviate Cloud collection.
+
+    When a client-side embedder is configured, objects are uploaded with
+    precomputed vectors and queries send the query embedding, so Weaviate does
+    no vectorization; otherwise the collection's vectorizer is used.
+
+    Attributes:
+        manager: QueryManager holding a pooled connection
+        embedder: Optional client-side embedder
+    """
+
+    def __init__(
+        self,
+        wcd_url: str = WEAVIATE_REST_URL,
+        wcd_api_key: str = WEAVIATE_API_KEY,
+        embedder: Optional[Embedder] = None,
+    ):
+        """Borrow a connection from the Weaviate pool.
+
+        Args:
+            wcd_url: Weaviate Cloud URL
+            wcd_api_key: Weaviate Cloud REST API key
+            embedder: Client-side embedder (defaults to get_embedder(), None for server-side vectorization)
+        """
+        self.embedder = embedder or get_embedder()
+        self.manager = QueryManager(wcd_url=wcd_url, wcd_api_key=wcd_api_key)
+
+    def upload_objects(
+        self,
+        collection_name: str,
+        data_objects: List[Dict],
+        tenant: str,
+        vectors: Optional[Sequence[Sequence[float]]] = None,
+        uuids: Optional[Sequence[str]] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+    ) -> str:
+        if vectors is None and self.embedder:
+            vectors = self.embedder.embed([str(obj.get("text", "")) for obj in data_objects])
+        retry_settings = {"max_retries": max_retries, "backoff_base": backoff_base}
+        return self.manager.upload_objects(
+            collection_name,
+            data_objects,
+            tenant,
+            vectors=vectors,
+            uuids=uuids,
+            **{name: value for name, value in retry_settings.items() if value is not None},
+        )
+
+    def delete_objects(self, collection_name: str, tenant: str, filenames: List[str]) -> str:
+        return self.manager.delete_objects(collection_name, tenant, filenames)
+
+    def delete_objects_by_id(self, collection_name: str, tenant: str, object_ids: List[str]) -> str:
+        return self.manager.delete_objects_by_id(collection_name, tenant, object_ids)
+
+    def query_by_text(
+        self,
+        collection_name: str,
+        tenant: str,
+        query_text: str,
+        filters: Optional[PropertyFilters] = None,
+        limit: int = 5,
+        search_mode: Optional[str] = None,
+        alpha: Optional[float] = None,
+    ) -> List[Any]:
+        vector = None
+        if self.embedder and (search_mode or SEARCH_MODE) != "bm25":
+            vector = self.embedder.embed_query(query_text)
+        return self.manager.query_by_text(
+            collection_name,
+            tenant,
+            query_text,
+            filters=to_weaviate_filter(filters),
+            limit=limit,
+            search_mode=search_mode,
+            alpha=alpha,
+            vector=vector,
+        )
+
+    def query_by_vector(
+        self,
+        collection_name: str,
+        tenant: str,
+        vector: Sequence[float],
+        filters: Optional[PropertyFilters] = None,
+        limit: int = 5,
+    ) -> List[Any]:
+        return self.manager.query_by_vector(
+            collection_name, tenant, vector, filters=to_weaviate_filter(filters), limit=limit
+        )
+
+    def fetch_objects(
+        self,
+        collection_name: str,
+        tenant: str,
+        filters: Optional[PropertyFilters] = None,
+        limit: Optional[int] = None,
+    ) -> List[Any]:
+        return self.manager.fetch_objects(
+            collection_name, tenant, filters=to_weaviate_filter(filters), limit=limit
+        )
+
+    def close(self, discard: bool = False) -> None:
+        self.manager.close(discard=discard)
+
+
+class TenantIndex:
+    """Objects and vectors of one tenant of one collection, persisted in a directory.
+
+    Vectors are L2-normalized float32 rows of a single contiguous matrix kept
+    in ``vectors.f32`` and memory-mapped read-only, so opening a large index
+    costs no copy and the OS page cache is shared across processes. Object IDs
+    and properties are kept in ``objects.jsonl``, one line per row.
+
+    Uploads append to the files and remap them. Uploads replacing stored
+    objects overwrite their vector rows in place and append a line naming the
+    replaced row; the files are compacted once those lines outnumber the rows.
+    Deletes rewrite the files.
+
+    Writes hold an exclusive lock on the ``lock`` file (where ``fcntl`` is
+    available), and an index reloads its files when another process changed
+    them, so the app and the ingestion CLI can share a directory.
+
+    Attributes:
+        path: Directory holding the index files
+        dimension: Vector length (0 until the first upload)
+    """
+
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+
+    def __init__(self, path: str):
+        """Open (or create) the index in a directory.
+
+        Args:
+            path: Directory holding the index files
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._reset()
+
+        os.makedirs(path, exist_ok=True)
+        with self._file_lock():
+            self._load()
+
+    def _reset(self) -> None:
+        self.dimension = 0
+        self._ids: List[str] = []
+        self._properties: List[Dict[str, Any]] = []
+        self._vectors = np.empty((0, 0), dtype=np.float32)
+        # object ID -> row, so uploads replacing stored objects find their rows
+        self._rows: Dict[str, int] = {}
+        # Lines of objects.jsonl replacing the properties of an earlier row
+        self._replaced = 0
+        # (inode, size) of objects.jsonl after this process last read or wrote it
+        self._stamp: Optional[Tuple[int, int]] = None
+        # Copy handed out by snapshot, taken at most once per change since the lists grow in place
+        self._snapshot: Optional[Tuple[List[str], List[Dict[str, Any]], np.ndarray]] = None
+        # term -> (rows, term frequencies), built lazily for keyword search
+        self._postings: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None
+        self._doc_lengths = np.empty(0, dtype=np.float32)
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "meta.json")
+
+    @property
+    def _objects_path(self) -> str:
+        return os.path.join(self.path, "objects.jsonl")
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.f32")
+
+    @property
+    def _lock_path(self) -> str:
+        return os.path.join(self.path, "lock")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @contextmanager
+    def _file_lock(self):
+        """Hold the index's exclusive file lock, serializing writers across processes."""
+        with open(self._lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self._objects_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def _refresh(self) -> None:
+        """Reload the files if another process changed them. Called with both locks held."""
+        if self._file_stamp() != self._stamp:
+            self._reset()
+            self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self._meta_path):
+            return
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            self.dimension = json.load(f)["dimension"]
+
+        if os.path.exists(self._objects_path):
+            with open(self._objects_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line cut short by an interrupted write
+                        break
+                    if "row" in item:
+                        self._properties[item["row"]] = item["properties"]
+                        self._replaced += 1
+                        continue
+                    self._ids.append(item["uuid"])
+                    self._properties.append(item["properties"])
+
+        rows = os.path.getsize(self._vectors_path) // (4 * self.dimension) if os.path.exists(self._vectors_path) else 0
+        if rows != len(self._ids):
+            # An interrupted upload left the files out of step; keep the rows both have
+            count = min(rows, len(self._ids))
+            self._ids, self._properties = self._ids[:count], self._properties[:count]
+            self._vectors = self._map(rows)[:count]
+            self._rewrite(np.ones(count, dtype=bool))
+        else:
+            self._vectors = self._map(rows)
+            self._rows = {object_id: row for row, object_id in enumerate(self._ids)}
+            self._stamp = self._file_stamp()
+
+    def _map(self, rows: int) -> np.ndarray:
+        if not rows:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimension))
+
+    def _rewrite(self, keep: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(self._vectors[keep])
+        ids = [object_id for object_id, kept in zip(self._ids, keep) if kept]
+        properties = [props for props, kept in zip(self._properties, keep) if kept]
+
+        with open(self._vectors_path + ".tmp", "wb") as f:
+            f.write(vectors.tobytes())
+        with open(self._objects_path + ".tmp", "w", encoding="utf-8") as f:
+            for object_id, props in zip(ids, properties):
+                f.write(json.dumps({"uuid": object_id, "properties": props}) + "\n")
+        os.replace(self._vectors_path + ".tmp", self._vectors_path)
+        os.replace(self._objects_path + ".tmp", self._objects_path)
+
+        self._ids, self._properties = ids, properties
+        self._rows = {object_id: row for row, object_id in enumerate(ids)}
+        self._replaced = 0
+        self._stamp = self._file_stamp()
+        self._vectors = self._map(len(ids))
+        self._postings = None
+        self._snapshot = None
+
+    def append(self, ids: List[str], properties: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        """Append objects and their vectors, replacing stored objects with the same IDs.
+
+        Replaced objects keep their rows, so the cost depends on the batch
+        rather than the size of the index.
+
+        Args:
+            ids: Object IDs
+            properties: Object properties
+            vectors: Array of shape (len(ids), dimension)
+        """
+        vectors = np.array(vectors, dtype=np.float32, order="C")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+
+        with self._lock, self._file_lock():
+            self._refresh()
+            if not self.dimension:
+                self.dimension = vectors.shape[1]
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dimension": self.dimension}, f)
+            if vectors.shape[1] != self.dimension:
+                raise ValueError(f"Expected vectors of dimension {self.dimension}, got {vectors.shape[1]}")
+
+            replaced = [i for i, object_id in enumerate(ids) if object_id in self._rows]
+            if replaced:
+                row_bytes = 4 * self.dimension
+                with open(self._vectors_path, "r+b") as f:
+                    for i in replaced:
+                        f.seek(self._rows[ids[i]] * row_bytes)
+                        f.write(vectors[i].tobytes())
+                with open(self._objects_path, "a", encoding="utf-8") as f:
+                    for i in replaced:
+                        row = self._rows[ids[i]]
+                        f.write(json.dumps({"uuid": ids[i], "properties": properties[i], "row": row}) + "\n")
+                # Snapshots hold their own copy of the list, so it is updated in place
+                for i in replaced:
+                    self._properties[self._rows[ids[i]]] = properties[i]
+                self._replaced += len(replaced)
+
+            replaced_set = set(replaced)
+            new = [i for i in range(len(ids)) if i not in replaced_set]
+            if new:
+                # Vectors first: rows without an objects line are dropped on the next load
+                with open(self._vectors_path, "ab") as f:
+                    f.write(vectors[new].tobytes())
+                with open(self._objects_path, "a", encoding="utf-8") as f:
+                    for i in new:
+                        f.write(json.dumps({"uuid": ids[i], "properties": properties[i]}) + "\n")
+                for i in new:
+                    self._rows[ids[i]] = len(self._ids)
+                    self._ids.append(ids[i])
+                    self._properties.append(properties[i])
+                self._vectors = self._map(len(self._ids))
+
+            self._stamp = self._file_stamp()
+            self._postings = None
+            self._snapshot = None
+            if self._replaced > len(self._ids):
+                self._rewrite(np.ones(len(self._ids), dtype=bool))
+
+    def delete_where(self, filters: PropertyFilters) -> int:
+        """Delete objects matching property filters.
+
+        Args:
+            filters: Property filters, all of which must match
+
+        Returns:
+            Number of objects deleted
+        """
+        with self._lock, self._file_lock():
+            self._refresh()
+            keep = np.array([not matches_filters(props, filters) for props in self._properties], dtype=bool)
+            deleted = int(len(keep) - keep.sum())
+            if deleted:
+                self._rewrite(keep)
+            return deleted
+
+    def delete_ids(self, object_ids: Sequence[str]) -> int:
+        """Delete objects by ID.
+
+        Args:
+            object_ids: IDs of the objects to delete
+
+        Returns:
+            Number of objects deleted
+        """
+        object_ids = set(object_ids)
+        with self._lock, self._file_lock():
+            self._refresh()
+            if not any(object_id in self._rows for object_id in object_ids):
+                return 0
+            keep = np.array([object_id not in object_ids for object_id in self._ids], dtype=bool)
+            deleted = int(len(keep) - keep.sum())
+            if deleted:
+                self._rewrite(keep)
+            return deleted
+
+    def snapshot(self) -> Tuple[List[str], List[Dict[str, Any]], np.ndarray]:
+        """Return a consistent view of IDs, properties and vectors.
+
+        Returned lists and arrays are never mutated in place, so they can be
+        searched without holding the lock, except that a replaced object's
+        vector row is overwritten in place. The same objects are returned until
+        the next upload or delete, here or in another process.
+
+        Returns:
+            (ids, properties, vectors)
+        """
+        with self._lock:
+            if self._file_stamp() != self._stamp:
+                with self._file_lock():
+                    self._refresh()
+            if self._snapshot is None:
+                self._snapshot = (list(self._ids), list(self._properties), self._vectors)
+            return self._snapshot
+
+    def keyword_scores(self, query_text: str) -> Tuple[List[str], np.ndarray]:
+        """Score every row against a query with BM25.
+
+        Args:
+            query_text: Keyword query
+
+        Returns:
+            (ids, scores): the IDs the scores were computed for, as returned by
+            ``snapshot``, and one score per row
+        """
+        with self._lock:
+            ids = self.snapshot()[0]
+            if self._postings is None:
+                self._build_postings()
+            postings, doc_lengths = self._postings, self._doc_lengths
+
+        scores = np.zeros(len(doc_lengths), dtype=np.float32)
+        if not len(doc_lengths):
+            return ids, scores
+        average_length = float(doc_lengths.mean()) or 1.0
+        for term in set(TOKEN_PATTERN.findall(query_text.casefold())):
+            if term not in postings:
+                continue
+            rows, frequencies = postings[term]
+            idf = math.log(1 + (len(doc_lengths) - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.BM25_K1 * (1 - self.BM25_B + self.BM25_B * doc_lengths[rows] / average_length)
+            scores[rows] += idf * frequencies * (self.BM25_K1 + 1) / (frequencies + norm)
+        return ids, scores
+
+    def _build_postings(self) -> None:
+        postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        lengths = []
+        for row, props in enumerate(self._properties):
+            tokens = TOKEN_PATTERN.findall(str(props.get("text", "")).casefold())
+            lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                rows, frequencies = postings.setdefault(term, ([], []))
+                rows.append(row)
+                frequencies.append(count)
+        self._postings = {
+            term: (np.array(rows, dtype=np.int64), np.array(frequencies, dtype=np.float32))
+            for term, (rows, frequencies) in postings.items()
+        }
+        self._doc_lengths = np.array(lengths, dtype=np.float32)
+
+
+# Open indexes, shared by every LocalVectorStore in the process
+_indexes: Dict[str, TenantIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store persisted to memory-mapped files.
+
+    Each tenant of each collection is a ``TenantIndex`` under ``directory``.
+    Vectors come from ``embedder``; search is a single matrix product of the
+    query batch against the tenant's contiguous float32 matrix followed by a
+    partial sort, keyword search is BM25 over the text property, and hybrid
+    search fuses both with min-max normalized scores like Weaviate's relative
+    score fusion.
+
+    Attributes:
+        directory: Root directory of the indexes
+        embedder: Embedder producing document and query vectors
+    """
+
+    def __init__(self, directory: str = LOCAL_VECTOR_STORE_DIR, embedder: Optional[Embedder] = None):
+        """Initialize the store.
+
+        Args:
+            directory: Root directory of the indexes
+            embedder: Embedder producing document and query vectors (defaults to
+                get_embedder(), falling back to the hashing embedder)
+        """
+        self.directory = directory
+        self.embedder = embedder or get_embedder() or get_embedder("hashing")
+
+    def _index(self, collection_name: str, tenant: str) -> TenantIndex:
+        path = os.path.abspath(os.path.join(self.directory, _safe_name(collection_name), _safe_name(tenant)))
+        with _indexes_lock:
+            if path not in _indexes:
+                _indexes[path] = TenantIndex(path)
+            return _indexes[path]
+
+    def upload_objects(
+        self,
+        collection_name: str,
+        data_objects: List[Dict],
+        tenant: str,
+        vectors: Optional[Sequence[Sequence[float]]] = None,
+        uuids: Optional[Sequence[str]] = None,
+        max_retries: Optional[int] = None,
+        backoff_base: Optional[float] = None,
+    ) -> str:
+        # Writes to local files are not retried
+        try:
+            if vectors is None:
+                vectors = self.embedder.embed([str(obj.get("text", "")) for obj in data_objects])
+            ids = [str(object_id) for object_id in uuids] if uuids is not None else [str(uuid.uuid4()) for _ in data_objects]
+            self._index(collection_name, tenant).append(ids, [dict(obj) for obj in data_objects], vectors)
+            return f"Successfully imported {len(data_objects)} objects to tenant '{tenant}'"
+
+        except Exception as e:
+            return f"Error uploading objects: {e}"
+
+        finally:
+            invalidate_tenant(tenant)
+
+    def delete_objects(self, collection_name: str, tenant: str, filenames: List[str]) -> str:
+        try:
+            deleted = self._index(collection_name, tenant).delete_where({"filename": list(filenames)})
+            return f"Successfully deleted {deleted} objects from tenant '{tenant}'"
+
+        except Exception as e:
+            return f"Error deleting objects: {e}"
+
+        finally:
+            invalidate_tenant(tenant)
+
+    def delete_objects_by_id(self, collection_name: str, tenant: str, object_ids: List[str]) -> str:
+        try:
+            deleted = self._index(collection_name, tenant).delete_ids(object_ids)
+            return f"Successfully deleted {deleted} objects from tenant '{tenant}'"
+
+        except Exception as e:
+            return f"Error deleting objects: {e}"
+
+        finally:
+            invalidate_tenant(tenant)
+
+    def query_by_text(
+        self,
+        collection_name: str,
+        tenant: str,
+        query_text: str,
+        filters: Optional[PropertyFilters] = None,
+        limit: int = 5,
+        search_mode: Optional[str] = None,
+        alpha: Optional[float] = None,
+    ) -> List[StoredObject]:
+        search_mode = search_mode or SEARCH_MODE
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {search_mode!r}, expected one of {', '.join(SEARCH_MODES)}")
+        alpha = HYBRID_ALPHA if alpha is None else alpha
+
+        try:
+            index = self._index(collection_name, tenant)
+            while True:
+                ids, properties, vectors = index.snapshot()
+                if search_mode == "near_text":
+                    break
+                keyword_ids, keyword = index.keyword_scores(query_text)
+                # Retry if an upload or delete replaced the rows in between
+                if keyword_ids is ids:
+                    break
+            candidates = self._candidates(properties, filters)
+            if not len(candidates):
+                return []
+
+            distances = None
+            if search_mode != "bm25":
+                query_vector = self.embedder.embed([query_text])
+                rows = vectors[candidates] if filters else vectors
+                distances = 1.0 - (rows @ query_vector.T)[:, 0]
+            if search_mode == "near_text":
+                scores = 1.0 - distances
+            else:
+                keyword = keyword[candidates]
+                if search_mode == "bm25":
+                    scores = keyword
+                    # Weaviate only returns objects containing at least one query term
+                    candidates, scores = candidates[scores > 0], scores[scores > 0]
+                else:
+                    scores = alpha * self._min_max(1.0 - distances) + (1 - alpha) * self._min_max(keyword)
+
+            return self._top(ids, properties, candidates, scores, distances, limit)
+
+        except Exception as e:
+            print(f"Error querying collection: {e}")
+            return []
+
+    def query_by_vector(
+        self,
+        collection_name: str,
+        tenant: str,
+        vector: Sequence[float],
+        filters: Optional[PropertyFilters] = None,
+        limit: int = 5,
+    ) -> List[StoredObject]:
+        return self.query_by_vectors(collection_name, tenant, [vector], filters=filters, limit=limit)[0]
+
+    def query_by_vectors(
+        self,
+        collection_name: str,
+        tenant: str,
+        vectors: Sequence[Sequence[float]],
+        filters: Optional[PropertyFilters] = None,
+        limit: int = 5,
+    ) -> List[List[StoredObject]]:
+        """Search objects for a batch of query vectors with one matrix product.
+
+        Args:
+            collection_name: Name of the collection
+            tenant: Tenant name
+            vectors: Query embeddings
+            filters: Optional property filters
+            limit: Maximum number of results per query
+
+        Returns:
+            One result list per query vector, best first
+        """
+        queries = np.array(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        np.divide(queries, norms, out=queries, where=norms > 0)
+
+        try:
+            ids, properties, matrix = self._index(collection_name, tenant).snapshot()
+            candidates = self._candidates(properties, filters)
+            if not len(candidates):
+                return [[] for _ in queries]
+            # (candidates, dimension) @ (dimension, queries) -> one column of similarities per query
+            similarities = (matrix[candidates] if filters else matrix) @ queries.T
+            return [
+                self._top(ids, properties, candidates, column, 1.0 - column, limit)
+                for column in similarities.T
+            ]
+
+        except Exception as e:
+            print(f"Error querying collection: {e}")
+            return [[] for _ in queries]
+
+    def fetch_objects(
+        self,
+        collection_name: str,
+        tenant: str,
+        filters: Optional[PropertyFilters] = None,
+        limit: Optional[int] = None,
+    ) -> List[StoredObject]:
+        ids, properties, _ = self._index(collection_name, tenant).snapshot()
+        candidates = self._candidates(properties, filters)[:limit]
+        return [StoredObject(uuid=ids[row], properties=properties[row]) for row in candidates]
+
+    @staticmethod
+    def _candidates(properties: List[Dict[str, Any]], filters: Optional[PropertyFilters]) -> np.ndarray:
+        if not filters:
+            return np.arange(len(properties))
+        return np.array(
+            [row for row, props in enumerate(properties) if matches_filters(props, filters)], dtype=np.int64
+        )
+
+    @staticmethod
+    def _min_max(scores: np.ndarray) -> np.ndarray:
+        low, high = float(scores.min()), float(scores.max())
+        if high == low:
+            return np.ones_like(scores) if high > 0 else np.zeros_like(scores)
+        return (scores - low) / (high - low)
+
+    @staticmethod
+    def _top(
+        ids: List[str],
+        properties: List[Dict[str, Any]],
+        candidates: np.ndarray,
+        scores: np.ndarray,
+        distances: Optional[np.ndarray],
+        limit: int,
+    ) -> List[StoredObject]:
+        if not len(candidates) or limit < 1:
+            return []
+        # Partial sort for the top ``limit`` positions, then order just those
+        top = np.argpartition(-scores, limit - 1)[:limit] if limit < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            StoredObject(
+                uuid=ids[candidates[position]],
+                properties=properties[candidates[position]],
+                metadata=ObjectMetadata(
+                    distance=float(distances[position]) if distances is not None else None,
+                    score=float(scores[position]),
+                ),
+            )
+            for position in top
+        ]
+
+
+def get_vector_store(backend: Optional[str] = None) -> VectorStore:
+    """Create the configured vector store.
+
+    Args:
+        backend: "weaviate" or "local" (defaults to VECTOR_STORE)
+
+    Returns:
+        VectorStore instance, to be used as a context manager
+    """
+    backend = backend or VECTOR_STORE
+    if backend == "weaviate":
+        return WeaviateVectorStore()
+    if backend == "local":
+        return LocalVectorStore()
+    raise ValueError(f"Unknown vector store {backend!r}, expected 'weaviate' or 'local'")
@@ -1,14 +1,250 @@
+import atexit
+import re
+import shelve
+import threading
+import time
+import uuid
 import weaviate
 from weaviate.classes.init import Auth
 from weaviate.classes.config import Configure
 from weaviate.classes.query import Filter, MetadataQuery
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+
+from cache import TTLLRUCache, invalidate_tenant, tenant_generation
+from config import (
+    HYBRID_ALPHA,
+    RETRIEVAL_CACHE_MAX_ENTRIES,
+    RETRIEVAL_CACHE_PATH,
+    RETRIEVAL_CACHE_TTL,
+    SEARCH_MODE,
+    UPLOAD_BACKOFF_BASE,
+    UPLOAD_MAX_RETRIES,
+    WEAVIATE_API_KEY,
+    WEAVIATE_HEALTH_CHECK_INTERVAL,
+    WEAVIATE_POOL_SIZE,
+    WEAVIATE_REST_URL,
+)
+from telemetry import start_span
+
+
+class ConnectionPool:
+    """Thread-safe pool of Weaviate Cloud connections.
+
+    Connections are created lazily up to ``max_size`` and handed back to the
+    pool instead of being closed, so the TLS handshake and gRPC channel setup
+    are paid once per connection rather than once per request. A connection
+    that has been idle longer than ``health_check_interval`` is checked before
+    reuse and replaced if it is no longer ready.
+
+    Attributes:
+        wcd_url: Weaviate Cloud URL
+        wcd_api_key: Weaviate Cloud REST API key
+        max_size: Maximum number of open connections
+        health_check_interval: Seconds a connection may sit idle before it is re-checked
+    """
+
+    def __init__(
+        self,
+        wcd_url: str,
+        wcd_api_key: str,
+        max_size: int = WEAVIATE_POOL_SIZE,
+        health_check_interval: float = WEAVIATE_HEALTH_CHECK_INTERVAL,
+    ):
+        """Initialize an empty pool.
+
+        Args:
+            wcd_url: Weaviate Cloud URL
+            wcd_api_key: Weaviate Cloud REST API key
+            max_size: Maximum number of open connections
+            health_check_interval: Seconds a connection may sit idle before it is re-checked
+        """
+        self.wcd_url = wcd_url
+        self.wcd_api_key = wcd_api_key
+        self.max_size = max(1, max_size)
+        self.health_check_interval = health_check_interval
+
+        self._condition = threading.Condition()
+        self._idle: List[Tuple[weaviate.WeaviateClient, float]] = []
+        self._size = 0
+        self._closed = False
+
+    def acquire(self, timeout: Optional[float] = None) -> weaviate.WeaviateClient:
+        """Take a healthy connection from the pool, opening one if needed.
+
+        Blocks while ``max_size`` connections are in use.
+
+        Args:
+            timeout: Maximum seconds to wait for a free connection (None waits forever)
+
+        Returns:
+            Connected Weaviate client
+        """
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Weaviate connection pool is closed")
+                if self._idle:
+                    client, idle_since = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    client, idle_since = None, None
+                    break
+                if not self._condition.wait(timeout=timeout):
+                    raise TimeoutError("Timed out waiting for a Weaviate connection")
+
+        try:
+            if client is not None and not self._is_healthy(client, idle_since):
+                print("Discarding unhealthy Weaviate connection and reconnecting")
+                self._close_client(client)
+                client = None
+            if client is None:
+                client = self._connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        return client
+
+    def release(self, client: weaviate.WeaviateClient, discard: bool = False) -> None:
+        """Return a connection to the pool.
+
+        Args:
+            client: Connection obtained from ``acquire``
+            discard: Close the connection instead of reusing it (e.g. after an error)
+        """
+        with self._condition:
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((client, time.monotonic()))
+            self._condition.notify()
+
+        if discard or self._closed:
+            self._close_client(client)
+
+    def close(self) -> None:
+        """Close all idle connections and refuse new acquisitions."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+
+        for client, _ in idle:
+            self._close_client(client)
+
+    def _connect(self) -> weaviate.WeaviateClient:
+        return weaviate.connect_to_weaviate_cloud(
+            cluster_url=self.wcd_url,
+            auth_credentials=Auth.api_key(self.wcd_api_key),
+            skip_init_checks=True,
+        )
+
+    def _is_healthy(self, client: weaviate.WeaviateClient, idle_since: float) -> bool:
+        if not client.is_connected():
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            return client.is_ready()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_client(client: weaviate.WeaviateClient) -> None:
+        try:
+            client.close()
+        except Exception as e:
+            print(f"Error closing Weaviate connection: {e}")
+
+
+_pools: Dict[Tuple[str, str], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(wcd_url: str, wcd_api_key: str) -> ConnectionPool:
+    """Return the process-wide connection pool for a cluster, creating it on first use.
+
+    Args:
+        wcd_url: Weaviate Cloud URL
+        wcd_api_key: Weaviate Cloud REST API key
+
+    Returns:
+        Shared connection pool
+    """
+    with _pools_lock:
+        pool = _pools.get((wcd_url, wcd_api_key))
+        if pool is None:
+            pool = ConnectionPool(wcd_url=wcd_url, wcd_api_key=wcd_api_key)
+            _pools[(wcd_url, wcd_api_key)] = pool
+        return pool
+
+
+def register_connection_pool(pool: ConnectionPool) -> None:
+    """Make a pool the process-wide one for its cluster, e.g. a pool of stand-in connections in a load test.
+
+    Args:
+        pool: Connection pool, replacing any pool registered for the same URL and key
+    """
+    with _pools_lock:
+        _pools[(pool.wcd_url, pool.wcd_api_key)] = pool
+
+
+@atexit.register
+def close_connection_pools() -> None:
+    """Close every connection pool; registered to run at interpreter exit."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+SEARCH_MODES = ("near_text", "hybrid", "bm25")
+
+def _open_retrieval_store() -> Optional[shelve.Shelf]:
+    if not RETRIEVAL_CACHE_PATH:
+        return None
+    try:
+        return shelve.open(RETRIEVAL_CACHE_PATH)
+    except Exception as e:
+        # e.g. locked by another process, such as the app while the bulk-ingestion command runs
+        print(f"Keeping retrieval cache in memory, cannot open {RETRIEVAL_CACHE_PATH}: {e}")
+        return None
+
+
+retrieval_cache = TTLLRUCache(
+    name="retrieval",
+    max_entries=RETRIEVAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=RETRIEVAL_CACHE_TTL,
+    store=_open_retrieval_store(),
+)
+# Flushes a persistent store so its entries survive the restart
+atexit.register(retrieval_cache.close)
+
+
+def normalize_query_text(query_text: str) -> str:
+    """Normalize a query so trivially different phrasings share a cache entry.
+
+    Args:
+        query_text: Raw query text
+
+    Returns:
+        Lower-cased query with collapsed whitespace and no trailing punctuation
+    """
+    return re.sub(r"\s+", " ", query_text).strip().rstrip("?!.").strip().casefold()
 
-from config import WEAVIATE_API_KEY, WEAVIATE_REST_URL
 
 class WeaviateClient:
     """Base client class for Weaviate operations.
 
+    Connections are borrowed from the shared pool for the cluster and returned
+    to it on ``close``, so short-lived instances (e.g. one per chat message) do
+    not reconnect every time.
+
     Attributes:
         wcd_url: Weaviate Cloud URL
         wcd_api_key: Weaviate Cloud REST API key
@@ -29,24 +265,26 @@ class WeaviateClient:
         if not self.wcd_url or not self.wcd_api_key:
             raise KeyError("WEAVIATE_REST_URL and WEAVIATE_API_KEY are required")
 
-        self.client = weaviate.connect_to_weaviate_cloud(
-            cluster_url=self.wcd_url,
-            auth_credentials=Auth.api_key(self.wcd_api_key),
-            skip_init_checks=True,
-        )
+        self._pool = get_connection_pool(self.wcd_url, self.wcd_api_key)
+        self.client = self._pool.acquire()
 
-    def close(self):
-        """Close the Weaviate client connection."""
+    def close(self, discard: bool = False):
+        """Return the Weaviate client connection to the pool.
+
+        Args:
+            discard: Close the connection instead of reusing it
+        """
         if self.client:
-            self.client.close()
+            self._pool.release(self.client, discard=discard)
+            self.client = None
 
     def __enter__(self):
         """Context manager entry."""
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        """Context manager exit with automatic client closure."""
-        self.close()
+        """Context manager exit returning the connection; it is discarded if an error escaped."""
+        self.close(discard=exc_type is not None)
 
 
 class CollectionManager(WeaviateClient):
@@ -56,14 +294,15 @@ class CollectionManager(WeaviateClient):
         self,
         collection_name: str,
         enable_multi_tenancy: bool = True,
-        vectorizer_model: str = "Snowflake/snowflake-arctic-embed-l-v2.0",
+        vectorizer_model: Optional[str] = "Snowflake/snowflake-arctic-embed-l-v2.0",
     ) -> str:
         """Create a collection with optional multi-tenancy and vectorizer.
 
         Args:
             collection_name: Name of the collection to create
             enable_multi_tenancy: Whether to enable multi-tenancy
-            vectorizer_model: Vectorizer model name
+            vectorizer_model: Vectorizer model name, or None for a collection
+                whose vectors are always computed client-side
 
         Returns:
             Status message
@@ -79,13 +318,16 @@ class CollectionManager(WeaviateClient):
                 )
 
             # Configure vectorizer
-            vectorizer_config = [
-                Configure.NamedVectors.text2vec_weaviate(
-                    name="text",
-                    source_properties=["text"],
-                    model=vectorizer_model,
-                )
-            ]
+            if vectorizer_model:
+                vectorizer_config = [
+                    Configure.NamedVectors.text2vec_weaviate(
+                        name="text",
+                        source_properties=["text"],
+                        model=vectorizer_model,
+                    )
+                ]
+            else:
+                vectorizer_config = [Configure.NamedVectors.none(name="text")]
 
         #     properties = [
         #     weaviate.classes.config.Property(name="text", data_type=weaviate.classes.config.DataType.TEXT)
@@ -187,7 +429,14 @@ class DataManager(TenantManager):
     """Class for managing data operations within collections and tenants."""
 
     def upload_objects(
-        self, collection_name: str, data_objects: List[Dict], tenant: str
+        self,
+        collection_name: str,
+        data_objects: List[Dict],
+        tenant: str,
+        vectors: Optional[Sequence[Sequence[float]]] = None,
+        uuids: Optional[Sequence[str]] = None,
+        max_retries: int = UPLOAD_MAX_RETRIES,
+        backoff_base: float = UPLOAD_BACKOFF_BASE,
     ) -> str:
         """Upload data objects to a collection with specified tenant.
 
@@ -195,30 +444,75 @@ class DataManager(TenantManager):
             collection_name: Name of the collection
             data_objects: List of data objects to upload
             tenant: Tenant name
+            vectors: Optional precomputed vectors, one per object, which skip server-side vectorization
+            uuids: Optional object IDs, one per object; an existing object with the same ID is replaced
+            max_retries: Maximum number of retries of failed objects
+            backoff_base: Seconds before the first retry, doubled on every further retry
+
+        Objects that fail (and the whole batch, if the request itself fails) are
+        retried up to ``max_retries`` times with exponential backoff. Every
+        object gets a client-side ID so retries replace rather than duplicate.
 
         Returns:
             Status message
         """
+        # Client-side IDs let failed objects be matched back and retried idempotently
+        if uuids is None:
+            uuids = [str(uuid.uuid4()) for _ in data_objects]
+        pending = list(range(len(data_objects)))
+        error = None
+        upload_span = start_span("weaviate.upload", tenant=tenant, collection=collection_name)
+
         try:
             # Get collection with specific tenant
             tenant_collection = self.get_collection(collection_name).with_tenant(tenant)
 
-            # Batch import data objects to the tenant
-            failed_objects = []
-            with tenant_collection.batch.dynamic() as batch:
-                for data_object in data_objects:
-                    batch.add_object(properties=data_object)
-
-                # Check for errors
-                if batch.number_errors > 0:
-                    failed_objects = tenant_collection.batch.failed_objects
-                    return f"Partial import: {batch.number_errors} objects failed out of {len(data_objects)}"
-
-            return f"Successfully imported {len(data_objects)} objects to tenant '{tenant}'"
+            for attempt in range(max_retries + 1):
+                if attempt:
+                    delay = backoff_base * 2 ** (attempt - 1)
+                    upload_span.count("retries")
+                    print(f"Retrying {len(pending)} failed objects in {delay:.1f}s ({error})")
+                    time.sleep(delay)
+
+                try:
+                    # Batch import data objects to the tenant
+                    with tenant_collection.batch.dynamic() as batch:
+                        for index in pending:
+                            vector = None
+                            if vectors is not None:
+                                vector = {"text": [float(value) for value in vectors[index]]}
+                            batch.add_object(
+                                properties=data_objects[index],
+                                vector=vector,
+                                uuid=uuids[index],
+                            )
+                except Exception as e:
+                    error = e
+                    continue
+
+                # Keep only the objects that failed for the next attempt
+                failed_objects = tenant_collection.batch.failed_objects
+                if not failed_objects:
+                    upload_span.count("objects", len(data_objects))
+                    return f"Successfully imported {len(data_objects)} objects to tenant '{tenant}'"
+                failed_ids = {str(obj.original_uuid or obj.object_.uuid) for obj in failed_objects}
+                pending = [index for index in pending if str(uuids[index]) in failed_ids]
+                error = failed_objects[0].message
+
+            upload_span.count("objects", len(data_objects) - len(pending))
+            upload_span.count("failed_objects", len(pending))
+            upload_span.record_error(str(error))
+            return f"Partial import: {len(pending)} objects failed out of {len(data_objects)} ({error})"
 
         except Exception as e:
+            upload_span.record_error(e)
             return f"Error uploading objects: {e}"
 
+        finally:
+            # Cached retrievals for this tenant no longer reflect its data
+            invalidate_tenant(tenant)
+            upload_span.end()
+
     def delete_objects(
         self, collection_name: str, tenant: str, object_ids: List[str]
     ) -> str:
@@ -247,10 +541,51 @@ class DataManager(TenantManager):
         except Exception as e:
             return f"Error deleting objects: {e}"
 
+        finally:
+            invalidate_tenant(tenant)
+
+    def delete_objects_by_id(
+        self, collection_name: str, tenant: str, object_ids: List[str], chunk_size: int = 1000
+    ) -> str:
+        """Delete objects by their UUIDs from a collection with specified tenant.
+
+        Args:
+            collection_name: Name of the collection
+            tenant: Tenant name
+            object_ids: UUIDs of the objects to delete
+            chunk_size: Number of IDs per delete request
+
+        Returns:
+            Status message
+        """
+        try:
+            collection = self.get_collection(collection_name).with_tenant(tenant)
+            deleted = 0
+            for start in range(0, len(object_ids), chunk_size):
+                response = collection.data.delete_many(
+                    where=Filter.by_id().contains_any(object_ids[start:start + chunk_size])
+                )
+                deleted += response.successful
+
+            return f"Successfully deleted {deleted} objects from tenant '{tenant}'"
+
+        except Exception as e:
+            return f"Error deleting objects: {e}"
+
+        finally:
+            invalidate_tenant(tenant)
+
 
 # Querying pipeline
 class QueryManager(DataManager):
-    """Class for querying data from collections and tenants."""
+    """Class for querying data from collections and tenants.
+
+    Text queries are served from ``retrieval_cache`` when the same normalized
+    query was answered recently for the same collection, tenant, search mode,
+    alpha, limit and filters. Keys include the tenant's cache generation, so a
+    query racing with an upload or delete never caches its results for later
+    queries.
+    """
 
     def query_by_text(
         self,
@@ -259,8 +594,17 @@ class QueryManager(DataManager):
         query_text: str,
         filters: Optional[Filter] = None,
         limit: int = 5,
+        search_mode: Optional[str] = None,
+        alpha: Optional[float] = None,
+        vector: Optional[Sequence[float]] = None,
     ) -> List[Dict]:
-        """Query objects by text similarity.
+        """Query objects by text.
+
+        ``near_text`` ranks by vector similarity only, ``bm25`` by keyword
+        match only, and ``hybrid`` fuses both, which also finds exact
+        identifiers that vector search misses. Every returned object carries
+        both ``metadata.distance`` (None when the mode has no vector distance)
+        and ``metadata.score`` (higher is better; ``1 - distance`` for near_text).
 
         Args:
             collection_name: Name of the collection
@@ -268,29 +612,162 @@ class QueryManager(DataManager):
             query_text: Text to search for
             filters: Optional filters
             limit: Maximum number of results
+            search_mode: "near_text", "hybrid" or "bm25" (defaults to SEARCH_MODE)
+            alpha: Hybrid weighting, 0.0 is pure keyword and 1.0 pure vector (defaults to HYBRID_ALPHA)
+            vector: Optional client-side embedding of query_text, used instead of
+                server-side vectorization for the vector part of the search
 
         Returns:
             List of matching objects
         """
+        search_mode = search_mode or SEARCH_MODE
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode {search_mode!r}, expected one of {', '.join(SEARCH_MODES)}")
+        alpha = HYBRID_ALPHA if alpha is None else alpha
+
+        cache_key = (
+            collection_name,
+            tenant,
+            tenant_generation(tenant),
+            normalize_query_text(query_text),
+            search_mode,
+            alpha if search_mode == "hybrid" else None,
+            vector is not None,
+            limit,
+            repr(filters),
+        )
+        cached = retrieval_cache.get(cache_key)
+        if cached is not None:
+            # A copy, so callers changing the list do not change the cache
+            return list(cached)
+
+        query_span = start_span(
+            "weaviate.query", tenant=tenant, collection=collection_name, search_mode=search_mode, limit=limit
+        )
         try:
             # Get collection with specific tenant
             collection = self.get_collection(collection_name)
             tenant_collection = collection.with_tenant(tenant)
 
+            if vector is not None:
+                vector = [float(value) for value in vector]
+
             # Execute query
-            response = tenant_collection.query.near_text(
-                query=query_text,
+            if search_mode == "hybrid":
+                response = tenant_collection.query.hybrid(
+                    query=query_text,
+                    alpha=alpha,
+                    vector=vector,
+                    filters=filters,
+                    limit=limit,
+                    return_metadata=MetadataQuery(distance=True, score=True),
+                )
+            elif search_mode == "bm25":
+                response = tenant_collection.query.bm25(
+                    query=query_text,
+                    filters=filters,
+                    limit=limit,
+                    return_metadata=MetadataQuery(score=True),
+                )
+            elif vector is not None:
+                response = tenant_collection.query.near_vector(
+                    near_vector=vector,
+                    target_vector="text",
+                    filters=filters,
+                    limit=limit,
+                    return_metadata=MetadataQuery(distance=True),
+                )
+            else:
+                response = tenant_collection.query.near_text(
+                    query=query_text,
+                    filters=filters,
+                    limit=limit,
+                    return_metadata=MetadataQuery(distance=True),
+                )
+
+            objects = response.objects
+            for obj in objects:
+                if obj.metadata.score is None and obj.metadata.distance is not None:
+                    obj.metadata.score = 1.0 - obj.metadata.distance
+
+            retrieval_cache.set(cache_key, list(objects), tenant=tenant)
+            query_span.count("results", len(objects))
+            return objects
+
+        except Exception as e:
+            query_span.record_error(e)
+            print(f"Error querying collection: {e}")
+            return []
+
+        finally:
+            query_span.end()
+
+    def query_by_vector(
+        self,
+        collection_name: str,
+        tenant: str,
+        vector: Sequence[float],
+        filters: Optional[Filter] = None,
+        limit: int = 5,
+    ) -> List[Dict]:
+        """Query objects by similarity to a precomputed vector.
+
+        Args:
+            collection_name: Name of the collection
+            tenant: Tenant name
+            vector: Query embedding, from the same model as the stored vectors
+            filters: Optional filters
+            limit: Maximum number of results
+
+        Returns:
+            List of matching objects with metadata.distance and metadata.score
+        """
+        query_span = start_span(
+            "weaviate.query", tenant=tenant, collection=collection_name, search_mode="near_vector", limit=limit
+        )
+        try:
+            tenant_collection = self.get_collection(collection_name).with_tenant(tenant)
+            response = tenant_collection.query.near_vector(
+                near_vector=[float(value) for value in vector],
+                target_vector="text",
                 filters=filters,
                 limit=limit,
                 return_metadata=MetadataQuery(distance=True),
             )
-
+            for obj in response.objects:
+                obj.metadata.score = 1.0 - obj.metadata.distance
+            query_span.count("results", len(response.objects))
             return response.objects
 
         except Exception as e:
+            query_span.record_error(e)
             print(f"Error querying collection: {e}")
             return []
 
+        finally:
+            query_span.end()
+
+    def fetch_objects(
+        self,
+        collection_name: str,
+        tenant: str,
+        filters: Optional[Filter] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict]:
+        """Fetch objects matching filters, without ranking.
+
+        Args:
+            collection_name: Name of the collection
+            tenant: Tenant name
+            filters: Optional filters
+            limit: Maximum number of results
+
+        Returns:
+            List of matching objects
+        """
+        tenant_collection = self.get_collection(collection_name).with_tenant(tenant)
+        return tenant_collection.query.fetch_objects(filters=filters, limit=limit).objects
+
     def query_docs(
         self,
         collection_name: str,
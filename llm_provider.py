@@ -1,46 +1,638 @@
-from config import GROQ_API_KEY
-from groq import Groq
+import asyncio
+import concurrent.futures
+import contextvars
+import hashlib
+import queue
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Awaitable, Callable, Coroutine, Iterator, List, Optional, Sequence, Tuple
+
+from cache import SemanticCache, TTLLRUCache
+from config import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_SEMANTIC_DISTANCE,
+    ANSWER_CACHE_TTL,
+    GROQ_API_KEY,
+    LLM_BACKOFF_BASE,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_TIMEOUT,
+    SUMMARY_FALLBACK_TOKENS,
+    SUMMARY_GROUP_TOKENS,
+)
+from ingestion.chunker import count_tokens, get_encoding
+from profiling import profiled_thread
+from telemetry import metrics, span, start_span
+from groq import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AsyncGroq,
+    Groq,
+    RateLimitError,
+)
+
+
+MODEL = "llama-3.3-70b-versatile"
+
+SUMMARY_SYSTEM_PROMPT = "You are a helpful PDF assistant designed to summarize document content. Provide clear, concise summaries based on the information provided. If the content is too long, break it down into manageable parts. Try to keep the summary SHORT ! "
+
+REDUCE_SYSTEM_PROMPT = "You are a helpful PDF assistant. The content below is a set of partial summaries of different parts of the uploaded documents. Combine them into a single clear, concise summary that covers every document, without repeating yourself. Try to keep the summary SHORT ! "
+
+QUERY_SYSTEM_PROMPT = "You are a helpful PDF assistant designed to answer questions about document content. Provide clear, concise responses based on the information provided. If the answer isn't in the content, acknowledge that and don't make up information. For complex topics, break down your explanation into digestible parts."
+
+# Shared by every LLMProvider so ingestion can invalidate a tenant's answers through cache.invalidate_tenant
+answer_cache = TTLLRUCache(
+    name="answers",
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=ANSWER_CACHE_TTL,
+)
+semantic_answer_cache = SemanticCache(
+    name="semantic_answers",
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    max_distance=ANSWER_CACHE_SEMANTIC_DISTANCE,
+    ttl_seconds=ANSWER_CACHE_TTL,
+)
+
+
+class ConcurrencyLimiter:
+    """Process-wide cap on concurrent LLM calls, usable from any thread or event loop.
+
+    Streamlit runs every session in its own thread and event loop, so an
+    asyncio.Semaphore cannot be shared. Waiters queue in FIFO order instead:
+    async callers wait on a future of their own loop, which a release hands
+    the slot to through ``call_soon_threadsafe``, and threads wait on an event.
+    """
+
+    def __init__(self, limit: int):
+        self._lock = threading.Lock()
+        self._available = max(1, limit)
+        # (loop, future) for async waiters, (None, threading.Event) for threads
+        self._waiters: deque = deque()
+
+    def _try_acquire(self) -> bool:
+        if self._available and not self._waiters:
+            self._available -= 1
+            return True
+        return False
+
+    def release(self) -> None:
+        """Release a slot, handing it to the longest waiting caller if any."""
+        with self._lock:
+            if not self._waiters:
+                self._available += 1
+                return
+            loop, waiter = self._waiters.popleft()
+        if loop is None:
+            waiter.set()
+        else:
+            loop.call_soon_threadsafe(self._grant, waiter)
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.done():
+            # The waiter was cancelled after the slot was handed to it
+            self.release()
+        else:
+            future.set_result(None)
+
+    async def __aenter__(self):
+        with self._lock:
+            if self._try_acquire():
+                return self
+            future = asyncio.get_running_loop().create_future()
+            waiter = (asyncio.get_running_loop(), future)
+            self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def __enter__(self):
+        with self._lock:
+            if self._try_acquire():
+                return self
+            event = threading.Event()
+            self._waiters.append((None, event))
+        event.wait()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+llm_limiter = ConcurrencyLimiter(LLM_MAX_CONCURRENCY)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a Groq error is worth retrying (rate limits, timeouts, connection and 5xx errors)."""
+    if isinstance(error, (RateLimitError, APITimeoutError, APIConnectionError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code >= 500
+
+
+def backoff_delay(error: Exception, attempt: int) -> float:
+    """Seconds to wait before the next attempt, honouring Retry-After on rate limits.
+
+    Args:
+        error: Error raised by the failed attempt
+        attempt: Zero-based number of the failed attempt
+
+    Returns:
+        Delay in seconds
+    """
+    if isinstance(error, RateLimitError):
+        retry_after = error.response.headers.get("retry-after")
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            pass
+    return LLM_BACKOFF_BASE * (2 ** attempt) + random.uniform(0, LLM_BACKOFF_BASE)
+
+
+def run_sync(coroutine: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine to completion from synchronous code.
+
+    Uses a worker thread when called from inside a running event loop.
+
+    Args:
+        coroutine: Coroutine to run
+
+    Returns:
+        The coroutine's result
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    # The worker runs in a copy of this context, so its spans stay nested under the caller's
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(contextvars.copy_context().run, asyncio.run, coroutine).result()
+
+
+def format_context(text: str) -> str:
+    """Wrap content in the context markers used in every prompt."""
+    return f"""
+                <Context Starts>:
+                {text}
+                </Context Ends>
+                """
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut a text down to its first ``max_tokens`` tokens."""
+    encoding = get_encoding()
+    token_ids = encoding.encode(text, disallowed_special=())
+    if len(token_ids) <= max_tokens:
+        return text
+    return encoding.decode(token_ids[:max_tokens])
+
+
+def group_by_tokens(texts: List[str], max_tokens: int) -> List[str]:
+    """Pack texts in order into groups of at most ``max_tokens`` tokens.
+
+    A single text longer than the budget is truncated to fit.
+
+    Args:
+        texts: Texts to pack
+        max_tokens: Token budget per group
+
+    Returns:
+        List of groups, each the texts joined by blank lines
+    """
+    groups = []
+    current = []
+    current_tokens = 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if tokens > max_tokens:
+            text = truncate_to_tokens(text, max_tokens)
+            tokens = max_tokens
+        if current and current_tokens + tokens > max_tokens:
+            groups.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append("\n\n".join(current))
+    return groups
+
+
+def prompt_cache_key(model: str, system_prompt: str, prompt: str) -> str:
+    """Hash the final prompt sent to the model.
+
+    Args:
+        model: Model name
+        system_prompt: System message
+        prompt: User message
+
+    Returns:
+        SHA-256 hex digest identifying the completion request
+    """
+    payload = "\x00".join([model, system_prompt, prompt])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
 class LLMProvider:
+    """Groq chat completions with an answer cache in front.
+
+    Answers are cached by the hash of the model and final prompt. When an
+    ``embed_fn`` is given, ``query`` also reuses an answer for a semantically
+    close question from the same tenant built from the same retrieved chunks.
 
-    def __init__(self):
+    The ``a``-prefixed methods are the primary API: they use the async Groq
+    client with a per-call timeout, exponential backoff on 429/5xx and the
+    process-wide ``llm_limiter``. ``query`` and ``get_summary`` are thin
+    synchronous wrappers around them.
+    """
+
+    def __init__(self, embed_fn: Optional[Callable[[str], Sequence[float]]] = None):
+        """Initialize the Groq client.
+
+        Args:
+            embed_fn: Optional function embedding a question, enabling the semantic cache tier
+        """
+        # Retries are handled here, with backoff shared by the sync and async paths
         self.client = Groq(
             api_key=GROQ_API_KEY,
+            timeout=LLM_TIMEOUT,
+            max_retries=0,
         )
+        self.embed_fn = embed_fn
+        # The async client's connection pool is bound to an event loop, so keep one per loop
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncGroq]" = weakref.WeakKeyDictionary()
 
-    def get_summary(self, text: str):
-        chat_completion = self.client.chat.completions.create(
-            messages=[
-            {
-                "role": "system",
-                "content": "You are a helpful PDF assistant designed to summarize document content. Provide clear, concise summaries based on the information provided. If the content is too long, break it down into manageable parts. Try to keep the summary SHORT ! "
-            },
-            {
-                "role": "user",
-                "content": text,
-            }
-            ],
-            model="llama-3.3-70b-versatile",
-        )
+    def _get_async_client(self) -> AsyncGroq:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = AsyncGroq(
+                api_key=GROQ_API_KEY,
+                timeout=LLM_TIMEOUT,
+                max_retries=0,
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def _with_retries(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                async with llm_limiter:
+                    return await call()
+            except Exception as e:
+                if attempt == LLM_MAX_RETRIES or not is_retryable(e):
+                    raise
+                delay = backoff_delay(e, attempt)
+                print(f"LLM call failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _acomplete(self, system_prompt: str, prompt: str, tenant: Optional[str] = None) -> str:
+        client = self._get_async_client()
+        with span("llm.complete", tenant=tenant, model=MODEL) as llm_span:
+            chat_completion = await self._with_retries(
+                lambda: client.chat.completions.create(
+                    messages=self._messages(system_prompt, prompt),
+                    model=MODEL,
+                )
+            )
+            usage = getattr(chat_completion, "usage", None)
+            if usage is not None:
+                llm_span.count("prompt_tokens", usage.prompt_tokens)
+                llm_span.count("completion_tokens", usage.completion_tokens)
 
         return(chat_completion.choices[0].message.content)
 
-    def query(self, query: str):
-        chat_completion = self.client.chat.completions.create(
-            messages=[
+    def _stream(self, system_prompt: str, prompt: str, tenant: Optional[str] = None) -> Iterator[str]:
+        # Not a `with span` block: the caller runs its own spans between the pieces it pulls
+        llm_span = start_span("llm.stream", tenant=tenant, model=MODEL)
+        pieces = []
+        # The upstream stream is drained by a reader thread holding the limiter slot, so the
+        # slot is freed as soon as the model is done rather than when the UI has rendered it all
+        deltas: queue.Queue = queue.Queue()
+        stopped = threading.Event()
+        limiter = llm_limiter
+        try:
+            for attempt in range(LLM_MAX_RETRIES + 1):
+                limiter.__enter__()
+                try:
+                    stream = self.client.chat.completions.create(
+                        messages=self._messages(system_prompt, prompt),
+                        model=MODEL,
+                        stream=True,
+                    )
+                    break
+                except Exception as e:
+                    # The slot is not held while backing off
+                    limiter.release()
+                    if attempt == LLM_MAX_RETRIES or not is_retryable(e):
+                        raise
+                    delay = backoff_delay(e, attempt)
+                    print(f"LLM stream failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+                    time.sleep(delay)
+        except Exception as e:
+            llm_span.record_error(e)
+            llm_span.end()
+            raise
+
+        def read_stream() -> None:
+            first = True
+            try:
+                with profiled_thread():
+                    for chunk in stream:
+                        if stopped.is_set():
+                            break
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            if first:
+                                first = False
+                                first_token = time.perf_counter() - llm_span.started
+                                llm_span.set(time_to_first_token_ms=round(first_token * 1000, 3))
+                                metrics.observe(
+                                    "rag_llm_time_to_first_token_seconds", first_token, tenant=tenant or ""
+                                )
+                            deltas.put(delta)
+            except Exception as e:
+                deltas.put(e)
+            finally:
+                try:
+                    # Closes the connection when the consumer stopped before the end of the stream
+                    close = getattr(stream, "close", None)
+                    if close is not None:
+                        close()
+                finally:
+                    limiter.release()
+                    deltas.put(None)
+
+        # Run in a copy of this context so the reader is profiled and traced with the request
+        reader_context = contextvars.copy_context()
+        threading.Thread(target=reader_context.run, args=(read_stream,), name="llm-stream", daemon=True).start()
+        try:
+            while True:
+                delta = deltas.get()
+                if delta is None:
+                    break
+                if isinstance(delta, Exception):
+                    raise delta
+                pieces.append(delta)
+                yield delta
+        except Exception as e:
+            llm_span.record_error(e)
+            raise
+        finally:
+            # Also reached when the consumer stops reading early; the reader thread then stops too
+            stopped.set()
+            llm_span.count("prompt_tokens", count_tokens(system_prompt) + count_tokens(prompt))
+            llm_span.count("completion_tokens", count_tokens("".join(pieces)))
+            llm_span.end()
+
+    @staticmethod
+    def _messages(system_prompt: str, prompt: str) -> List[dict]:
+        return [
             {
                 "role": "system",
-                "content": "You are a helpful PDF assistant designed to answer questions about document content. Provide clear, concise responses based on the information provided. If the answer isn't in the content, acknowledge that and don't make up information. For complex topics, break down your explanation into digestible parts."
+                "content": system_prompt,
             },
             {
                 "role": "user",
-                "content": query,
+                "content": prompt,
             }
-            ],
-            model="llama-3.3-70b-versatile",
+        ]
+
+    def _lookup_answer(
+        self,
+        query: str,
+        tenant: Optional[str],
+        question: Optional[str],
+        chunk_ids: Optional[List[str]],
+    ) -> Tuple[Optional[str], Callable[[str], None]]:
+        """Look an answer up in both cache tiers.
+
+        Returns:
+            The cached answer (or None) and a function storing a fresh answer in every applicable tier
+        """
+        cache_key = prompt_cache_key(MODEL, QUERY_SYSTEM_PROMPT, query)
+        cached = answer_cache.get(cache_key)
+        if cached is not None:
+            return cached, lambda answer: None
+
+        scope = None
+        question_vector = None
+        if self.embed_fn and tenant and question:
+            scope = (MODEL, tenant, tuple(sorted(chunk_ids or [])))
+            question_vector = self.embed_fn(question)
+            cached = semantic_answer_cache.get(scope, question_vector)
+
+        def store(answer: str) -> None:
+            answer_cache.set(cache_key, answer, tenant=tenant)
+            if scope is not None:
+                semantic_answer_cache.set(scope, question_vector, answer, tenant=tenant)
+
+        return cached, store
+
+    async def aget_summary(
+        self, text: str, tenant: Optional[str] = None, system_prompt: str = SUMMARY_SYSTEM_PROMPT
+    ) -> str:
+        """Summarize a text.
+
+        Args:
+            text: Content to summarize
+            tenant: Tenant the summary belongs to, for invalidation on re-ingestion
+            system_prompt: System message to summarize with
+
+        Returns:
+            Summary text
+        """
+        cache_key = prompt_cache_key(MODEL, system_prompt, text)
+        cached = answer_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        summary = await self._acomplete(system_prompt, text, tenant=tenant)
+        answer_cache.set(cache_key, summary, tenant=tenant)
+        return summary
+
+    def get_summary(self, text: str, tenant: Optional[str] = None):
+        return run_sync(self.aget_summary(text, tenant=tenant))
+
+    def stream_summary(
+        self, text: str, tenant: Optional[str] = None, system_prompt: str = SUMMARY_SYSTEM_PROMPT
+    ) -> Iterator[str]:
+        """Stream a summary token by token; the full summary is cached once the stream ends.
+
+        Args:
+            text: Content to summarize
+            tenant: Tenant the summary belongs to, for invalidation on re-ingestion
+            system_prompt: System message to summarize with
+
+        Yields:
+            Pieces of the summary as they arrive
+        """
+        cache_key = prompt_cache_key(MODEL, system_prompt, text)
+        cached = answer_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        pieces = []
+        for piece in self._stream(system_prompt, text, tenant=tenant):
+            pieces.append(piece)
+            yield piece
+        answer_cache.set(cache_key, "".join(pieces), tenant=tenant)
+
+    async def _asummarize_groups(
+        self, groups: List[str], tenant: Optional[str], system_prompt: str
+    ) -> List[str]:
+        """Summarize groups concurrently, falling back to an excerpt for groups that fail."""
+        results = await asyncio.gather(
+            *(self.aget_summary(group, tenant=tenant, system_prompt=system_prompt) for group in groups),
+            return_exceptions=True,
         )
 
-        return(chat_completion.choices[0].message.content)
-    
+        summaries = []
+        failures = 0
+        for group, result in zip(groups, results):
+            if isinstance(result, Exception):
+                failures += 1
+                print(f"Summary of a document group failed, using an excerpt instead: {result}")
+                summaries.append(truncate_to_tokens(group, SUMMARY_FALLBACK_TOKENS))
+            else:
+                summaries.append(result)
+
+        if failures == len(groups):
+            raise RuntimeError(f"All {failures} summary groups failed")
+        return summaries
+
+    async def aprepare_document_summary(
+        self, texts: List[str], tenant: Optional[str] = None, group_tokens: int = SUMMARY_GROUP_TOKENS
+    ) -> Tuple[str, str]:
+        """Run the map and intermediate reduce steps of a map-reduce summary.
+
+        Texts are packed into groups of at most ``group_tokens`` tokens that are
+        summarized concurrently; the partial summaries are grouped and summarized
+        again until they fit in a single group.
+
+        Args:
+            texts: Chunks of every uploaded document
+            tenant: Tenant the summaries belong to, for invalidation on re-ingestion
+            group_tokens: Token budget per LLM call
+
+        Returns:
+            System prompt and user prompt for the final summary call
+        """
+        groups = group_by_tokens(texts, group_tokens)
+        if len(groups) <= 1:
+            return SUMMARY_SYSTEM_PROMPT, format_context("".join(groups))
+
+        partials = await self._asummarize_groups(
+            [format_context(group) for group in groups], tenant, SUMMARY_SYSTEM_PROMPT
+        )
+        while len(groups := group_by_tokens(partials, group_tokens)) > 1:
+            partials = await self._asummarize_groups(
+                [format_context(group) for group in groups], tenant, REDUCE_SYSTEM_PROMPT
+            )
+        return REDUCE_SYSTEM_PROMPT, format_context(groups[0])
+
+    async def asummarize_documents(self, texts: List[str], tenant: Optional[str] = None) -> str:
+        """Summarize every uploaded chunk with a concurrent map-reduce.
+
+        Args:
+            texts: Chunks of every uploaded document
+            tenant: Tenant the summary belongs to, for invalidation on re-ingestion
+
+        Returns:
+            Summary text
+        """
+        system_prompt, prompt = await self.aprepare_document_summary(texts, tenant)
+        return await self.aget_summary(prompt, tenant=tenant, system_prompt=system_prompt)
+
+    def stream_summarize_documents(self, texts: List[str], tenant: Optional[str] = None) -> Iterator[str]:
+        """Summarize every uploaded chunk with a map-reduce, streaming the final reduce step.
+
+        Args:
+            texts: Chunks of every uploaded document
+            tenant: Tenant the summary belongs to, for invalidation on re-ingestion
+
+        Yields:
+            Pieces of the summary as they arrive
+        """
+        system_prompt, prompt = run_sync(self.aprepare_document_summary(texts, tenant))
+        yield from self.stream_summary(prompt, tenant=tenant, system_prompt=system_prompt)
+
+    async def aquery(
+        self,
+        query: str,
+        tenant: Optional[str] = None,
+        question: Optional[str] = None,
+        chunk_ids: Optional[List[str]] = None,
+    ) -> str:
+        """Answer a fully assembled prompt, serving repeated or near-identical questions from cache.
+
+        Args:
+            query: Final prompt (question, history and retrieved context)
+            tenant: Tenant the answer belongs to, for invalidation on re-ingestion
+            question: Raw user question, used for the semantic cache tier
+            chunk_ids: IDs of the retrieved chunks the prompt was built from
+
+        Returns:
+            Answer text
+        """
+        cached, store = self._lookup_answer(query, tenant, question, chunk_ids)
+        if cached is not None:
+            return cached
+
+        answer = await self._acomplete(QUERY_SYSTEM_PROMPT, query, tenant=tenant)
+        store(answer)
+        return answer
+
+    def query(
+        self,
+        query: str,
+        tenant: Optional[str] = None,
+        question: Optional[str] = None,
+        chunk_ids: Optional[List[str]] = None,
+    ):
+        return run_sync(self.aquery(query, tenant=tenant, question=question, chunk_ids=chunk_ids))
+
+    def stream_query(
+        self,
+        query: str,
+        tenant: Optional[str] = None,
+        question: Optional[str] = None,
+        chunk_ids: Optional[List[str]] = None,
+    ) -> Iterator[str]:
+        """Stream the answer to a fully assembled prompt token by token.
+
+        A cached answer is yielded in one piece; a fresh answer is cached once the stream ends.
+
+        Args:
+            query: Final prompt (question, history and retrieved context)
+            tenant: Tenant the answer belongs to, for invalidation on re-ingestion
+            question: Raw user question, used for the semantic cache tier
+            chunk_ids: IDs of the retrieved chunks the prompt was built from
+
+        Yields:
+            Pieces of the answer as they arrive
+        """
+        cached, store = self._lookup_answer(query, tenant, question, chunk_ids)
+        if cached is not None:
+            yield cached
+            return
 
+        pieces = []
+        for piece in self._stream(QUERY_SYSTEM_PROMPT, query, tenant=tenant):
+            pieces.append(piece)
+            yield piece
+        store("".join(pieces))
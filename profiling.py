@@ -0,0 +1,323 @@
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, List, Optional, Set
+
+from config import (
+    PROFILE_DIR,
+    PROFILE_ENABLED,
+    PROFILE_MODE,
+    PROFILE_SAMPLE_INTERVAL,
+    PROFILE_TENANTS,
+)
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("sampling", "deterministic")
+
+# Number of functions listed in the text summary of a profile
+SUMMARY_LINES = 40
+
+# cProfile cannot run twice at once (Python 3.12+ raises), so deterministic profiles take turns
+_deterministic_lock = threading.Lock()
+
+
+def should_profile(tenant: Optional[str]) -> bool:
+    """Check whether requests of a tenant are profiled by configuration.
+
+    Args:
+        tenant: Tenant of the request
+
+    Returns:
+        True when PROFILE_ENABLED is set and PROFILE_TENANTS is empty or lists the tenant
+    """
+    if not PROFILE_ENABLED:
+        return False
+    tenants = {name.strip() for name in PROFILE_TENANTS.split(",") if name.strip()}
+    return not tenants or tenant in tenants
+
+
+class StackSampler:
+    """Samples the Python stacks of a set of threads at a fixed interval.
+
+    Samples are aggregated as collapsed stacks, one line per distinct stack
+    (``thread;outer;...;inner count``), the input format of flamegraph.pl
+    and speedscope. Each stack starts with its thread's name, so work done
+    in different threads stays separate.
+
+    Attributes:
+        interval: Seconds between samples
+        thread_ids: Threads sampled (None samples every thread)
+        stacks: Collapsed stack -> number of samples
+        samples: Number of sampling rounds taken
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL, thread_ids: Optional[Set[int]] = None):
+        """Initialize the sampler.
+
+        Args:
+            interval: Seconds between samples
+            thread_ids: Threads sampled, read again on every round so threads can join and
+                leave while sampling; a request profile passes the threads working for it to keep
+                concurrent requests out (None samples every thread)
+        """
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start sampling in a background thread."""
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            sampled = None if self.thread_ids is None else set(self.thread_ids)
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (sampled is not None and thread_id not in sampled):
+                    continue
+                frames: List[str] = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, f"thread-{thread_id}"))
+                self.stacks[";".join(reversed(frames))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path: str) -> None:
+        """Write the collapsed stacks.
+
+        Args:
+            path: Output file path
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def summary(self, limit: int = SUMMARY_LINES) -> str:
+        """Summarize the samples by function.
+
+        Args:
+            limit: Number of functions listed
+
+        Returns:
+            Table of the functions with the most samples, by self and total samples
+        """
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if frames:
+                self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+
+        lines = [f"{self.samples} samples every {self.interval * 1000:g} ms", "", "self  total  function"]
+        for frame, count in self_counts.most_common(limit):
+            lines.append(f"{count:>4}  {total_counts[frame]:>5}  {frame}")
+        return "\n".join(lines) + "\n"
+
+
+@dataclass
+class RequestProfile:
+    """Profile of one request.
+
+    Attributes:
+        name: Operation name, e.g. "query" or "ingest"
+        tenant: Tenant of the request
+        request_id: ID tagging the output files
+        mode: "sampling" or "deterministic"
+        thread_id: Thread running the request
+        thread_ids: Threads currently sampled for the request: the request's own thread
+            in sampling mode, plus the worker threads running work for it (see profiled_thread)
+        duration: Wall-clock seconds of the request, once finished
+        paths: Files written for the profile
+    """
+
+    name: str
+    tenant: str
+    request_id: str
+    mode: str
+    thread_id: int = 0
+    thread_ids: Set[int] = field(default_factory=set)
+    duration: Optional[float] = None
+    paths: List[str] = field(default_factory=list)
+
+
+# Profile of the request running in the current context; asyncio tasks and asyncio.to_thread inherit it
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+@contextmanager
+def profiled_thread() -> Iterator[None]:
+    """Sample the current thread with the profile of the request it works for.
+
+    Wrap work a request hands to another thread, in a context copied from
+    the request's (asyncio.to_thread does that; see ``to_thread``). Nothing
+    happens when the request is not profiled.
+    """
+    profile = _current_profile.get()
+    thread_id = threading.get_ident()
+    if profile is None or thread_id == profile.thread_id or thread_id in profile.thread_ids:
+        yield
+        return
+    profile.thread_ids.add(thread_id)
+    try:
+        yield
+    finally:
+        # Pool threads go on to work for other requests
+        profile.thread_ids.discard(thread_id)
+
+
+async def to_thread(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a function in a worker thread like asyncio.to_thread, profiled with the current request.
+
+    Args:
+        func: Function to run
+        *args: Positional arguments of the function
+        **kwargs: Keyword arguments of the function
+
+    Returns:
+        The function's result
+    """
+
+    def run() -> Any:
+        with profiled_thread():
+            return func(*args, **kwargs)
+
+    return await asyncio.to_thread(run)
+
+
+@contextmanager
+def profile_request(
+    name: str,
+    tenant: Optional[str],
+    request_id: Optional[str] = None,
+    force: bool = False,
+    mode: Optional[str] = None,
+    profile_dir: str = PROFILE_DIR,
+) -> Iterator[Optional[RequestProfile]]:
+    """Profile a block when profiling is enabled for the tenant or forced.
+
+    When it is not, the block runs untouched and None is yielded. Otherwise
+    the files written to ``profile_dir`` are named
+    ``<tenant>_<name>_<timestamp>_<request id>`` plus:
+
+    - sampling: ``.collapsed`` stacks for flamegraph.pl or speedscope and a
+      ``.txt`` summary of the busiest functions
+    - deterministic: a cProfile ``.prof`` file (for snakeviz or pstats) and a
+      ``.txt`` summary sorted by cumulative time; cProfile only sees the
+      calling thread, so work in worker threads is sampled into a
+      ``.collapsed`` file and summarized in the ``.txt`` as well
+
+    The calling thread and the worker threads running work for the request
+    (``to_thread``, ``profiled_thread``) are profiled; other threads are not,
+    so concurrent requests do not show up in each other's profiles. cProfile
+    runs one profile at a time: while another deterministic profile is
+    active, the request is sampled instead and ``mode`` says so.
+
+    Args:
+        name: Operation name
+        tenant: Tenant of the request
+        request_id: ID tagging the output files (a random one by default)
+        force: Profile even if the configuration does not ask for it
+        mode: "sampling" or "deterministic" (defaults to PROFILE_MODE)
+        profile_dir: Directory the profiles are written to
+
+    Yields:
+        RequestProfile whose paths are filled in once the block exits, or None
+    """
+    if not (force or should_profile(tenant)):
+        yield None
+        return
+
+    mode = mode or PROFILE_MODE
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode {mode!r}, expected one of {', '.join(PROFILE_MODES)}")
+
+    profile = RequestProfile(
+        name=name,
+        tenant=tenant or "",
+        request_id=request_id or uuid.uuid4().hex[:12],
+        mode=mode,
+        thread_id=threading.get_ident(),
+    )
+    safe = lambda value: re.sub(r"[^\w.-]", "_", value)
+    base_path = os.path.join(
+        profile_dir,
+        f"{safe(profile.tenant) or 'none'}_{safe(name)}_{time.strftime('%Y%m%d-%H%M%S')}_{safe(profile.request_id)}",
+    )
+
+    profiler = None
+    if mode == "deterministic":
+        if _deterministic_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiling tool (a debugger, coverage) already holds the profiling hook
+                profiler = None
+                _deterministic_lock.release()
+        if profiler is None:
+            logger.info(f"Another deterministic profile is active; sampling {name} instead")
+            profile.mode = mode = "sampling"
+    if mode == "sampling":
+        profile.thread_ids.add(profile.thread_id)
+    # In deterministic mode this only samples worker threads
+    sampler = StackSampler(thread_ids=profile.thread_ids)
+    sampler.start()
+    token = _current_profile.set(profile)
+
+    start = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        profile.duration = time.perf_counter() - start
+        os.makedirs(profile_dir, exist_ok=True)
+        header = f"{name} for tenant '{profile.tenant}', request {profile.request_id}: {profile.duration:.3f}s\n"
+        sampler.stop()
+        summary = ""
+        if profiler is not None:
+            profiler.disable()
+            _deterministic_lock.release()
+            profiler.dump_stats(f"{base_path}.prof")
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(SUMMARY_LINES)
+            summary = stream.getvalue()
+            profile.paths.append(f"{base_path}.prof")
+        if profiler is None or sampler.stacks:
+            sampler.write_collapsed(f"{base_path}.collapsed")
+            if profiler is not None:
+                summary += "\nWorker threads (sampled)\n\n"
+            summary += sampler.summary()
+            profile.paths.append(f"{base_path}.collapsed")
+        with open(f"{base_path}.txt", "w", encoding="utf-8") as f:
+            f.write(header)
+            f.write(summary)
+        profile.paths.append(f"{base_path}.txt")
+        logger.info(f"Wrote {mode} profile of {name} ({profile.duration:.3f}s) to {', '.join(profile.paths)}")
@@ -0,0 +1,158 @@
+import logging
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from config import SEARCH_MODE, TOP_K, WEAVIATE_COLLECTION_NAME
+from context_assembler import AssembledContext, ContextAssembler
+from ingestion.vector_store import VectorStore, get_vector_store
+from llm_provider import LLMProvider
+from telemetry import iterate_in_span, span, start_span, use_span
+
+logger = logging.getLogger(__name__)
+
+
+class QueryPipeline:
+    """The chat query path: retrieval, context assembly and the LLM call.
+
+    Shared by the Streamlit app and the offline tools in ``benchmarks/``, so
+    load tests and evaluations exercise exactly what a chat message does.
+
+    Attributes:
+        llm: LLM provider answering the questions
+        context_assembler: Fits question, history and chunks into the token budget
+        collection_name: Name of the collection to search
+        top_k: Number of chunks retrieved per question
+        search_mode: "near_text", "hybrid" or "bm25" (None uses SEARCH_MODE)
+    """
+
+    def __init__(
+        self,
+        llm: LLMProvider,
+        context_assembler: Optional[ContextAssembler] = None,
+        collection_name: str = WEAVIATE_COLLECTION_NAME,
+        top_k: Optional[int] = None,
+        search_mode: Optional[str] = None,
+        vector_store_factory: Callable[[], VectorStore] = get_vector_store,
+    ):
+        """Initialize the pipeline.
+
+        Args:
+            llm: LLM provider answering the questions
+            context_assembler: Context assembler (a default ContextAssembler when omitted)
+            collection_name: Name of the collection to search
+            top_k: Number of chunks retrieved per question (defaults to TOP_K)
+            search_mode: "near_text", "hybrid" or "bm25" (defaults to SEARCH_MODE)
+            vector_store_factory: Creates the vector store used for each retrieval
+        """
+        self.llm = llm
+        self.context_assembler = context_assembler or ContextAssembler()
+        self.collection_name = collection_name
+        self.top_k = int(TOP_K) if top_k is None else top_k
+        self.search_mode = search_mode
+        self.vector_store_factory = vector_store_factory
+
+    def retrieve(self, query: str, tenant: str, limit: Optional[int] = None) -> List[Any]:
+        """Retrieve the chunks most relevant to a question.
+
+        Args:
+            query: User question
+            tenant: Tenant whose documents are searched
+            limit: Maximum number of chunks (defaults to top_k)
+
+        Returns:
+            Matching objects, best ranked first
+        """
+        search_mode = self.search_mode or SEARCH_MODE
+        with span("query.retrieve", search_mode=search_mode) as retrieve_span, self.vector_store_factory() as vector_store:
+            contexts = vector_store.query_by_text(
+                collection_name=self.collection_name,
+                query_text=query,
+                tenant=tenant,
+                limit=self.top_k if limit is None else limit,
+                search_mode=search_mode,
+            )
+            retrieve_span.count("results", len(contexts))
+        return contexts
+
+    def assemble(self, query: str, history: List[Dict[str, str]], contexts: List[Any]) -> AssembledContext:
+        """Fit question, history and chunks into the token budget, dropping the lowest-ranked chunks first.
+
+        Args:
+            query: User question
+            history: Previous messages, oldest first
+            contexts: Retrieved objects, best ranked first
+
+        Returns:
+            AssembledContext: Final prompt and token counts
+        """
+        chunks = [(str(obj.uuid), obj.properties.get("text", "")) for obj in contexts]
+        with span("query.assemble") as assemble_span:
+            assembled = self.context_assembler.assemble(query=query, history=history, chunks=chunks)
+            assemble_span.count("prompt_tokens", assembled.total_tokens)
+            assemble_span.count("context_tokens", assembled.context_tokens)
+            assemble_span.count("dropped_chunks", assembled.dropped_chunks)
+        logger.info(
+            f"Prompt tokens: total={assembled.total_tokens} system={assembled.system_tokens} "
+            f"query={assembled.query_tokens} history={assembled.history_tokens} "
+            f"context={assembled.context_tokens} dropped_chunks={assembled.dropped_chunks} "
+            f"truncated_chunks={assembled.truncated_chunks}"
+        )
+        return assembled
+
+    async def aanswer(
+        self,
+        query: str,
+        tenant: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        stream: bool = False,
+    ) -> Union[str, Iterator[str]]:
+        """Answer a chat question from the tenant's documents.
+
+        Args:
+            query: User question
+            tenant: Tenant whose documents are searched
+            history: Previous messages, oldest first, excluding the question
+            stream: Return a token iterator instead of the full answer
+
+        Returns:
+            The answer, or an iterator over its pieces when stream is True
+        """
+        # Not a `with span` block: a streamed answer keeps the span open until the stream is consumed
+        query_span = start_span("query", tenant=tenant, kind="chat", stream=stream)
+        try:
+            with use_span(query_span):
+                contexts = self.retrieve(query, tenant)
+                assembled = self.assemble(query, history or [], contexts)
+                if stream:
+                    return iterate_in_span(
+                        query_span,
+                        self.llm.stream_query(
+                            query=assembled.prompt, tenant=tenant, question=query, chunk_ids=assembled.chunk_ids
+                        ),
+                    )
+                return await self.llm.aquery(
+                    query=assembled.prompt, tenant=tenant, question=query, chunk_ids=assembled.chunk_ids
+                )
+        except BaseException as e:
+            query_span.end(error=e)
+            raise
+        finally:
+            if not stream:
+                query_span.end()
+
+    async def asummarize(self, texts: List[str], tenant: str, stream: bool = False) -> Union[str, Iterator[str]]:
+        """Summarize every chunk of an ingestion (map-reduce, not just the first chunk).
+
+        Args:
+            texts: Chunk texts
+            tenant: Tenant the documents belong to
+            stream: Return a token iterator instead of the full summary
+
+        Returns:
+            The summary, or an iterator over its pieces when stream is True
+        """
+        if stream:
+            # The span stays open until the stream is consumed
+            summary_span = start_span("query", tenant=tenant, kind="summary", stream=stream)
+            return iterate_in_span(summary_span, self.llm.stream_summarize_documents(texts=texts, tenant=tenant))
+        with span("query", tenant=tenant, kind="summary", stream=stream):
+            return await self.llm.asummarize_documents(texts=texts, tenant=tenant)
@@ -0,0 +1,504 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from cache import get_cache_stats
+from config import (
+    TELEMETRY_EXPORT_INTERVAL,
+    TELEMETRY_HTTP_PORT,
+    TELEMETRY_LOG_PATH,
+    TELEMETRY_TEXTFILE_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the span duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> LabelSet:
+    return tuple(sorted((key, "" if value is None else str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: LabelSet, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe in-process store of counters, gauges and histograms.
+
+    Metrics are rendered in the Prometheus text exposition format, so they
+    can be scraped over HTTP or written to a node_exporter textfile without a
+    client library.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        """Initialize an empty registry.
+
+        Args:
+            buckets: Upper bounds of the histogram buckets
+        """
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._gauges: Dict[str, Dict[LabelSet, float]] = {}
+        # name -> labels -> [bucket counts..., sum, count]
+        self._histograms: Dict[str, Dict[LabelSet, List[float]]] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, Dict[str, Any], float]]]] = []
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """Increase a counter.
+
+        Args:
+            name: Metric name
+            value: Amount to add
+            **labels: Label values
+        """
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set a gauge.
+
+        Args:
+            name: Metric name
+            value: Current value
+            **labels: Label values
+        """
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record a value in a histogram.
+
+        Args:
+            name: Metric name
+            value: Observed value
+            **labels: Label values
+        """
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            counts = series.get(key)
+            if counts is None:
+                counts = series[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, Dict[str, Any], float]]]) -> None:
+        """Register a function read at render time for gauges owned by other modules.
+
+        Args:
+            collector: Function returning (metric name, labels, value) tuples
+        """
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text
+        """
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+            histograms = {
+                name: {labels: list(counts) for labels, counts in series.items()}
+                for name, series in self._histograms.items()
+            }
+            collectors = list(self._collectors)
+
+        for collector in collectors:
+            try:
+                for name, labels, value in collector():
+                    gauges.setdefault(name, {})[_labels(labels)] = value
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {str(e)}")
+
+        lines = []
+        for kind, series_by_name in (("counter", counters), ("gauge", gauges)):
+            for name in sorted(series_by_name):
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(series_by_name[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for name in sorted(histograms):
+            lines.append(f"# TYPE {name} histogram")
+            for labels, counts in sorted(histograms[name].items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {count:g}")
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {counts[-1]:g}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {counts[-2]:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {counts[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return the histogram series as plain numbers, for reports.
+
+        Returns:
+            Dictionary of "<histogram>{labels}" -> {"count", "sum", "buckets"}
+        """
+        with self._lock:
+            return {
+                f"{name}{_format_labels(labels)}": {
+                    "count": counts[-1],
+                    "sum": counts[-2],
+                    "buckets": dict(zip(self.buckets, counts)),
+                }
+                for name, series in self._histograms.items()
+                for labels, counts in series.items()
+            }
+
+
+# Process-wide registry every instrumented module records into
+metrics = MetricsRegistry()
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_span_logger = logging.getLogger("telemetry.spans")
+_span_logger.propagate = False
+_span_listeners: List[Callable[["Span"], None]] = []
+
+
+class Span:
+    """A timed operation, nested under the span active when it started.
+
+    Attributes:
+        name: Operation name, e.g. "ingest.parse" or "llm.complete"
+        tenant: Tenant the operation runs for
+        trace_id: ID shared by every span of one request or job
+        span_id: ID of this span
+        parent_id: ID of the enclosing span, if any
+        attributes: Extra fields written to the JSON log
+        counts: Items processed by the operation (objects, tokens, ...)
+        status: "ok" or "error"
+        error: Description of the error of a failed operation
+        started: time.perf_counter() value at the start
+        duration: Seconds between start and end, once ended
+    """
+
+    def __init__(self, name: str, tenant: Optional[str] = None, parent: Optional["Span"] = None, **attributes: Any):
+        """Start the span.
+
+        Args:
+            name: Operation name
+            tenant: Tenant the operation runs for (inherited from the parent when omitted)
+            parent: Enclosing span
+            **attributes: Extra fields written to the JSON log
+        """
+        self.name = name
+        self.tenant = tenant if tenant is not None else (parent.tenant if parent else None)
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = dict(attributes)
+        self.counts: Dict[str, float] = {}
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self._error_type: Optional[str] = None
+        self.duration: Optional[float] = None
+        self.started = time.perf_counter()
+        self._started_at = time.time()
+
+    def set(self, **attributes: Any) -> None:
+        """Add fields to the JSON log record of the span.
+
+        Args:
+            **attributes: Field values
+        """
+        self.attributes.update(attributes)
+
+    def count(self, item: str, value: float = 1) -> None:
+        """Count items processed by the operation.
+
+        Counts are written to the JSON log and added to the
+        ``rag_span_items_total`` counter.
+
+        Args:
+            item: Item name, e.g. "objects" or "prompt_tokens"
+            value: Number of items
+        """
+        self.counts[item] = self.counts.get(item, 0) + value
+
+    def record_error(self, error: Union[BaseException, str]) -> None:
+        """Mark the operation as failed, for errors that are handled rather than raised.
+
+        Args:
+            error: Exception, or a description of the failure
+        """
+        self.status = "error"
+        self._error_type = error.__class__.__name__ if isinstance(error, BaseException) else "Error"
+        self.error = f"{self._error_type}: {error}" if isinstance(error, BaseException) else error
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        """End the span and record its metrics and log record.
+
+        Args:
+            error: Exception the operation failed with, if any
+        """
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self.started
+        if error is not None:
+            self.record_error(error)
+
+        tenant = self.tenant or ""
+        metrics.observe("rag_span_duration_seconds", self.duration, span=self.name, tenant=tenant, status=self.status)
+        if self.status == "error":
+            metrics.inc("rag_span_errors_total", span=self.name, tenant=tenant, error=self._error_type)
+        for item, value in self.counts.items():
+            metrics.inc("rag_span_items_total", value, span=self.name, tenant=tenant, item=item)
+
+        if _span_logger.handlers:
+            record = {
+                "timestamp": self._started_at,
+                "span": self.name,
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "tenant": self.tenant,
+                "duration_ms": round(self.duration * 1000, 3),
+                "status": self.status,
+                "error": self.error,
+                "counts": self.counts,
+                "attributes": self.attributes,
+            }
+            _span_logger.info(json.dumps(record, default=str))
+
+        for listener in list(_span_listeners):
+            listener(self)
+
+
+def add_span_listener(listener: Callable[[Span], None]) -> None:
+    """Call a function with every span that ends, e.g. to collect per-request timings in a load test.
+
+    Listeners run in the thread that ends the span and must be thread-safe.
+
+    Args:
+        listener: Function called with the ended span
+    """
+    _span_listeners.append(listener)
+
+
+def remove_span_listener(listener: Callable[[Span], None]) -> None:
+    """Stop calling a function registered with add_span_listener.
+
+    Args:
+        listener: Function to remove
+    """
+    if listener in _span_listeners:
+        _span_listeners.remove(listener)
+
+
+def start_span(name: str, tenant: Optional[str] = None, **attributes: Any) -> Span:
+    """Start a span without making it the current one.
+
+    For operations that do not map onto a ``with`` block, such as a streamed
+    response consumed by the caller; call ``end`` on the span when done.
+
+    Args:
+        name: Operation name
+        tenant: Tenant the operation runs for
+        **attributes: Extra fields written to the JSON log
+
+    Returns:
+        Started span
+    """
+    return Span(name, tenant=tenant, parent=_current_span.get(), **attributes)
+
+
+@contextmanager
+def span(name: str, tenant: Optional[str] = None, **attributes: Any) -> Iterator[Span]:
+    """Time a block as a span nested under the current one.
+
+    Works in threads and coroutines: the current span is kept in a context
+    variable, which asyncio tasks and asyncio.to_thread inherit.
+
+    Args:
+        name: Operation name
+        tenant: Tenant the operation runs for
+        **attributes: Extra fields written to the JSON log
+
+    Yields:
+        The span, to attach counts and attributes to
+    """
+    current = start_span(name, tenant=tenant, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(error=e)
+        raise
+    else:
+        current.end()
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def use_span(current: Span) -> Iterator[Span]:
+    """Make a span started with ``start_span`` the current one for a block, without ending it.
+
+    Args:
+        current: Span to nest the block's spans under
+
+    Yields:
+        The span
+    """
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        _current_span.reset(token)
+
+
+def iterate_in_span(current: Span, iterator: Iterator[Any]) -> Iterator[Any]:
+    """Iterate over a lazy iterator, such as a streamed response, inside a span.
+
+    Every item is produced with the span current, so the spans the iterator
+    starts are nested under it. The span ends when the iterator is exhausted,
+    fails or is closed by the consumer.
+
+    Args:
+        current: Started span, ended by this function
+        iterator: Iterator to consume
+
+    Yields:
+        The items of the iterator
+    """
+    try:
+        while True:
+            with use_span(current):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    except GeneratorExit:
+        # The consumer stopped early; the iterator's own cleanup runs inside the span
+        with use_span(current):
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+        raise
+    except BaseException as e:
+        current.end(error=e)
+        raise
+    finally:
+        current.end()
+
+
+def write_textfile(path: str = TELEMETRY_TEXTFILE_PATH) -> None:
+    """Write the metrics to a Prometheus textfile atomically.
+
+    Args:
+        path: Path of the .prom file
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(metrics.render())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Scrapes would otherwise be printed to stderr every few seconds
+        pass
+
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure() -> None:
+    """Start the configured exporters, once per process.
+
+    - TELEMETRY_LOG_PATH: every span is appended to this file as a JSON line
+    - TELEMETRY_TEXTFILE_PATH: metrics are written to this file every
+      TELEMETRY_EXPORT_INTERVAL seconds and at exit
+    - TELEMETRY_HTTP_PORT: metrics are served at http://0.0.0.0:<port>/metrics
+
+    Spans and metrics are always recorded in memory; without any exporter
+    configured nothing leaves the process. The answer and retrieval cache
+    statistics are exported as ``rag_cache_<stat>`` gauges.
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        _configured = True
+
+        metrics.add_collector(
+            lambda: (
+                (f"rag_cache_{stat}", {"cache": name}, value)
+                for name, stats in get_cache_stats().items()
+                for stat, value in stats.items()
+            )
+        )
+
+        if TELEMETRY_LOG_PATH:
+            directory = os.path.dirname(TELEMETRY_LOG_PATH)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            handler = logging.FileHandler(TELEMETRY_LOG_PATH, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _span_logger.addHandler(handler)
+            _span_logger.setLevel(logging.INFO)
+
+        if TELEMETRY_TEXTFILE_PATH:
+
+            def export_loop() -> None:
+                while True:
+                    time.sleep(TELEMETRY_EXPORT_INTERVAL)
+                    try:
+                        write_textfile(TELEMETRY_TEXTFILE_PATH)
+                    except OSError as e:
+                        logger.warning(f"Could not write metrics to {TELEMETRY_TEXTFILE_PATH}: {str(e)}")
+
+            threading.Thread(target=export_loop, name="telemetry-textfile", daemon=True).start()
+            atexit.register(write_textfile, TELEMETRY_TEXTFILE_PATH)
+
+        if TELEMETRY_HTTP_PORT:
+            try:
+                server = ThreadingHTTPServer(("0.0.0.0", TELEMETRY_HTTP_PORT), _MetricsHandler)
+            except OSError as e:
+                logger.warning(f"Could not serve metrics on port {TELEMETRY_HTTP_PORT}: {str(e)}")
+            else:
+                threading.Thread(target=server.serve_forever, name="telemetry-http", daemon=True).start()
+                logger.info(f"Serving metrics on port {TELEMETRY_HTTP_PORT}")
@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+
+# Settings are read when config is imported, so the state directories are pointed at a
+# scratch directory before any module of the package is loaded
+_STATE_DIR = tempfile.mkdtemp(prefix="rag-tests-")
+for _name, _value in {
+    "VECTOR_STORE": "local",
+    "EMBEDDER": "hashing",
+    "LOCAL_VECTOR_STORE_DIR": os.path.join(_STATE_DIR, "vector_store"),
+    "PARSE_CACHE_DIR": os.path.join(_STATE_DIR, "parse_cache"),
+    "MANIFEST_DIR": os.path.join(_STATE_DIR, "manifests"),
+    "JOBS_DIR": os.path.join(_STATE_DIR, "jobs"),
+    "INGEST_STATE_DIR": os.path.join(_STATE_DIR, "ingest"),
+    "PROFILE_DIR": os.path.join(_STATE_DIR, "profiles"),
+    "LOCAL_FILE_INPUT_DIR": os.path.join(_STATE_DIR, "input"),
+    "LOCAL_FILE_OUTPUT_DIR": os.path.join(_STATE_DIR, "output"),
+    "EMBEDDING_CACHE_PATH": "",
+    "RETRIEVAL_CACHE_PATH": "",
+    "CACHE_GENERATION_DIR": os.path.join(_STATE_DIR, "cache_generations"),
+    "INGEST_EXPORT_DIR": "",
+}.items():
+    os.environ[_name] = _value
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+class WordEncoding:
+    """Tokenizer with one token per space-separated word, so token counts are exact in tests."""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split(" ")
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    """Count tokens as words instead of loading a tiktoken encoding, which needs a download."""
+    import tiktoken
+    from ingestion.chunker import get_encoding
+
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda encoding_name: WordEncoding())
+    get_encoding.cache_clear()
+    yield
+    get_encoding.cache_clear()
@@ -0,0 +1,116 @@
+import os
+import shelve
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import cache as cache_module
+from cache import SemanticCache, TTLLRUCache, invalidate_tenant, tenant_generation
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Current time of the cache module, advanced by the test."""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = TTLLRUCache("ttl", ttl_seconds=10)
+    cache.set("key", "value")
+
+    clock[0] += 10
+    assert cache.get("key") == "value"
+    clock[0] += 0.001
+    assert cache.get("key", "default") == "default"
+    assert cache.stats()["entries"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLLRUCache("lru", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1
+
+
+def test_invalidation_drops_only_the_tenants_entries():
+    cache = TTLLRUCache("tenants")
+    cache.set("a", 1, tenant="acme")
+    cache.set("b", 2, tenant="other")
+    cache.set("c", 3)
+
+    assert invalidate_tenant("acme", "") >= 1
+    assert cache.get("a") is None
+    assert (cache.get("b"), cache.get("c")) == (2, 3)
+    assert cache.invalidations == 1
+
+
+def test_semantic_cache_matches_close_vectors_in_the_same_scope(clock):
+    cache = SemanticCache("semantic", max_distance=0.05, ttl_seconds=10)
+    cache.set("scope", [1.0, 0.0], "answer", tenant="acme")
+
+    assert cache.get("scope", [1.0, 0.01]) == "answer"
+    assert cache.get("scope", [0.0, 1.0]) is None
+    assert cache.get("other scope", [1.0, 0.0]) is None
+
+    clock[0] += 11
+    assert cache.get("scope", [1.0, 0.0]) is None
+
+
+def test_semantic_cache_eviction_and_invalidation():
+    cache = SemanticCache("semantic-lru", max_entries=2)
+    cache.set("a", [1.0, 0.0], "first", tenant="acme")
+    cache.set("b", [1.0, 0.0], "second", tenant="other")
+    cache.set("c", [1.0, 0.0], "third", tenant="acme")
+
+    assert cache.get("a", [1.0, 0.0]) is None
+    assert cache.evictions == 1
+    assert cache.invalidate_tenant("acme") == 1
+    assert cache.get("b", [1.0, 0.0]) == "second"
+    assert cache.stats()["entries"] == 1
+
+
+def test_invalidation_starts_a_new_generation(tmp_path):
+    generation_dir = str(tmp_path)
+    before = tenant_generation("acme", generation_dir)
+    invalidate_tenant("acme", generation_dir)
+
+    assert tenant_generation("acme", generation_dir) != before
+    assert tenant_generation("other", generation_dir) == ""
+
+
+def test_generation_is_shared_with_other_processes(tmp_path):
+    generation_dir = str(tmp_path)
+    before = tenant_generation("acme", generation_dir)
+    subprocess.run(
+        [sys.executable, "-c", f"from cache import invalidate_tenant; invalidate_tenant('acme', {generation_dir!r})"],
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+
+    assert tenant_generation("acme", generation_dir) != before
+
+
+def test_persistent_store_is_not_served_after_invalidation(tmp_path):
+    generation_dir = str(tmp_path / "generations")
+    path = str(tmp_path / "retrieval")
+    cache = TTLLRUCache("persistent", store=shelve.open(path))
+    stale_key = ("Documents", "acme", tenant_generation("acme", generation_dir), "question")
+    # A query racing with an upload stores its result after the invalidation
+    invalidate_tenant("acme", generation_dir)
+    cache.set(stale_key, ["old chunk"], tenant="acme")
+    cache.close()
+
+    reopened = TTLLRUCache("persistent", store=shelve.open(path))
+    key = ("Documents", "acme", tenant_generation("acme", generation_dir), "question")
+    assert reopened.get(key) is None
+    reopened.close()
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import uuid
+
+from llama_index.core import Document
+
+from ingestion import doc_processor
+from ingestion.checkpoint import IngestCheckpoint
+from ingestion.manifest import TenantManifest
+from ingestion.vector_store import LocalVectorStore
+
+
+def test_resume_restores_chunks_and_uploaded_ids(tmp_path):
+    checkpoint = IngestCheckpoint(str(tmp_path))
+    records = [{"filename": "a.pdf", "text": "one", "chunk_index": 0}]
+    checkpoint.save_chunks("a.pdf", "hash-a", records)
+    checkpoint.mark_uploaded("a.pdf", ["id-2", "id-1"])
+    checkpoint.mark_uploaded("a.pdf", ["id-3"])
+
+    resumed = IngestCheckpoint(str(tmp_path))
+    assert resumed.load_chunks("a.pdf", "hash-a") == records
+    assert resumed.uploaded_ids("a.pdf", "hash-a") == {"id-1", "id-2", "id-3"}
+    # The uploaded IDs log is folded into the checkpoint when it is opened
+    assert not os.path.exists(resumed.log_path)
+
+
+def test_changed_content_starts_over(tmp_path):
+    checkpoint = IngestCheckpoint(str(tmp_path))
+    checkpoint.save_chunks("a.pdf", "hash-a", [{"filename": "a.pdf", "text": "one", "chunk_index": 0}])
+    checkpoint.mark_uploaded("a.pdf", ["id-1"])
+
+    resumed = IngestCheckpoint(str(tmp_path))
+    assert not resumed.has_chunks("a.pdf", "hash-b")
+    assert resumed.load_chunks("a.pdf", "hash-b") is None
+    assert resumed.uploaded_ids("a.pdf", "hash-b") == set()
+
+
+def test_torn_log_line_is_ignored(tmp_path):
+    checkpoint = IngestCheckpoint(str(tmp_path))
+    checkpoint.save_chunks("a.pdf", "hash-a", [{"filename": "a.pdf", "text": "one", "chunk_index": 0}])
+    checkpoint.mark_uploaded("a.pdf", ["id-1"])
+    with open(checkpoint.log_path, "a", encoding="utf-8") as f:
+        f.write('{"filename": "a.pd')
+
+    assert IngestCheckpoint(str(tmp_path)).uploaded_ids("a.pdf", "hash-a") == {"id-1"}
+
+
+def test_empty_chunk_list_is_not_checkpointed(tmp_path):
+    checkpoint = IngestCheckpoint(str(tmp_path))
+    checkpoint.save_chunks("a.pdf", "hash-a", [])
+
+    assert not checkpoint.has_chunks("a.pdf", "hash-a")
+
+
+def test_identical_files_keep_their_own_chunks(tmp_path):
+    checkpoint = IngestCheckpoint(str(tmp_path))
+    first = [{"filename": "a.pdf", "text": "same", "chunk_index": 0}]
+    second = [{"filename": "copy.pdf", "text": "same", "chunk_index": 0}]
+    checkpoint.save_chunks("a.pdf", "same-hash", first)
+    checkpoint.save_chunks("copy.pdf", "same-hash", second)
+
+    resumed = IngestCheckpoint(str(tmp_path))
+    assert resumed.load_chunks("a.pdf", "same-hash") == first
+    assert resumed.load_chunks("copy.pdf", "same-hash") == second
+
+
+class PageParser:
+    """Stands in for LlamaParse: every "|"-separated part of a file is one page."""
+
+    async def aload_data(self, file_path, extra_info=None):
+        with open(file_path, "r", encoding="utf-8") as f:
+            pages = f.read().split("|")
+        return [Document(text=page, metadata=dict(extra_info or {})) for page in pages]
+
+
+def test_resume_with_identical_files(tmp_path, monkeypatch):
+    tenant = f"tenant-{uuid.uuid4().hex[:8]}"
+    input_dir = tmp_path / "input"
+    output_dir = tmp_path / "output"
+    input_dir.mkdir()
+    for name in ("a.txt", "copy.txt"):
+        (input_dir / name).write_text("first page|second page|third page", encoding="utf-8")
+
+    monkeypatch.setattr(doc_processor, "create_parser", lambda api_key=None: PageParser())
+    monkeypatch.setattr(doc_processor, "UPLOAD_BATCH_SIZE", 2)
+    upload_objects = LocalVectorStore.upload_objects
+    calls = []
+
+    def flaky_upload(self, *args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            return "Error uploading objects: connection reset"
+        return upload_objects(self, *args, **kwargs)
+
+    monkeypatch.setattr(LocalVectorStore, "upload_objects", flaky_upload)
+    assert asyncio.run(
+        doc_processor.process_llama_documents(tenant, "Documents", str(input_dir), str(output_dir))
+    ) is False
+    assert output_dir.exists()
+
+    monkeypatch.setattr(LocalVectorStore, "upload_objects", upload_objects)
+    result = asyncio.run(
+        doc_processor.process_llama_documents(tenant, "Documents", str(input_dir), str(output_dir))
+    )
+    assert result and result[0] is True
+
+    manifest = TenantManifest.for_tenant(doc_processor.MANIFEST_DIR, "Documents", tenant)
+    first, second = manifest.get("a.txt"), manifest.get("copy.txt")
+    assert first and second
+    assert len(first["object_ids"]) == len(second["object_ids"]) == 3
+    assert not set(first["object_ids"]) & set(second["object_ids"])
+
+    stored = LocalVectorStore().fetch_objects("Documents", tenant)
+    assert sorted(obj.properties["filename"] for obj in stored) == ["a.txt"] * 3 + ["copy.txt"] * 3
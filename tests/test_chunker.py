@@ -0,0 +1,67 @@
+import pytest
+
+from ingestion.chunker import TextChunker, count_tokens
+
+
+def paragraph(index, words=5):
+    return " ".join(f"p{index}w{word}" for word in range(words))
+
+
+def test_chunks_respect_the_size_and_repeat_the_overlap():
+    text = "\n\n".join(paragraph(index) for index in range(10))
+    chunks = TextChunker(chunk_size=12, chunk_overlap=5).split_text(text)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 12 for chunk in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        # The last paragraph of a chunk opens the next one
+        assert chunk.startswith(previous.split("\n\n")[-1])
+    # Every paragraph is kept
+    assert all(any(paragraph(index) in chunk for chunk in chunks) for index in range(10))
+
+
+def test_overlap_never_pushes_a_chunk_over_the_size():
+    text = "\n\n".join([paragraph(0, words=3), paragraph(1, words=9)])
+    chunks = TextChunker(chunk_size=10, chunk_overlap=5).split_text(text)
+
+    assert chunks == [paragraph(0, words=3), paragraph(1, words=9)]
+
+
+def test_heading_starts_a_new_chunk():
+    text = "\n\n".join([paragraph(0), "# Next section", paragraph(1)])
+    chunks = TextChunker(chunk_size=20, chunk_overlap=10).split_text(text)
+
+    assert chunks == [paragraph(0), "# Next section\n\n" + paragraph(1)]
+
+
+def test_heading_does_not_split_off_a_small_chunk():
+    text = "\n\n".join(["Intro", "# Section", paragraph(0)])
+
+    assert TextChunker(chunk_size=20, chunk_overlap=10).split_text(text) == [text]
+
+
+def test_long_sentence_is_split_into_token_windows():
+    text = " ".join(f"w{index}" for index in range(25))
+    chunks = TextChunker(chunk_size=10, chunk_overlap=0).split_text(text)
+
+    assert [count_tokens(chunk) for chunk in chunks] == [10, 10, 5]
+    assert " ".join(chunks) == text
+
+
+def test_overlap_must_be_smaller_than_the_size():
+    with pytest.raises(ValueError):
+        TextChunker(chunk_size=10, chunk_overlap=10)
+
+
+def test_chunk_indexes_count_per_file():
+    records = [
+        {"filename": "a.pdf", "text": "\n\n".join([paragraph(0), paragraph(1)])},
+        {"filename": "b.pdf", "text": paragraph(2)},
+        {"filename": "a.pdf", "text": paragraph(3), "page": 2},
+    ]
+    chunks = TextChunker(chunk_size=5, chunk_overlap=0).chunk_records(records)
+
+    assert [(chunk["filename"], chunk["chunk_index"]) for chunk in chunks] == [
+        ("a.pdf", 0), ("a.pdf", 1), ("b.pdf", 0), ("a.pdf", 2)
+    ]
+    assert chunks[-1]["page"] == 2
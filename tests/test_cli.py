@@ -0,0 +1,37 @@
+import os
+
+from ingestion import cli, doc_processor
+
+
+def test_options_are_passed_to_the_run_without_touching_the_environment(tmp_path, monkeypatch):
+    source = tmp_path / "contracts"
+    source.mkdir()
+    (source / "a.txt").write_text("text", encoding="utf-8")
+    calls = []
+
+    async def process_llama_documents(**kwargs):
+        calls.append(kwargs)
+        return [True, ["text"]]
+
+    monkeypatch.setattr(doc_processor, "process_llama_documents", process_llama_documents)
+    environ = dict(os.environ)
+    code = cli.main([
+        str(source), "--tenant", "acme", "--collection", "Documents",
+        "--parse-concurrency", "7", "--batch-size", "25", "--upload-retries", "1", "--upload-backoff", "0.5",
+        "--report", str(tmp_path / "report.json"),
+    ])
+
+    assert code == 0
+    assert calls[0]["parse_concurrency"] == 7
+    assert calls[0]["upload_batch_size"] == 25
+    assert calls[0]["upload_max_retries"] == 1
+    assert calls[0]["upload_backoff_base"] == 0.5
+    assert dict(os.environ) == environ
+
+
+def test_directory_with_duplicate_names_is_rejected(tmp_path):
+    for folder in ("a", "b"):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "report.txt").write_text(folder, encoding="utf-8")
+
+    assert cli.main([str(tmp_path), "--tenant", "acme", "--collection", "Documents"]) == cli.EXIT_USAGE
@@ -0,0 +1,63 @@
+from context_assembler import ContextAssembler
+from ingestion.chunker import count_tokens
+
+
+def words(prefix, count):
+    return " ".join(f"{prefix}{index}" for index in range(count))
+
+
+def assembler(max_tokens, **kwargs):
+    return ContextAssembler(max_tokens=max_tokens, system_prompt=words("s", 10), **kwargs)
+
+
+def test_prompt_fits_the_budget():
+    chunks = [(f"id-{index}", words(f"c{index}-", 40)) for index in range(10)]
+    history = [{"role": "user", "content": words(f"h{index}-", 30)} for index in range(6)]
+
+    for max_tokens in (60, 120, 250, 500):
+        assembled = assembler(max_tokens).assemble("what is it", history, chunks)
+
+        assert assembled.total_tokens <= max_tokens
+        assert assembled.total_tokens == count_tokens(words("s", 10)) + count_tokens(assembled.prompt)
+        assert assembled.dropped_chunks == len(chunks) - len(assembled.chunk_ids)
+
+
+def test_chunks_are_kept_in_rank_order_and_the_last_one_truncated():
+    chunks = [("first", words("a", 40)), ("second", words("b", 40)), ("third", words("c", 40))]
+    # Room for the first chunk and half of the second
+    budget = assembler(1000).assemble("question", [], []).total_tokens + 60
+    assembled = assembler(budget, min_chunk_tokens=5).assemble("question", [], chunks)
+
+    assert assembled.chunk_ids == ["first", "second"]
+    assert assembled.truncated_chunks == 1
+    assert assembled.dropped_chunks == 1
+    assert words("a", 40) in assembled.prompt
+    assert "b0" in assembled.prompt and "b39" not in assembled.prompt
+
+
+def test_small_remainder_is_not_filled_with_a_truncated_chunk():
+    chunks = [("first", words("a", 40)), ("second", words("b", 40))]
+    budget = assembler(1000).assemble("question", [], chunks[:1]).total_tokens + 3
+    assembled = assembler(budget, min_chunk_tokens=20).assemble("question", [], chunks)
+
+    assert assembled.chunk_ids == ["first"]
+    assert assembled.truncated_chunks == 0
+
+
+def test_history_is_capped_by_its_share_and_keeps_the_latest_messages():
+    chunks = [(f"id-{index}", words(f"c{index}-", 40)) for index in range(10)]
+    history = [{"role": "user", "content": words(f"h{index}-", 30)} for index in range(6)]
+    assembled = assembler(300, history_share=0.25).assemble("question", history, chunks)
+
+    free = 300 - count_tokens(words("s", 10)) - count_tokens(ContextAssembler._render("question", "", []))
+    assert 0 < assembled.history_tokens <= free * 0.25
+    assert "h5-29" in assembled.prompt
+    assert "h0-0" not in assembled.prompt
+
+
+def test_history_uses_the_budget_chunks_leave_unused():
+    history = [{"role": "user", "content": words(f"h{index}-", 30)} for index in range(6)]
+    assembled = assembler(300, history_share=0.25).assemble("question", history, [("only", "short chunk")])
+
+    assert assembled.history_tokens > 300 * 0.25
+    assert assembled.total_tokens <= 300
@@ -0,0 +1,55 @@
+import json
+import os
+import time
+
+from ingestion.jobs import JobManager, JobState
+
+
+async def ingest(user_id, collection_name, input_dir, output_dir, on_progress):
+    return True, ["first chunk", "second chunk"]
+
+
+def wait_for(manager, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job.finished:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_texts_are_discarded_after_use(tmp_path):
+    document = tmp_path / "a.txt"
+    document.write_text("text", encoding="utf-8")
+    manager = JobManager(jobs_dir=str(tmp_path / "jobs"), process_fn=ingest)
+
+    job_id = manager.submit("acme", "Documents", [str(document)])
+    assert wait_for(manager, job_id).status == "completed"
+    assert manager.get_texts(job_id) == ["first chunk", "second chunk"]
+
+    manager.discard_texts(job_id)
+    assert manager.get_texts(job_id) == []
+    assert os.listdir(tmp_path / "jobs") == [f"{job_id}.json"]
+
+
+def test_expired_jobs_are_removed_on_startup(tmp_path):
+    jobs_dir = tmp_path / "jobs"
+    jobs_dir.mkdir()
+    kept_input = tmp_path / "kept"
+    expired_input = tmp_path / "expired"
+    kept_input.mkdir()
+    expired_input.mkdir()
+    now = time.time()
+    for job in (
+        JobState("kept", "acme", "Documents", input_dir=str(kept_input), status="failed", finished_at=now - 60),
+        JobState("expired", "acme", "Documents", input_dir=str(expired_input), status="failed", finished_at=now - 7200),
+    ):
+        (jobs_dir / f"{job.job_id}.json").write_text(json.dumps(job.__dict__), encoding="utf-8")
+    (jobs_dir / "expired.texts.json").write_text("[]", encoding="utf-8")
+
+    manager = JobManager(jobs_dir=str(jobs_dir), process_fn=ingest, retention_hours=1)
+
+    assert [job.job_id for job in manager.list_jobs()] == ["kept"]
+    assert sorted(os.listdir(jobs_dir)) == ["kept.json"]
+    assert kept_input.exists() and not expired_input.exists()
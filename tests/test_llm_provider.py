@@ -0,0 +1,74 @@
+import time
+from types import SimpleNamespace
+
+import httpx
+from groq import APIConnectionError
+
+import llm_provider
+from llm_provider import ConcurrencyLimiter, LLMProvider
+
+
+class Stream:
+    """Stands in for a Groq stream of one-word deltas."""
+
+    def __init__(self, words):
+        self.words = words
+        self.closed = False
+
+    def __iter__(self):
+        for word in self.words:
+            time.sleep(0.01)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+
+    def close(self):
+        self.closed = True
+
+
+def provider(create):
+    llm = LLMProvider.__new__(LLMProvider)
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return llm
+
+
+def wait_for_slot(limiter, timeout=5):
+    deadline = time.time() + timeout
+    while limiter._available != 1 and time.time() < deadline:
+        time.sleep(0.01)
+    return limiter._available == 1
+
+
+def test_stream_retry_backs_off_without_the_slot(monkeypatch):
+    limiter = ConcurrencyLimiter(1)
+    monkeypatch.setattr(llm_provider, "llm_limiter", limiter)
+    slots_while_backing_off = []
+
+    def backoff_delay(error, attempt):
+        slots_while_backing_off.append(limiter._available)
+        return 0.0
+
+    monkeypatch.setattr(llm_provider, "backoff_delay", backoff_delay)
+    stream = Stream(["a", "b"])
+    attempts = []
+
+    def create(**kwargs):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise APIConnectionError(request=httpx.Request("POST", "https://api.groq.com"))
+        return stream
+
+    assert "".join(provider(create)._stream("system", "prompt")) == "ab"
+    assert slots_while_backing_off == [1]
+    assert wait_for_slot(limiter)
+
+
+def test_stream_is_closed_when_the_consumer_stops_early(monkeypatch):
+    limiter = ConcurrencyLimiter(1)
+    monkeypatch.setattr(llm_provider, "llm_limiter", limiter)
+    stream = Stream(["a", "b", "c", "d"])
+
+    deltas = provider(lambda **kwargs: stream)._stream("system", "prompt")
+    assert next(deltas) == "a"
+    deltas.close()
+
+    assert wait_for_slot(limiter)
+    assert stream.closed
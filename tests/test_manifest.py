@@ -0,0 +1,71 @@
+import asyncio
+import os
+import uuid
+
+from llama_index.core import Document
+
+from ingestion import doc_processor
+from ingestion.manifest import TenantManifest
+from ingestion.vector_store import LocalVectorStore
+
+
+def test_entries_survive_a_reload(tmp_path):
+    manifest = TenantManifest.for_tenant(str(tmp_path), "Documents", "acme")
+    manifest.record("a.pdf", "hash-a", "a.pdf", ["id-1", "id-2"])
+    manifest.record("b.pdf", "hash-b", "b.pdf", ["id-3"])
+    manifest.save()
+
+    reloaded = TenantManifest.for_tenant(str(tmp_path), "Documents", "acme")
+    assert reloaded.is_unchanged("a.pdf", "hash-a")
+    assert not reloaded.is_unchanged("a.pdf", "hash-changed")
+    assert not reloaded.is_unchanged("new.pdf", "hash-a")
+    assert reloaded.get("b.pdf")["object_ids"] == ["id-3"]
+    assert reloaded.referenced_ids() == {"id-1", "id-2", "id-3"}
+    assert reloaded.referenced_ids(exclude="a.pdf") == {"id-3"}
+
+    reloaded.remove("a.pdf")
+    assert reloaded.get("a.pdf") is None
+
+
+def test_unreadable_manifest_starts_empty(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text("{not json", encoding="utf-8")
+
+    assert TenantManifest(str(path)).files == {}
+
+
+class TextParser:
+    """Stands in for LlamaParse: a file is one page holding its text."""
+
+    def __init__(self):
+        self.parsed = []
+
+    async def aload_data(self, file_path, extra_info=None):
+        self.parsed.append(file_path)
+        with open(file_path, "r", encoding="utf-8") as f:
+            return [Document(text=f.read(), metadata=dict(extra_info or {}))]
+
+
+def test_reingestion_only_replaces_changed_files(tmp_path, monkeypatch):
+    tenant = f"tenant-{uuid.uuid4().hex[:8]}"
+    input_dir = tmp_path / "input"
+    parser = TextParser()
+    monkeypatch.setattr(doc_processor, "create_parser", lambda api_key=None: parser)
+
+    def ingest(changed_text):
+        # A successful run removes its input directory
+        input_dir.mkdir()
+        (input_dir / "kept.txt").write_text("kept text", encoding="utf-8")
+        (input_dir / "changed.txt").write_text(changed_text, encoding="utf-8")
+        result = asyncio.run(
+            doc_processor.process_llama_documents(tenant, "Documents", str(input_dir), str(tmp_path / "output"))
+        )
+        assert result and result[0] is True
+
+    ingest("first version")
+    parser.parsed.clear()
+    ingest("second version")
+
+    assert [os.path.basename(path) for path in parser.parsed] == ["changed.txt"]
+    stored = {obj.properties["text"] for obj in LocalVectorStore().fetch_objects("Documents", tenant)}
+    assert stored == {"kept text", "second version"}
@@ -0,0 +1,36 @@
+import asyncio
+
+from ingestion.pipeline import run_pipeline
+
+
+async def parse(file_path):
+    return [file_path]
+
+
+async def normalize(file_path, documents):
+    if file_path == "broken.txt":
+        raise ValueError("no text")
+    return [{"text": document} for document in documents]
+
+
+async def upload(batch):
+    return True
+
+
+def test_file_failing_to_normalize_is_counted_once():
+    events = []
+    result = asyncio.run(
+        run_pipeline(
+            ["a.txt", "broken.txt", "b.txt"],
+            parse,
+            normalize,
+            upload,
+            on_progress=lambda event, details: events.append((event, details)),
+        )
+    )
+
+    assert (result.files_parsed, result.files_failed) == (2, 1)
+    assert result.texts == ["a.txt", "b.txt"]
+    failed = next(details for event, details in events if event == "file_failed")
+    assert failed["file_path"] == "broken.txt"
+    assert failed["files_parsed"] + failed["files_failed"] <= failed["files_total"]
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+
+from profiling import profile_request, to_thread
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+async def request_with_worker():
+    await to_thread(busy, 0.3)
+
+
+def collapsed_stacks(profile):
+    path = next(path for path in profile.paths if path.endswith(".collapsed"))
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_sampling_covers_worker_threads_only_of_the_request(tmp_path):
+    stop = threading.Event()
+
+    def other_request():
+        while not stop.is_set():
+            busy(0.01)
+
+    other = threading.Thread(target=other_request, name="other-request")
+    other.start()
+    try:
+        with profile_request("ingest", "acme", force=True, mode="sampling", profile_dir=str(tmp_path)) as profile:
+            asyncio.run(request_with_worker())
+    finally:
+        stop.set()
+        other.join()
+
+    stacks = collapsed_stacks(profile)
+    assert "busy (test_profiling.py" in stacks
+    assert "other-request" not in stacks
+    assert profile.thread_ids == {profile.thread_id}
+
+
+def test_deterministic_profile_samples_worker_threads(tmp_path):
+    with profile_request("ingest", "acme", force=True, mode="deterministic", profile_dir=str(tmp_path)) as profile:
+        asyncio.run(request_with_worker())
+
+    assert profile.mode == "deterministic"
+    assert any(path.endswith(".prof") for path in profile.paths)
+    assert "busy (test_profiling.py" in collapsed_stacks(profile)
+
+
+def test_concurrent_deterministic_profiles_fall_back_to_sampling(tmp_path):
+    with profile_request("query", "acme", force=True, mode="deterministic", profile_dir=str(tmp_path)) as first:
+        with profile_request("query", "acme", force=True, mode="deterministic", profile_dir=str(tmp_path)) as second:
+            busy(0.05)
+
+    assert first.mode == "deterministic"
+    assert second.mode == "sampling"
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from query_pipeline import QueryPipeline
+from telemetry import add_span_listener, remove_span_listener, span
+
+
+class StreamingLLM:
+    """Stands in for LLMProvider, streaming two pieces inside an llm.stream span."""
+
+    def _stream(self, tenant):
+        with span("llm.stream", tenant=tenant):
+            yield "a"
+            yield "b"
+
+    def stream_query(self, query, tenant=None, question=None, chunk_ids=None):
+        return self._stream(tenant)
+
+    def stream_summarize_documents(self, texts, tenant=None):
+        return self._stream(tenant)
+
+
+@pytest.fixture
+def ended_spans():
+    spans = []
+    add_span_listener(spans.append)
+    yield spans
+    remove_span_listener(spans.append)
+
+
+def test_streamed_answer_is_traced_under_the_query_span(ended_spans):
+    pipeline = QueryPipeline(StreamingLLM())
+    stream = asyncio.run(pipeline.aanswer("question", "acme", stream=True))
+    assert "query" not in [ended.name for ended in ended_spans]
+
+    assert "".join(stream) == "ab"
+    by_name = {ended.name: ended for ended in ended_spans}
+    assert by_name["llm.stream"].parent_id == by_name["query"].span_id
+    assert by_name["query.retrieve"].parent_id == by_name["query"].span_id
+    assert [ended.name for ended in ended_spans][-1] == "query"
+
+
+def test_streamed_summary_span_ends_when_the_consumer_stops(ended_spans):
+    pipeline = QueryPipeline(StreamingLLM())
+    stream = asyncio.run(pipeline.asummarize(["text"], "acme", stream=True))
+
+    assert next(stream) == "a"
+    stream.close()
+    by_name = {ended.name: ended for ended in ended_spans}
+    assert by_name["llm.stream"].parent_id == by_name["query"].span_id
+    assert by_name["query"].status == "ok"
@@ -0,0 +1,50 @@
+import numpy as np
+
+from ingestion.vector_store import TenantIndex
+
+
+def rows(*values):
+    return np.array([[value, 1.0] for value in values], dtype=np.float32)
+
+
+def test_replacing_objects_keeps_their_rows(tmp_path):
+    index = TenantIndex(str(tmp_path))
+    index.append(["a", "b"], [{"text": "old a"}, {"text": "old b"}], rows(1.0, 2.0))
+    before = index.snapshot()
+
+    index.append(["b", "c"], [{"text": "new b"}, {"text": "c"}], rows(3.0, 4.0))
+
+    ids, properties, vectors = index.snapshot()
+    assert ids == ["a", "b", "c"]
+    assert [props["text"] for props in properties] == ["old a", "new b", "c"]
+    assert np.allclose(vectors[1], rows(3.0)[0] / np.linalg.norm(rows(3.0)[0]))
+    # Earlier snapshots keep their properties
+    assert before[1][1]["text"] == "old b"
+
+    reopened = TenantIndex(str(tmp_path))
+    assert reopened.snapshot()[0] == ids
+    assert [props["text"] for props in reopened.snapshot()[1]] == ["old a", "new b", "c"]
+    assert np.allclose(reopened.snapshot()[2], vectors)
+
+
+def test_replacement_lines_are_compacted(tmp_path):
+    index = TenantIndex(str(tmp_path))
+    index.append(["a"], [{"text": "0"}], rows(1.0))
+    for version in range(1, 10):
+        index.append(["a"], [{"text": str(version)}], rows(float(version)))
+
+    # One line for the row and at most one replacement line per row
+    with open(tmp_path / "objects.jsonl", "r", encoding="utf-8") as f:
+        assert len(f.readlines()) <= 2
+    assert TenantIndex(str(tmp_path)).snapshot()[1] == [{"text": "9"}]
+
+
+def test_changes_of_another_writer_are_picked_up(tmp_path):
+    reader = TenantIndex(str(tmp_path))
+    writer = TenantIndex(str(tmp_path))
+    writer.append(["a", "b"], [{"text": "a"}, {"text": "b"}], rows(1.0, 2.0))
+    assert reader.snapshot()[0] == ["a", "b"]
+
+    writer.delete_ids(["a"])
+    reader.append(["c"], [{"text": "c"}], rows(3.0))
+    assert writer.snapshot()[0] == ["b", "c"]